@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Stand-in for the yt-dlp executable that emits synthetic output offline
+
+Point ``YTDLP_PATH`` at this file and use the CLI engine. It understands the
+command lines the app builds:
+
+* ``--version`` prints a fake version
+* ``--dump-json`` prints an info dict with a configurable formats table
+  for every URL, and ``-O`` the app's slim projection of it
+* ``--flat-playlist --dump-json`` prints playlist entries
+* anything else is a download: ``--newline`` progress lines in the app's
+  ``--progress-template`` format, mixed with yt-dlp style log lines
+
+Sizes and rates come from environment variables, since the app builds the
+command line:
+
+    FAKE_YTDLP_LINES      progress lines per download (default 1000)
+    FAKE_YTDLP_RATE       progress lines per second, 0 for as fast as possible (default 200)
+    FAKE_YTDLP_LOG_EVERY  one log line per this many progress lines, 0 for none (default 10)
+    FAKE_YTDLP_SIZE       bytes per download (default 50 MB)
+    FAKE_YTDLP_FORMATS    formats in the info dict (default 40)
+    FAKE_YTDLP_ENTRIES    entries of a playlist (default 100)
+    FAKE_YTDLP_PARALLEL   downloads at once before the next ones fail with
+                          HTTP Error 429, 0 for no limit (default 0)
+
+Progress records carry the wall-clock time they were printed in
+``elapsed``, and log lines end with ``t=<time>``, so a harness can measure
+how long a line takes to reach the UI.
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downloader.progress import PROGRESS_PREFIX  # noqa: E402
+
+LINES = int(os.environ.get("FAKE_YTDLP_LINES", 1000))
+RATE = float(os.environ.get("FAKE_YTDLP_RATE", 200))
+LOG_EVERY = int(os.environ.get("FAKE_YTDLP_LOG_EVERY", 10))
+SIZE = int(os.environ.get("FAKE_YTDLP_SIZE", 50 * 1024 * 1024))
+FORMATS = int(os.environ.get("FAKE_YTDLP_FORMATS", 40))
+ENTRIES = int(os.environ.get("FAKE_YTDLP_ENTRIES", 100))
+PARALLEL = int(os.environ.get("FAKE_YTDLP_PARALLEL", 0))
+
+# One file per running download, named after its process, for FAKE_YTDLP_PARALLEL
+SLOT_DIR = os.path.join(tempfile.gettempdir(), f"fake-ytdlp-slots-{os.getuid()}")
+
+HEIGHTS = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+
+# The output template fields the app prints: ``%(.{a,b})j`` and ``%(list.:.{a,b}|default)j``
+TEMPLATE_FIELD_RE = re.compile(r"%\((?:(\w+)\.:)?\.\{([\w,]+)\}(?:\|([^)]*))?\)j")
+
+
+def video_id(url):
+    return url.rstrip("/").rsplit("/", 1)[-1].rsplit("=", 1)[-1][:11] or "fakevideo00"
+
+
+def info_dict(url):
+    """An info dict shaped like YouTube's, with FORMATS formats"""
+    duration = 600
+    formats = []
+    for i in range(FORMATS):
+        if i % 4 == 0:
+            abr = 48 + 16 * (i % 10)
+            formats.append({
+                "format_id": f"a{i}", "ext": "m4a" if i % 8 == 0 else "webm", "vcodec": "none",
+                "acodec": "mp4a.40.2" if i % 8 == 0 else "opus", "abr": abr, "tbr": abr,
+                "filesize": int(abr * 1000 / 8 * duration), "url": f"https://example.invalid/{i}",
+            })
+        else:
+            height = HEIGHTS[i % len(HEIGHTS)]
+            fps = 60 if i % 3 == 0 else 30
+            tbr = height * fps / 20
+            mp4 = i % 2 == 0
+            formats.append({
+                "format_id": f"v{i}", "ext": "mp4" if mp4 else "webm", "height": height, "width": height * 16 // 9,
+                "fps": fps, "vcodec": "avc1.640028" if mp4 else "vp9", "acodec": "none", "tbr": tbr,
+                "filesize_approx": int(tbr * 1000 / 8 * duration), "url": f"https://example.invalid/{i}",
+            })
+    vid = video_id(url)
+    # Thumbnails and captions make up much of a real document
+    thumbnails = [{"url": f"https://i.example.invalid/vi/{vid}/{i}.jpg", "preference": -i, "id": str(i)}
+                  for i in range(40)]
+    captions = {
+        f"l{i:02d}": [{"ext": ext, "url": f"https://example.invalid/api/timedtext?v={vid}&lang=l{i:02d}&fmt={ext}",
+                       "name": f"Language {i}"} for ext in ("json3", "srv1", "srv2", "srv3", "ttml", "vtt")]
+        for i in range(100)
+    }
+    return {
+        "id": vid, "title": f"Fake video {vid}", "uploader": "Fake Uploader", "duration": duration,
+        "view_count": 123456, "extractor": "youtube", "extractor_key": "Youtube",
+        "webpage_url": url, "original_url": url, "formats": formats,
+        "thumbnails": thumbnails, "automatic_captions": captions,
+    }
+
+
+def evaluate_template(template, info):
+    """Evaluate the field projections of an output template like yt-dlp"""
+    def field(match):
+        key, names, default = match.groups()
+        names = names.split(",")
+        if key is None:
+            return json.dumps({name: info[name] for name in names if info.get(name) is not None})
+        if not info.get(key):
+            return default or "NA"
+        return json.dumps([{name: item[name] for name in names if item.get(name) is not None} for item in info[key]])
+
+    return TEMPLATE_FIELD_RE.sub(field, template)
+
+
+def option(args, name):
+    return args[args.index(name) + 1] if name in args else None
+
+
+def running_downloads():
+    """PIDs of the fake downloads running now, removing the slots of dead ones"""
+    pids = []
+    for name in os.listdir(SLOT_DIR):
+        try:
+            os.kill(int(name), 0)
+        except (ValueError, ProcessLookupError):
+            try:
+                os.remove(os.path.join(SLOT_DIR, name))
+            except OSError:
+                pass
+            continue
+        except PermissionError:
+            pass
+        pids.append(int(name))
+    return pids
+
+
+def take_slot():
+    """Register this download, returns False if FAKE_YTDLP_PARALLEL others are running"""
+    os.makedirs(SLOT_DIR, exist_ok=True)
+    if len(running_downloads()) >= PARALLEL:
+        return False
+    open(os.path.join(SLOT_DIR, str(os.getpid())), "w").close()
+    return True
+
+
+def download(args):
+    if PARALLEL and not take_slot():
+        print(f"[youtube] {video_id(args[-1])}: Downloading webpage t={time.time()}", flush=True)
+        print("ERROR: [youtube] unable to download video data: HTTP Error 429: Too Many Requests", flush=True)
+        return 1
+    try:
+        return transfer(args)
+    finally:
+        if PARALLEL:
+            os.remove(os.path.join(SLOT_DIR, str(os.getpid())))
+
+
+def transfer(args):
+    url = args[-1]
+    info_path = option(args, "--load-info-json")
+    if info_path:
+        with open(info_path, encoding="utf-8") as f:
+            url = json.load(f).get("webpage_url", url)
+    vid = video_id(url)
+
+    # --write-info-json -o infojson:<template> fills the app's info cache
+    for i, arg in enumerate(args):
+        if arg == "-o" and args[i + 1].startswith("infojson:"):
+            with open(args[i + 1][len("infojson:"):] + ".info.json", "w", encoding="utf-8") as f:
+                json.dump(info_dict(url), f)
+
+    filename = os.path.join(os.path.dirname(option(args, "-o") or "."), f"{vid}.mp4")
+    print(f"[youtube] {vid}: Downloading webpage t={time.time()}", flush=True)
+    print(f"[info] {vid}: Downloading 1 format(s): {option(args, '-f')} t={time.time()}", flush=True)
+    print(f"[download] Destination: {filename} t={time.time()}", flush=True)
+
+    started = time.monotonic()
+    for i in range(1, LINES + 1):
+        if RATE:
+            delay = started + i / RATE - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        elapsed = time.monotonic() - started
+        downloaded = SIZE * i // LINES
+        speed = downloaded / elapsed if elapsed else None
+        record = {
+            "status": "downloading", "downloaded_bytes": downloaded, "total_bytes": SIZE,
+            "total_bytes_estimate": None, "speed": speed,
+            "eta": (SIZE - downloaded) / speed if speed else None,
+            # Wall-clock time of the line, for measuring latency
+            "elapsed": time.time(),
+            "fragment_index": None, "fragment_count": None, "filename": filename,
+        }
+        sys.stdout.write(PROGRESS_PREFIX + json.dumps(record) + "\n")
+        if LOG_EVERY and i % LOG_EVERY == 0:
+            sys.stdout.write(f"[download] fake log line {i} of {vid} t={time.time()}\n")
+        sys.stdout.flush()
+
+    print(f"[download] 100% of {SIZE} bytes t={time.time()}", flush=True)
+    path_file = option(args, "--print-to-file") and args[args.index("--print-to-file") + 2]
+    if path_file:
+        with open(path_file, "a", encoding="utf-8") as f:
+            f.write(filename + "\n")
+    return 0
+
+
+def main(args):
+    if "--version" in args:
+        print("fake-2024.01.01")
+        return 0
+    if "--dump-json" in args and "--flat-playlist" in args:
+        for i in range(ENTRIES):
+            print(json.dumps({"_type": "url", "ie_key": "Youtube", "id": f"entry{i:06d}", "title": f"Entry {i}",
+                              "url": f"https://www.youtube.com/watch?v=entry{i:06d}"}), flush=True)
+        return 0
+    if "--dump-json" in args:
+        urls = args[args.index("--") + 1:] if "--" in args else args[-1:]
+        for url in urls:
+            print(json.dumps(info_dict(url)), flush=True)
+        return 0
+    if "-O" in args:
+        template = option(args, "-O")
+        for url in args[args.index("--") + 1:]:
+            print(evaluate_template(template, info_dict(url)), flush=True)
+        return 0
+    return download(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""Benchmarks of the app's own overhead, offline against a fake yt-dlp
+
+    python bench/run.py                       # all benchmarks
+    python bench/run.py download -j 8 --lines 5000 --rate 0
+    python bench/run.py parse info --json
+
+Every benchmark runs the app's real code against ``bench/fake_ytdlp.py``
+through the CLI engine, with caches and state in a temporary directory:
+
+* ``parse``: ``DownloaderCore.parse_progress`` over synthetic output lines,
+  in lines per second
+* ``info``: ``YouTubeDownloaderApp.fetch_info_thread`` with an uncached
+  ``--dump-json`` of a large formats table, in milliseconds per fetch
+* ``bulk-info``: the same number of URLs fetched one ``fetch_info`` at a
+  time, with ``DownloaderCore.start_bulk_info`` and with a slim bulk fetch,
+  in URLs per second
+* ``download``: parallel downloads whose events are applied by the GUI's
+  ``process_queue``/``log_messages`` on a loop standing in for the Tk main
+  loop. Reports lines per second, line-to-UI latency percentiles, time the
+  main loop was blocked and memory growth
+
+* ``throttle``: downloads from a fake site that fails with HTTP 429 beyond
+  ``--site-parallel`` downloads at once, so the host's limit drops and
+  the throttled jobs are retried; with the retries and the final limit
+
+* ``distributed``: a coordinator in this process and ``--hosts`` worker
+  processes downloading ``--jobs`` jobs from it, then the same with one
+  worker killed midway so its leases run out and its jobs move to the
+  others; in jobs per second, with the jobs that needed another lease
+
+* ``startup``: a fresh interpreter importing the GUI module next to one
+  that imports nothing, and ``DownloaderCore.probe_toolchain`` without and
+  with its on-disk cache, in milliseconds
+
+The GUI methods run against in-memory stand-ins for the Tk widgets, so no
+display is needed; widget drawing itself is not measured.
+"""
+import argparse
+import atexit
+import gc
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+# The app reads these when it is imported or first runs
+STATE_DIR = tempfile.mkdtemp(prefix="py-youtube-bench-")
+atexit.register(shutil.rmtree, STATE_DIR, True)
+os.environ["XDG_CACHE_HOME"] = os.path.join(STATE_DIR, "cache")
+os.environ["XDG_DATA_HOME"] = os.path.join(STATE_DIR, "data")
+os.environ["YTDLP_PATH"] = os.path.join(BENCH_DIR, "fake_ytdlp.py")
+
+from downloader.backends import SUBPROCESS  # noqa: E402
+from downloader.coordinator import Coordinator, CoordinatorServer  # noqa: E402
+from downloader.core import DownloaderCore  # noqa: E402
+from downloader.events import EventPump  # noqa: E402
+from downloader.jobs import DownloadJob  # noqa: E402
+from downloader.logbuffer import LogBuffer  # noqa: E402
+from downloader.paths import cache_dir  # noqa: E402
+from downloader.progress import PROGRESS_PREFIX  # noqa: E402
+from downloader.toolchain import CACHE_FILE  # noqa: E402
+
+import downloder  # noqa: E402
+
+TIMESTAMP_RE = re.compile(r" t=(\d+\.\d+)$")
+
+OPTIONS = {"quality": "1080p", "framerate": "Auto", "format_ext": "mp4", "output_path": STATE_DIR}
+
+
+def percentiles(values, points=(50, 95, 99)):
+    """Return the given percentiles and the maximum of ``values`` in milliseconds"""
+    if not values:
+        return {}
+    values = sorted(values)
+    result = {f"p{point}": round(values[min(len(values) - 1, len(values) * point // 100)] * 1000, 2)
+              for point in points}
+    result["max"] = round(values[-1] * 1000, 2)
+    return result
+
+
+def rss_bytes():
+    """Resident set size of this process, from /proc on Linux"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class _Var:
+    """Stand-in for a Tk variable"""
+
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class _Widget:
+    """Stand-in for a widget that is only configured"""
+
+    def __init__(self):
+        self.options = {}
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def cget(self, name):
+        return self.options.get(name, "")
+
+    def set(self, value):
+        self.options["value"] = value
+
+
+class _Text:
+    """Stand-in for the log textbox, keeping its lines in a list"""
+
+    def __init__(self):
+        self.lines = []
+
+    def insert(self, index, text):
+        self.lines.extend(text.splitlines())
+
+    def index(self, index):
+        return f"{len(self.lines) + 1}.0"
+
+    def delete(self, start, end):
+        del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+class _Messagebox:
+    """Stand-in for tkinter.messagebox; dialogs would need a display"""
+
+    shown = []
+
+    @classmethod
+    def showerror(cls, title, message):
+        cls.shown.append(message)
+
+    showinfo = showwarning = showerror
+
+
+# Errors would open a dialog; count them instead
+downloder.messagebox = _Messagebox
+
+
+class _JobRow:
+    """A job row without widgets, redrawn by the real ``JobRow.refresh``"""
+
+    refresh = downloder.JobRow.refresh
+
+    def __init__(self, job):
+        self.job = job
+        self.progress_bar = _Widget()
+        self.status_label = _Widget()
+        self.stop_button = _Widget()
+
+
+class HeadlessApp:
+    """Runs the GUI's event handling methods against widget stand-ins
+
+    Records when each progress record and log line reaches the UI, and how
+    long every ``process_queue`` call blocks the main loop.
+    """
+
+    App = downloder.YouTubeDownloaderApp
+    process_queue = App.process_queue
+    log_message = App.log_message
+    show_log_entries = App.show_log_entries
+    log_filter_job_id = App.log_filter_job_id
+    on_job_status = App.on_job_status
+    update_overall_progress = App.update_overall_progress
+    update_progress = App.update_progress
+    fetch_info_thread = App.fetch_info_thread
+
+    def __init__(self, core):
+        self.core = core
+        self.queue = core.events
+        self.manager = core.manager
+        self.log_buffer = LogBuffer(downloder.LOG_BUFFER_LINES, spill_dir=False)
+        self.job_rows = {}
+        self.queue_tick = downloder.QUEUE_TICK_MS
+        self.next_tick = None
+
+        self.log_text = _Text()
+        self.log_filter_var = _Var(downloder.ALL_JOBS)
+        self.log_filter_menu = _Widget()
+        self.status_var = _Var()
+        self.speed_var = _Var()
+        self.eta_var = _Var()
+        self.pipeline_var = _Var()
+        self.queue_estimate = None
+        self.progress_var = _Var()
+        self.bandwidth_var = _Var(downloder.UNLIMITED)
+        self.progress_bar = _Widget()
+        self.percentage_label = _Widget()
+        self.stop_button = _Widget()
+
+        self.progress_latency = []
+        self.log_latency = []
+        self.ticks = []
+
+    def after(self, ms, callback):
+        self.next_tick = ms
+
+    def add_job_row(self, job):
+        self.job_rows[job.job_id] = _JobRow(job)
+
+    def update_log_filter_values(self):
+        self.log_filter_menu.configure(values=[f"#{job_id}" for job_id in self.job_rows])
+
+    def on_job_progress(self, job_id, record):
+        if record.elapsed and record.status == "downloading":
+            self.progress_latency.append(time.time() - record.elapsed)
+        self.App.on_job_progress(self, job_id, record)
+
+    def log_messages(self, entries):
+        now = time.time()
+        for _, message in entries:
+            match = TIMESTAMP_RE.search(message)
+            if match:
+                self.log_latency.append(now - float(match.group(1)))
+        self.App.log_messages(self, entries)
+
+    def tick(self):
+        """One main loop iteration: process the queue, timing the stall"""
+        started = time.perf_counter()
+        self.process_queue()
+        self.ticks.append(time.perf_counter() - started)
+        return self.next_tick / 1000
+
+
+def create_core(workers=3):
+    return DownloaderCore(EventPump(), max_workers=workers, engine=SUBPROCESS)
+
+
+def bench_parse(args):
+    """Lines per second through DownloaderCore.parse_progress"""
+    core = create_core()
+    job = DownloadJob(url="https://example.invalid/parse")
+    record = {"status": "downloading", "downloaded_bytes": 1048576, "total_bytes": 52428800,
+              "total_bytes_estimate": None, "speed": 2097152.0, "eta": 24, "elapsed": 0.5,
+              "fragment_index": None, "fragment_count": None, "filename": "/tmp/video.mp4"}
+    lines = []
+    for i in range(args.parse_lines):
+        record["downloaded_bytes"] = i * 1024
+        lines.append(PROGRESS_PREFIX + json.dumps(record) + "\n")
+        if args.log_every and i % args.log_every == 0:
+            lines.append(f"[download] log line {i}\n")
+
+    started = time.perf_counter()
+    parsed = sum(1 for line in lines if core.parse_progress(job, line))
+    elapsed = time.perf_counter() - started
+    core.events.drain()
+    core.close()
+    return {
+        "lines": len(lines),
+        "progress_lines": parsed,
+        "lines_per_second": round(len(lines) / elapsed),
+        "us_per_line": round(elapsed / len(lines) * 1e6, 2),
+    }
+
+
+def bench_info(args):
+    """Milliseconds per uncached info fetch through fetch_info_thread"""
+    core = create_core()
+    app = HeadlessApp(core)
+    timings = []
+    for i in range(args.info_runs):
+        url = f"https://www.youtube.com/watch?v=info{i:07d}"
+        started = time.perf_counter()
+        app.fetch_info_thread(url, OPTIONS)
+        timings.append(time.perf_counter() - started)
+    messages = core.events.drain()
+    errors = [data for msg_type, data in messages.messages if msg_type == "error"]
+    core.close()
+    result = {"runs": args.info_runs, "formats": args.formats, "errors": len(errors)}
+    if errors:
+        result["first_error"] = errors[0]
+    result.update({f"fetch_{name}_ms": value for name, value in percentiles(timings).items()})
+    return result
+
+
+def bench_bulk_info(args):
+    """URLs per second fetched one by one and in bulk"""
+    core = create_core()
+    urls = [f"https://www.youtube.com/watch?v=one{i:07d}" for i in range(args.info_urls)]
+    started = time.perf_counter()
+    for url in urls:
+        core.fetch_info(url)
+    single = time.perf_counter() - started
+
+    timings = {}
+    results = []
+    for name, slim in (("bulk", False), ("slim", True)):
+        urls = [f"https://www.youtube.com/watch?v={name}{i:07d}" for i in range(args.info_urls)]
+        started = time.perf_counter()
+        core.start_bulk_info(urls, OPTIONS, slim=slim)
+        core.wait()
+        timings[name] = time.perf_counter() - started
+        results += [data for msg_type, data in core.events.drain().messages if msg_type == "info_result"]
+    core.close()
+    return {
+        "urls": args.info_urls,
+        "results": len(results),
+        "errors": sum(1 for result in results if result.error),
+        "single_urls_per_second": round(len(urls) / single, 1),
+        "bulk_urls_per_second": round(len(urls) / timings["bulk"], 1),
+        "slim_urls_per_second": round(len(urls) / timings["slim"], 1),
+        "speedup": round(single / timings["bulk"], 1),
+    }
+
+
+def bench_download(args):
+    """Parallel downloads applied to the UI by process_queue"""
+    core = create_core(args.workers)
+    app = HeadlessApp(core)
+    urls = [f"https://www.youtube.com/watch?v=dl{i:09d}" for i in range(args.jobs)]
+
+    gc.collect()
+    rss_before = rss_bytes()
+    started = time.monotonic()
+    core.submit_urls(urls, OPTIONS)
+
+    # The main loop: sleep for the tick process_queue asked for, then run it
+    while core.busy or core.events.pending():
+        delay = app.tick()
+        time.sleep(delay)
+    app.tick()
+    elapsed = time.monotonic() - started
+
+    gc.collect()
+    rss_after = rss_bytes()
+    loop_stall = sum(app.ticks)
+    expected_lines = args.jobs * (args.lines + (args.lines // args.log_every if args.log_every else 0) + 4)
+    statuses = {}
+    for job in core.manager.snapshot():
+        statuses[job.status] = statuses.get(job.status, 0) + 1
+    result = {
+        "jobs": args.jobs,
+        "workers": args.workers,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 2),
+        "lines_per_second": round(expected_lines / elapsed),
+        "progress_latency_ms": percentiles(app.progress_latency),
+        "log_latency_ms": percentiles(app.log_latency),
+        "ticks": len(app.ticks),
+        "stall_total_ms": round(loop_stall * 1000, 1),
+        "stall_ms": percentiles(app.ticks),
+        "stall_fraction": round(loop_stall / elapsed, 4),
+        "coalesced_progress": core.events.coalesced,
+        "throttled_logs": core.events.throttled,
+        "rss_growth_kb": (rss_after - rss_before) // 1024,
+    }
+    if _Messagebox.shown:
+        result["first_error"] = _Messagebox.shown[0]
+    core.close()
+    return result
+
+
+def bench_throttle(args):
+    """Downloads from a host that answers 429 beyond ``--site-parallel`` downloads at once"""
+    os.environ["FAKE_YTDLP_PARALLEL"] = str(args.site_parallel)
+    core = create_core(args.workers)
+    # Short backoffs, the fake site forgives at once
+    core.host_limiter.backoff_base = 0.2
+    urls = [f"https://www.youtube.com/watch?v=th{i:09d}" for i in range(args.jobs)]
+    started = time.monotonic()
+    try:
+        core.submit_urls(urls, OPTIONS)
+        while core.busy or core.events.pending():
+            core.events.drain()
+            time.sleep(0.05)
+    finally:
+        del os.environ["FAKE_YTDLP_PARALLEL"]
+    elapsed = time.monotonic() - started
+
+    jobs = core.manager.snapshot()
+    statuses = {}
+    for job in jobs:
+        statuses[job.status] = statuses.get(job.status, 0) + 1
+    result = {
+        "jobs": args.jobs,
+        "workers": args.workers,
+        "site_parallel": args.site_parallel,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 2),
+        "retries": sum(job.retries for job in jobs),
+        "host_limit": core.host_limiter.limit(jobs[0]) if jobs else None,
+    }
+    core.close()
+    return result
+
+
+def run_distributed(args, kill_after=None):
+    """Download ``args.jobs`` jobs on ``args.hosts`` workers, optionally killing the first one"""
+    coordinator = Coordinator(lease_seconds=2)
+    server = CoordinatorServer(("127.0.0.1", 0), coordinator)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    coordinator.submit({"urls": [f"https://www.youtube.com/watch?v=dist{i:08d}" for i in range(args.jobs)],
+                        "output_path": STATE_DIR})
+
+    started = time.monotonic()
+    workers = [
+        subprocess.Popen([sys.executable, "-m", "downloader.worker", url, "-j", str(args.workers), "--engine", "cli",
+                          "--name", f"bench{i}", "--exit-when-idle"],
+                         cwd=os.path.dirname(BENCH_DIR), stdout=subprocess.DEVNULL, start_new_session=True)
+        for i in range(args.hosts)
+    ]
+    if kill_after is not None:
+        time.sleep(kill_after)
+        # The worker and its yt-dlp processes die without giving anything back
+        os.killpg(workers[0].pid, signal.SIGKILL)
+    for worker in workers:
+        worker.wait()
+    elapsed = time.monotonic() - started
+    server.shutdown()
+    server.server_close()
+
+    jobs = coordinator.list_jobs()["jobs"]
+    statuses = {}
+    for job in jobs:
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+    return {
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 2),
+        "jobs_per_second": round(len(jobs) / elapsed, 2),
+        "released": sum(1 for job in jobs if job["attempts"] > 1),
+    }
+
+
+def bench_distributed(args):
+    """Jobs per second on several worker processes, and with one of them lost"""
+    result = {"jobs": args.jobs, "hosts": args.hosts, "workers": args.workers}
+    runs = [("all", None)]
+    if args.hosts > 1:
+        runs.append(("lost_worker", 1.0))
+    for name, kill_after in runs:
+        for key, value in run_distributed(args, kill_after).items():
+            result[f"{name}_{key}"] = value
+    return result
+
+
+def bench_startup(args):
+    """Milliseconds to import the GUI module and to probe the toolchain"""
+    def interpreter(code):
+        timings = []
+        for _ in range(args.startup_runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(BENCH_DIR), check=True)
+            timings.append(time.perf_counter() - started)
+        return percentiles(timings)
+
+    core = create_core()
+    cold, cached = [], []
+    for _ in range(args.startup_runs):
+        try:
+            os.remove(os.path.join(cache_dir(), CACHE_FILE))
+        except OSError:
+            pass
+        for timings in (cold, cached):
+            started = time.perf_counter()
+            toolchain = core.probe_toolchain()
+            timings.append(time.perf_counter() - started)
+    core.close()
+    return {
+        "runs": args.startup_runs,
+        "python_ms": interpreter("pass"),
+        "import_gui_ms": interpreter("import downloder"),
+        "ytdlp": toolchain.ytdlp_version,
+        "ffmpeg": toolchain.ffmpeg_version,
+        "probe_cold_ms": percentiles(cold),
+        "probe_cached_ms": percentiles(cached),
+    }
+
+
+BENCHMARKS = {"parse": bench_parse, "info": bench_info, "bulk-info": bench_bulk_info, "download": bench_download,
+              "throttle": bench_throttle, "distributed": bench_distributed, "startup": bench_startup}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Measure the app's overhead against a fake yt-dlp.")
+    parser.add_argument("benchmarks", nargs="*", help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default all)")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="downloads in the download benchmark")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="parallel downloads")
+    parser.add_argument("--lines", type=int, default=2000, help="progress lines per download")
+    parser.add_argument("--rate", type=float, default=500, help="progress lines per second per download, 0 for no limit")
+    parser.add_argument("--log-every", type=int, default=10, help="one log line per this many progress lines")
+    parser.add_argument("--formats", type=int, default=60, help="formats in the fake info dict")
+    parser.add_argument("--parse-lines", type=int, default=200000, help="lines in the parse benchmark")
+    parser.add_argument("--info-runs", type=int, default=20, help="fetches in the info benchmark")
+    parser.add_argument("--startup-runs", type=int, default=10, help="runs of each startup measurement")
+    parser.add_argument("--info-urls", type=int, default=100, help="URLs in the bulk-info benchmark")
+    parser.add_argument("--site-parallel", type=int, default=2,
+                        help="downloads the fake site allows at once in the throttle benchmark")
+    parser.add_argument("--hosts", type=int, default=3, help="worker processes in the distributed benchmark")
+    parser.add_argument("--json", action="store_true", help="print one JSON object instead of a table")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    os.environ.update({
+        "FAKE_YTDLP_LINES": str(args.lines),
+        "FAKE_YTDLP_RATE": str(args.rate),
+        "FAKE_YTDLP_LOG_EVERY": str(args.log_every),
+        "FAKE_YTDLP_FORMATS": str(args.formats),
+    })
+
+    results = {}
+    for name in args.benchmarks or BENCHMARKS:
+        results[name] = BENCHMARKS[name](args)
+        if not args.json:
+            print(f"== {name}")
+            for key, value in results[name].items():
+                print(f"  {key:<22} {value}")
+    if args.json:
+        print(json.dumps(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,16 @@
+"""Core, GUI-independent pieces of the YouTube downloader"""
+
+from .jobs import (
+    DownloadJob,
+    DownloadManager,
+    QUEUED,
+    RUNNING,
+    CONVERTING,
+    COMPLETED,
+    FAILED,
+    STOPPED,
+    ERROR,
+    SKIPPED,
+    FINISHED_STATES,
+)
+from .core import DownloaderCore
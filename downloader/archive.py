@@ -0,0 +1,179 @@
+"""Persistent archive of downloaded videos
+
+Entries use the format of yt-dlp's ``--download-archive`` files,
+``"<extractor> <video id>"`` such as ``youtube dQw4w9WgXcQ``, one per line.
+An existing yt-dlp archive can be imported as is, and the app's own
+``archive.txt`` can be handed to yt-dlp as well.
+
+Membership is checked against an in-memory index: the sorted 64-bit hashes
+of all entries (8 bytes per video, binary searched) plus a set of the
+entries added since the last merge. The index is saved next to the text
+file together with the length of the text it covers, so a start only
+hashes the lines appended since, and stays quick with millions of entries.
+"""
+import array
+import bisect
+import hashlib
+import os
+import struct
+import threading
+
+from .info_cache import YOUTUBE_ID_RE
+from .paths import data_dir
+
+ARCHIVE_FILE = "archive.txt"
+INDEX_SUFFIX = ".idx"
+
+# New hashes kept in a set before they are merged into the sorted index
+MERGE_SIZE = 65536
+
+# Index header: the number of bytes of the text file it covers
+INDEX_HEADER = struct.Struct("<Q")
+
+
+def normalize_key(line):
+    """Return the archive entry of a line, or None if it is not one"""
+    parts = line.split()
+    if len(parts) != 2:
+        return None
+    return f"{parts[0].lower()} {parts[1]}"
+
+
+def url_key(url):
+    """Return the archive entry of a URL if it can be told without extraction, or None"""
+    match = YOUTUBE_ID_RE.search(url)
+    if match:
+        return f"youtube {match.group(1)}"
+    return None
+
+
+def info_key(info):
+    """Return the archive entry of an info dict or flat-playlist entry, or None"""
+    extractor = info.get("extractor_key") or info.get("ie_key")
+    if not extractor or not info.get("id"):
+        return None
+    return f"{extractor.lower()} {info['id']}"
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class DownloadArchive:
+    """Append-only archive of downloaded videos with a compact hash index"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), ARCHIVE_FILE)
+        self.index_path = self.path + INDEX_SUFFIX
+        self._lock = threading.Lock()
+        self._sorted = array.array("Q")
+        self._recent = set()
+        self._file = None
+        self._load()
+
+    def _load(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+
+        covered = 0
+        try:
+            with open(self.index_path, "rb") as f:
+                (covered,) = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                hashes = array.array("Q")
+                hashes.frombytes(f.read())
+            if covered <= size:
+                self._sorted = hashes
+            else:
+                # The archive was replaced or truncated; index it from scratch
+                covered = 0
+        except (OSError, struct.error, ValueError):
+            covered = 0
+
+        if covered < size:
+            with open(self.path, "rb") as f:
+                f.seek(covered)
+                for line in f:
+                    key = normalize_key(line.decode("utf-8", "replace"))
+                    if key is not None:
+                        self._recent.add(_hash(key))
+            self._merge()
+            self._save_index(size)
+
+    def __contains__(self, key):
+        if key is None:
+            return False
+        value = _hash(key)
+        with self._lock:
+            return self._has(value)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sorted) + len(self._recent)
+
+    def _has(self, value):
+        if value in self._recent:
+            return True
+        i = bisect.bisect_left(self._sorted, value)
+        return i < len(self._sorted) and self._sorted[i] == value
+
+    def add(self, key):
+        """Record a downloaded video; returns False if it was already archived"""
+        return self.add_many([key]) == 1
+
+    def add_many(self, keys):
+        """Record several entries at once, returns how many were new"""
+        with self._lock:
+            lines = []
+            for key in keys:
+                key = normalize_key(key or "")
+                if key is None:
+                    continue
+                value = _hash(key)
+                if not self._has(value):
+                    self._recent.add(value)
+                    lines.append(key + "\n")
+            if not lines:
+                return 0
+
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.writelines(lines)
+            self._file.flush()
+            if len(self._recent) >= MERGE_SIZE:
+                self._merge()
+            return len(lines)
+
+    def import_file(self, path):
+        """Import a yt-dlp ``--download-archive`` file, returns the number of new entries"""
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return self.add_many(f)
+
+    def _merge(self):
+        if self._recent:
+            self._sorted = array.array("Q", sorted(self._sorted.tolist() + list(self._recent)))
+            self._recent = set()
+
+    def _save_index(self, covered):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(INDEX_HEADER.pack(covered))
+                self._sorted.tofile(f)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            pass
+
+    def close(self):
+        """Close the archive file and save the index for a quick next start"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._merge()
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            self._save_index(size)
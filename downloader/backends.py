@@ -0,0 +1,243 @@
+"""Execution backends that run yt-dlp for the app
+
+Both backends take the same yt-dlp command line (``["yt-dlp", ...]``) so the
+command builder stays the single source of download options:
+
+* ``SubprocessBackend`` starts a fresh ``yt-dlp`` process per action, in a
+  process group of its own so a stop also ends the ffmpeg it started. It
+  only needs the yt-dlp executable and is the fallback.
+* ``WarmBackend`` hands the command to a pool of long-lived worker processes
+  that already imported ``yt_dlp`` and run it through the ``YoutubeDL`` API.
+"""
+import importlib.util
+import json
+import os
+import subprocess
+import time
+
+from .processes import read_output, spawn
+from .progress import ProgressRecord
+from .toolchain import executable_version
+
+# yt-dlp executable used by the subprocess backend
+YTDLP = os.environ.get("YTDLP_PATH", "yt-dlp")
+
+SUBPROCESS = "CLI (subprocess)"
+WARM = "Warm (yt_dlp API)"
+
+# Engine names on command lines and in the service API
+ENGINES = {"warm": WARM, "cli": SUBPROCESS}
+
+
+class BackendError(subprocess.SubprocessError):
+    """yt-dlp could not be run or reported a failure"""
+
+
+def warm_available():
+    """Return True if the yt_dlp package can be imported by warm workers"""
+    return importlib.util.find_spec("yt_dlp") is not None
+
+
+def default_engine():
+    return WARM if warm_available() else SUBPROCESS
+
+
+def record_stop_latency(job):
+    """Add the time a stopped job's process took to exit to its timings"""
+    latency = getattr(job.process, "stop_latency", None)
+    if latency is not None:
+        job.timings["stop"] = round(latency, 2)
+
+
+class SubprocessBackend:
+    """Runs every action in a new yt-dlp process"""
+
+    name = SUBPROCESS
+    # --limit-rate is fixed when yt-dlp starts
+    live_rate_limit = False
+
+    def __init__(self, executable=None):
+        self.executable = executable or YTDLP
+
+    def _argv(self, cmd):
+        return [self.executable] + list(cmd[1:])
+
+    def version(self):
+        """Return the yt-dlp version string, only running yt-dlp for a new or changed executable"""
+        _, version = executable_version(self.executable)
+        if version is None:
+            raise BackendError("yt-dlp not found or not working properly!")
+        return version
+
+    def dump_json(self, cmd, timeout=30):
+        """Run an info command and return its stdout"""
+        process = spawn(self._argv(cmd), stderr=subprocess.PIPE)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        if process.returncode != 0:
+            raise BackendError(stderr.decode("utf-8", "replace") if stderr else "Unknown error")
+        return stdout.decode("utf-8", "replace")
+
+    def download(self, job, cmd, on_line, on_progress=None):
+        """Run a download command, feeding each output line to ``on_line``
+
+        Returns the yt-dlp exit code. ``job.process`` is set while it runs so
+        the job can be stopped; ``job.stop_flag`` is also checked while the
+        output is quiet. Progress arrives as ``--progress-template`` lines,
+        so ``on_progress`` is not used here.
+        """
+        job.process = spawn(self._argv(cmd))
+        if job.stop_flag:
+            job.process.terminate()
+
+        # Parse output in real-time
+        read_output(job.process, on_line, lambda: job.stop_flag)
+        return_code = job.process.wait()
+        if hasattr(job, "timings"):
+            record_stop_latency(job)
+        return return_code
+
+    def dump_json_many(self, job, cmd, urls, on_result, timeout=None, parse=json.loads):
+        """Run a bulk info command, calling ``on_result(url, text, info, error)`` per URL as it completes
+
+        Each info line is parsed by ``parse`` as soon as it is complete and matched to
+        its URL by ``original_url``; an ``ERROR:`` line belongs to the first
+        URL without an answer, since yt-dlp takes them in order. The run is
+        stopped once no URL finished for ``timeout`` seconds. URLs left
+        without an answer are not reported; the caller decides what they are.
+        """
+        pending = list(urls)
+        last_answer = time.monotonic()
+
+        def on_output(line):
+            nonlocal last_answer
+            if line.startswith("{"):
+                try:
+                    info = parse(line)
+                except ValueError:
+                    return
+                if not isinstance(info, dict) or not pending:
+                    return
+                url = info.get("original_url")
+                if url not in pending:
+                    url = pending[0]
+                pending.remove(url)
+                on_result(url, line.rstrip("\n"), info, None)
+            elif line.startswith("ERROR:") and pending:
+                on_result(pending.pop(0), None, None, line[len("ERROR:"):].strip())
+            else:
+                return
+            last_answer = time.monotonic()
+
+        def should_stop():
+            return job.stop_flag or bool(timeout and time.monotonic() - last_answer > timeout)
+
+        job.process = spawn(self._argv(cmd))
+        read_output(job.process, on_output, should_stop)
+        return job.process.wait()
+
+    def flat_playlist(self, job, cmd, on_entry, on_line=None):
+        """Run a --flat-playlist --dump-json command, calling ``on_entry`` per entry as it is printed
+
+        ``job`` only needs ``process`` and ``stop_flag`` attributes.
+        """
+        last_error = None
+
+        def on_output(line):
+            nonlocal last_error
+            if line.startswith("{"):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if isinstance(entry, dict):
+                    on_entry(entry)
+                    return
+            if line.startswith("ERROR:"):
+                last_error = line.strip()
+            if on_line and line.strip():
+                on_line(line)
+
+        return_code = self.download(job, cmd, on_output)
+        if return_code != 0 and not job.stop_flag:
+            raise BackendError(last_error or f"yt-dlp exited with code {return_code}")
+        return return_code
+
+    def resize(self, size):
+        pass
+
+    def close(self):
+        pass
+
+
+class WarmBackend:
+    """Runs actions on a pool of prefork workers with yt_dlp already imported"""
+
+    name = WARM
+    # Workers read the rate limit from shared memory while downloading
+    live_rate_limit = True
+
+    def __init__(self, size=2):
+        # Imported here so the subprocess backend never pays for multiprocessing setup
+        from .warm_pool import WarmWorkerPool
+        self.pool = WarmWorkerPool(size)
+        self._version = None
+
+    def resize(self, size):
+        self.pool.resize(size)
+
+    def version(self):
+        # The workers keep the yt_dlp they imported, so one answer is enough
+        if self._version is None:
+            self._version = self.pool.call("version", None)
+        return self._version
+
+    def dump_json(self, cmd, timeout=30):
+        return self.pool.call("dump_json", list(cmd[1:]), timeout=timeout)
+
+    def download(self, job, cmd, on_line, on_progress=None):
+        def on_event(kind, data):
+            if kind == "log":
+                on_line(data)
+            elif kind == "progress" and on_progress:
+                on_progress(ProgressRecord.from_dict(data))
+
+        return_code = self.pool.call("download", list(cmd[1:]), on_event=on_event, job=job)
+        record_stop_latency(job)
+        return return_code
+
+    def dump_json_many(self, job, cmd, urls, on_result, timeout=None, parse=json.loads):
+        def on_event(kind, data):
+            if kind == "info":
+                url, text = data
+                on_result(url, text, parse(text), None)
+            elif kind == "info_error":
+                url, error = data
+                on_result(url, None, None, error)
+
+        # The worker answers URL by URL, so the budget is for the whole batch
+        return self.pool.call("dump_json_many", list(cmd[1:]), on_event=on_event, job=job,
+                              timeout=timeout * len(urls) if timeout else None)
+
+    def flat_playlist(self, job, cmd, on_entry, on_line=None):
+        def on_event(kind, data):
+            if kind == "entry":
+                on_entry(data)
+            elif kind == "log" and on_line:
+                on_line(data)
+
+        return self.pool.call("flat_playlist", list(cmd[1:]), on_event=on_event, job=job)
+
+    def close(self):
+        self.pool.close()
+
+
+def create_backend(engine, size=2):
+    """Create the backend for an engine name, falling back to the CLI"""
+    if engine == WARM and warm_available():
+        return WarmBackend(size)
+    return SubprocessBackend()
@@ -0,0 +1,222 @@
+"""Global bandwidth budget shared by the running downloads
+
+``BandwidthScheduler`` splits a total rate limit across the running jobs by
+weight (max-min fair sharing) and enforces each share as the job's yt-dlp
+rate limit. The measured speed of every job feeds back into the split: a
+job that stays well below its share (a slow server, a small file) is capped
+near what it actually uses and the rest goes to the jobs that can use it.
+The split is recomputed when jobs start or finish and every few seconds
+while they run.
+
+Warm workers pick up a new limit while downloading; the CLI engine can only
+pass ``--limit-rate`` when a job starts. So that the budget still holds, a
+CLI job's limit is fixed for its whole run: it is its fair share as if every
+download slot were busy, capped at what the other fixed limits leave, and the
+live shares are split from the rest. A budget lowered below the fixed limits
+of running CLI jobs is only met once they finish, which is logged.
+"""
+import re
+import threading
+import time
+
+# Seconds between rebalances triggered by progress reports
+REBALANCE_INTERVAL = 2.0
+
+# A job is considered to leave its share unused below this fraction of it...
+UNDERUSE_RATIO = 0.75
+# ...and is then capped at its measured speed plus this much headroom
+HEADROOM = 1.25
+# Seconds a job runs on a share before its speed is used to judge it
+SETTLE_TIME = 3.0
+# Smoothing of the measured speed
+SPEED_SMOOTHING = 0.3
+
+# No job is capped below this, in bytes per second
+MIN_SHARE = 32 * 1024
+
+# Shares that changed less than this fraction are not re-applied
+MIN_CHANGE = 0.05
+
+RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?\s*$", re.IGNORECASE)
+RATE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_rate(text):
+    """Parse a rate like ``500K`` or ``4.2M`` into bytes per second; empty means unlimited"""
+    if text is None or not str(text).strip() or str(text).strip().lower() in ("0", "unlimited"):
+        return None
+    match = RATE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid rate: {text!r}")
+    return float(match.group(1)) * RATE_UNITS[match.group(2).lower()]
+
+
+def fair_shares(budget, demands):
+    """Split ``budget`` by max-min fairness
+
+    ``demands`` maps a key to ``(weight, demand)``, where ``demand`` is the
+    most that key can use or None if it can use anything. Keys that need less
+    than their weighted share get what they need; the rest is split among the
+    others by weight.
+    """
+    shares = {}
+    active = dict(demands)
+    remaining = budget
+    while active:
+        per_weight = remaining / sum(weight for weight, _ in active.values())
+        capped = {
+            key: demand for key, (weight, demand) in active.items()
+            if demand is not None and demand < weight * per_weight
+        }
+        if not capped:
+            for key, (weight, _) in active.items():
+                shares[key] = weight * per_weight
+            break
+        for key, demand in capped.items():
+            shares[key] = demand
+            remaining -= demand
+            del active[key]
+    return shares
+
+
+class _Flow:
+    """Scheduler state of one running job"""
+
+    def __init__(self, job, live=True):
+        self.job = job
+        self.live = live  # the job's rate limit can change while it runs
+        self.fixed = False  # a limit that cannot change was applied
+        self.speed = None  # smoothed measured speed
+        self.share = None
+        self.share_since = time.monotonic()
+
+    def demand(self, now):
+        """Return the most this job seems able to use, or None if it could use more"""
+        if self.share is None or self.speed is None or now - self.share_since < SETTLE_TIME:
+            return None
+        if self.speed < self.share * UNDERUSE_RATIO:
+            return max(MIN_SHARE, self.speed * HEADROOM)
+        return None
+
+
+class BandwidthScheduler:
+    """Splits a global rate limit across running jobs and keeps the split current"""
+
+    def __init__(self, limit=None, slots=1, events=None):
+        self.limit = limit
+        self.slots = slots  # parallel downloads, for the shares of fixed limits
+        self.events = events
+        self._flows = {}
+        self._lock = threading.Lock()
+        self._last_rebalance = 0.0
+        self._over = False
+
+    def set_limit(self, limit):
+        """Change the global limit in bytes per second; None removes it"""
+        with self._lock:
+            self.limit = limit or None
+            self._rebalance()
+
+    def set_slots(self, slots):
+        """Change the number of parallel downloads"""
+        with self._lock:
+            self.slots = slots
+
+    def add(self, job, live=True):
+        """Start sharing the budget with a job, setting its ``rate_limit``
+
+        Without ``live`` the limit is set once and kept for the whole run.
+        """
+        with self._lock:
+            self._flows[job.job_id] = _Flow(job, live)
+            self._rebalance()
+
+    def remove(self, job):
+        """Stop sharing with a finished job and hand its share to the others"""
+        with self._lock:
+            if self._flows.pop(job.job_id, None) is not None:
+                self._rebalance()
+
+    def report(self, job, speed):
+        """Feed a measured speed of a job back into the split"""
+        with self._lock:
+            flow = self._flows.get(job.job_id)
+            if flow is None or speed is None:
+                return
+            if flow.speed is None:
+                flow.speed = speed
+            else:
+                flow.speed += SPEED_SMOOTHING * (speed - flow.speed)
+
+            if time.monotonic() - self._last_rebalance >= REBALANCE_INTERVAL:
+                self._rebalance()
+
+    def shares(self):
+        """Return the current share of every running job by job ID"""
+        with self._lock:
+            return {job_id: flow.share for job_id, flow in self._flows.items()}
+
+    def _rebalance(self):
+        now = time.monotonic()
+        self._last_rebalance = now
+        demands = {
+            job_id: (max(flow.job.weight, 0.01), flow.demand(now))
+            for job_id, flow in self._flows.items() if not flow.fixed
+        }
+
+        if not self.limit:
+            shares = dict.fromkeys(demands)
+        else:
+            shares = {}
+            committed = sum(flow.share or 0 for flow in self._flows.values() if flow.fixed)
+            new = [job_id for job_id in demands if not self._flows[job_id].live]
+            if new:
+                # Kept for the whole run: the fair share among all slots, as later
+                # jobs cannot take anything back from it
+                idle = max(0, self.slots - len(self._flows))
+                slots = dict(demands)
+                slots.update({("idle", i): (1.0, None) for i in range(idle)})
+                fair = fair_shares(max(0.0, self.limit - committed), slots)
+                for job_id in new:
+                    shares[job_id] = max(MIN_SHARE, min(fair[job_id], self.limit - committed))
+                    committed += shares[job_id]
+                    del demands[job_id]
+            if demands:
+                for job_id, share in fair_shares(max(0.0, self.limit - committed), demands).items():
+                    shares[job_id] = max(MIN_SHARE, share)
+
+        for job_id, share in shares.items():
+            flow = self._flows[job_id]
+            if not flow.live:
+                flow.fixed = True
+            elif share is not None and flow.share is not None and abs(share - flow.share) < flow.share * MIN_CHANGE:
+                continue
+            flow.share = share
+            flow.share_since = now
+            self._apply(flow.job, share)
+        self._check_budget()
+
+    def _check_budget(self):
+        """Log when fixed limits of running jobs push the total over the budget, and when that ends"""
+        fixed = [flow.share for flow in self._flows.values() if flow.fixed]
+        total = sum(flow.share or 0 for flow in self._flows.values())
+        over = bool(self.limit) and (None in fixed or total > self.limit * (1 + MIN_CHANGE))
+        if over == self._over:
+            return
+        self._over = over
+        if self.events is None:
+            return
+        if over:
+            rate = "without a limit" if None in fixed else f"at up to {total / 1024:.0f} KB/s"
+            self.events.put(("log", f"⚠️ Running downloads go {rate}, over the {self.limit / 1024:.0f} KB/s"
+                                    f" budget until the CLI downloads started before it finish"))
+        else:
+            self.events.put(("log", "🚦 Running downloads are within the bandwidth budget again"))
+
+    @staticmethod
+    def _apply(job, share):
+        """Set the job's rate limit, and change it live if its backend can"""
+        job.rate_limit = share
+        set_rate_limit = getattr(job.process, "set_rate_limit", None)
+        if set_rate_limit:
+            set_rate_limit(share)
@@ -0,0 +1,134 @@
+"""Video info for many URLs at once
+
+Extracting a list of URLs one yt-dlp run at a time pays the start-up for
+every URL. ``DownloaderCore.start_bulk_info()`` instead answers what the
+info cache has right away and hands the rest to the backend in batches of
+``BATCH_SIZE`` URLs per yt-dlp run (or warm worker task), on up to ``RUNS``
+runs at once. Every info document is parsed as soon as its line is
+complete, cached for the download, and reported as an ``InfoResult``; a URL
+that fails gets a result with its error and the batch goes on.
+
+A ``slim`` fetch has yt-dlp print only the fields an ``InfoResult`` needs
+(``SLIM_INFO_TEMPLATE``) instead of the whole info document, with its
+thumbnails, subtitles and per-format URLs and headers. That is a fraction
+of the output to pipe and parse per video, but nothing is cached for a
+download.
+"""
+import json
+import threading
+from dataclasses import asdict, dataclass, field
+
+from .formats import select_formats
+
+# URLs per yt-dlp run, and the runs going at once
+BATCH_SIZE = 50
+RUNS = 2
+
+# Seconds a run may go without finishing a URL before it is stopped
+URL_TIMEOUT = 60
+
+
+@dataclass
+class InfoResult:
+    """What the info of one URL says, or why there is none"""
+    url: str
+    title: str = None
+    uploader: str = None
+    duration: float = None
+    view_count: int = None
+    height: int = None  # of the best video format
+    framerates: list = field(default_factory=list)
+    formats: int = 0
+    selection: str = None  # the formats a download with the options would fetch
+    predicted_size: int = None
+    cached: bool = False
+    error: str = None
+
+    @classmethod
+    def from_info(cls, url, info, options=None, cached=False):
+        """Summarize an info dict; ``options`` are the download options to select formats for"""
+        formats = info.get("formats") or []
+        heights = [f["height"] for f in formats if f.get("height")]
+        framerates = sorted({int(f["fps"]) for f in formats if f.get("fps")}, reverse=True)
+        result = cls(
+            url=url,
+            title=info.get("title"),
+            uploader=info.get("uploader"),
+            duration=info.get("duration"),
+            view_count=info.get("view_count"),
+            height=max(heights) if heights else info.get("height"),
+            framerates=framerates,
+            formats=len(formats),
+            cached=cached,
+        )
+        if options:
+            selection = select_formats(info, options.get("quality"), options.get("framerate"),
+                                       options.get("format_ext"))
+            if selection is not None:
+                result.selection = selection.describe()
+                result.predicted_size = selection.size
+        return result
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in cls.__dataclass_fields__ if name in data})
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def parse_slim_info(text):
+    """Parse a line printed with ``SLIM_INFO_TEMPLATE`` into a slim info dict"""
+    document = json.loads(text)
+    if not isinstance(document, dict) or not isinstance(document.get("info"), dict):
+        return document
+    info = document["info"]
+    info["formats"] = document.get("formats") or []
+    return info
+
+
+class _Run:
+    """One yt-dlp run of a bulk fetch; stoppable like a download job"""
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.process = None
+
+    @property
+    def stop_flag(self):
+        return self.fetch.stop_flag
+
+
+class BulkInfoFetch:
+    """A running bulk info fetch"""
+
+    def __init__(self, urls, options=None, slim=False):
+        self.urls = list(urls)
+        self.options = options
+        self.slim = slim
+        self.stop_flag = False
+        self.runs = []
+        self.done = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def record(self, result):
+        """Count a result; runs report from their own threads"""
+        with self._lock:
+            self.done += 1
+            if result.error:
+                self.failed += 1
+
+    def new_run(self):
+        run = _Run(self)
+        self.runs.append(run)
+        return run
+
+    def stop(self):
+        self.stop_flag = True
+        for run in list(self.runs):
+            if run.process:
+                try:
+                    run.process.terminate()
+                except OSError:
+                    pass
@@ -0,0 +1,219 @@
+"""Headless batch downloader
+
+    python -m downloader urls.txt -j 4 -q 720p -f mp4 -o ~/Downloads
+    some-tool | python -m downloader -
+
+Reads one URL per line (blank lines and ``#`` comments are skipped),
+downloads them concurrently with the same core as the GUI and prints one
+JSON object per line on stdout::
+
+    {"event": "job", "job": 1, "url": "...", "title": null, "status": "Queued", ...}
+    {"event": "status", "job": 1, "status": "Downloading", "return_code": null}
+    {"event": "progress", "job": 1, "percent": 12.5, "downloaded_bytes": 1048576, ...}
+    {"event": "log", "job": 1, "message": "..."}
+    {"event": "error", "message": "..."}
+    {"event": "estimate", "remaining": 754.2, "jobs": 12, "unknown": 0}
+    {"event": "summary", "Completed": 3, "Failed": 1, "elapsed": 42.1}
+
+With ``--info`` nothing is downloaded; the URLs are extracted many per
+yt-dlp run and every one is reported as it completes::
+
+    {"event": "info", "url": "...", "title": "...", "duration": 212, "height": 1080, ...}
+    {"event": "info", "url": "...", "error": "Video unavailable", ...}
+    {"event": "summary", "urls": 2, "failed": 1, "elapsed": 3.4}
+
+yt-dlp prints only the fields these records need, unless ``--full-info``
+is given: then it prints whole info documents and they are kept in the info
+cache for downloading the videos later.
+
+``--sections "1:00-1:30, 1:02:00-"`` downloads only those time ranges of
+every video, each to a file of its own; a line of the URLs file can give
+its own sections after the URL (``https://... 10:00-12:30``). Cuts fall on
+keyframes unless ``--force-keyframes`` is given. Clips are neither skipped
+for nor recorded in the download archive.
+
+Progress is reported at most once per ``--interval`` per job, with the
+smoothed speed and ETA; ``estimate`` predicts when all jobs will be
+downloaded. ``--order shortest`` starts the jobs predicted to be shortest
+first. Log lines are
+only printed with ``--verbose``. Videos in the download archive are skipped
+unless ``--no-archive`` is given; ``--import-archive`` adds the entries of a
+yt-dlp ``--download-archive`` file to it first. Per-job timings are appended
+to the metrics directory (``jobs.jsonl`` and ``metrics.prom``) unless
+``--no-metrics`` is given. The exit status is 0 when
+every job completed or was skipped (with ``--info``, every URL was
+extracted) and 1 otherwise. Nothing here imports
+tkinter.
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+
+from .archive import DownloadArchive
+from .backends import ENGINES, default_engine
+from .bandwidth import parse_rate
+from .fragments import AUTO, parse_fragments
+from .commands import FORMAT_OPTIONS, FRAMERATE_OPTIONS, QUALITY_OPTIONS
+from .core import DEFAULT_WORKERS, DownloaderCore
+from .estimate import FIFO, ORDERS
+from .events import EventPump
+from .jobs import COMPLETED, SKIPPED
+from .metrics import MetricsCollector
+from .sections import parse_sections
+
+
+def read_urls(source):
+    """Return the URLs of a file object, one per line"""
+    return [url for url, _ in read_entries(source)]
+
+
+def read_entries(source):
+    """Return ``(url, sections or None)`` of a file object's lines, raising ValueError for bad sections"""
+    entries = []
+    for line in source:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        url, _, sections = line.strip().partition(" ")
+        entries.append((url, parse_sections(sections) if sections.strip() else None))
+    return entries
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m downloader",
+        description="Download a list of URLs concurrently and report progress as JSON lines."
+    )
+    parser.add_argument("urls_file", nargs="?", default="-",
+                        help="file with one URL per line, or - for stdin (default)")
+    parser.add_argument("-q", "--quality", default="1080p", choices=QUALITY_OPTIONS)
+    parser.add_argument("-r", "--framerate", default="Auto", choices=FRAMERATE_OPTIONS)
+    parser.add_argument("-f", "--format", dest="format_ext", default="mp4", choices=FORMAT_OPTIONS)
+    parser.add_argument("-o", "--output", default=os.path.expanduser("~/Downloads"),
+                        help="directory to save downloads to")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help="number of parallel downloads")
+    parser.add_argument("--engine", choices=sorted(ENGINES),
+                        help="run yt-dlp in warm worker processes or as one process per job")
+    parser.add_argument("--limit-rate", type=parse_rate, metavar="RATE",
+                        help="total bandwidth shared by all downloads, e.g. 500K or 4.2M")
+    parser.add_argument("--fragments", type=parse_fragments, default=AUTO, metavar="N",
+                        help="concurrent fragments of DASH/HLS downloads, or auto to tune them per host (default)")
+    parser.add_argument("--order", choices=ORDERS, default=FIFO,
+                        help="start queued jobs in submission order or the shortest predicted first")
+    parser.add_argument("--sections", type=parse_sections, metavar="RANGES",
+                        help="only download these time ranges, e.g. \"1:00-1:30, 1:02:00-\"")
+    parser.add_argument("--force-keyframes", action="store_true",
+                        help="cut sections exactly, re-encoding around the cuts")
+    parser.add_argument("--info", action="store_true",
+                        help="only fetch the information of the videos, many per yt-dlp run")
+    parser.add_argument("--full-info", action="store_true",
+                        help="with --info, fetch whole info documents and cache them for later downloads")
+    parser.add_argument("--no-archive", dest="archive", action="store_false",
+                        help="download videos even if they were downloaded before, and do not record them")
+    parser.add_argument("--import-archive", metavar="FILE",
+                        help="add the entries of a yt-dlp --download-archive file to the archive first")
+    parser.add_argument("--no-metrics", dest="metrics", action="store_false",
+                        help="do not record per-job timings in the metrics directory")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between progress reports")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also print yt-dlp log lines")
+    return parser
+
+
+class JsonLinesReporter:
+    """Prints the events of a DownloaderCore as JSON lines"""
+
+    def __init__(self, core, out=sys.stdout, verbose=False):
+        self.core = core
+        self.out = out
+        self.verbose = verbose
+
+    def emit(self, event, **fields):
+        self.out.write(json.dumps(dict(event=event, **fields), default=str) + "\n")
+
+    def report(self, batch):
+        for record in batch.records(self.core.manager.jobs, logs=self.verbose):
+            self.out.write(json.dumps(record, default=str) + "\n")
+        self.out.flush()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        if args.urls_file == "-":
+            entries = read_entries(sys.stdin)
+        else:
+            with open(args.urls_file, encoding="utf-8") as f:
+                entries = read_entries(f)
+    except ValueError as e:
+        sys.stderr.write(f"{e}\n")
+        return 2
+    except OSError as e:
+        # No core yet, the record is printed the way the reporter prints it
+        JsonLinesReporter(None).emit("error", message=f"Could not read {args.urls_file}: {e}")
+        return 1
+    urls = [url for url, _ in entries]
+
+    events = EventPump()
+    engine = ENGINES[args.engine] if args.engine else default_engine()
+    archive = DownloadArchive() if args.archive else None
+    metrics = MetricsCollector() if args.metrics else None
+    core = DownloaderCore(events, max_workers=args.workers, engine=engine, bandwidth_limit=args.limit_rate,
+                          fragments=args.fragments, archive=archive, metrics=metrics, order=args.order)
+    reporter = JsonLinesReporter(core, verbose=args.verbose)
+
+    if args.import_archive:
+        try:
+            imported = core.import_archive(args.import_archive)
+        except (OSError, ValueError) as e:
+            reporter.emit("error", message=f"Could not import the download archive: {e}")
+            core.close()
+            return 1
+        reporter.emit("archive", imported=imported, total=len(archive))
+
+    options = {
+        "quality": args.quality,
+        "framerate": args.framerate,
+        "format_ext": args.format_ext,
+        "output_path": args.output,
+    }
+    if args.sections or args.force_keyframes:
+        options.update(sections=args.sections, force_keyframes=args.force_keyframes)
+
+    started = time.monotonic()
+    try:
+        core.version()
+    except Exception as e:
+        reporter.emit("error", message=f"yt-dlp is not available: {e}")
+        core.close()
+        return 1
+
+    if args.info:
+        fetch = core.start_bulk_info(urls, options, slim=not args.full_info)
+    elif any(sections for _, sections in entries):
+        for url, sections in entries:
+            core.submit_urls([url], dict(options, sections=sections) if sections else options)
+    else:
+        core.submit_urls(urls, options)
+    try:
+        while core.busy:
+            time.sleep(args.interval)
+            reporter.report(events.drain())
+    except KeyboardInterrupt:
+        core.stop_all()
+        core.wait()
+    reporter.report(events.drain())
+
+    if args.info:
+        reporter.emit("summary", urls=fetch.done, failed=fetch.failed, elapsed=round(time.monotonic() - started, 1))
+        core.close()
+        return 0 if fetch.done == len(set(urls)) and not fetch.failed else 1
+
+    statuses = collections.Counter(job.status for job in core.manager.snapshot())
+    reporter.emit("summary", elapsed=round(time.monotonic() - started, 1), **statuses)
+    core.close()
+    return 0 if set(statuses) <= {COMPLETED, SKIPPED} else 1
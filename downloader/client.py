@@ -0,0 +1,287 @@
+"""Client for the local job service, shaped like DownloaderCore
+
+``ServiceClient`` offers the methods of ``DownloaderCore`` the GUI uses but
+runs everything on a ``downloader.service`` instance. Jobs are mirrored
+locally from the service's event stream and reported through ``events``
+exactly as the in-process core reports them, so the GUI does not need to
+know which one it talks to.
+"""
+import collections
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from .backends import BackendError
+from .bulk_info import InfoResult
+from .jobs import CONVERTING, FINISHED_STATES, QUEUED, RUNNING, DownloadJob
+from .progress import ProgressRecord
+from .toolchain import Toolchain
+from .service import DEFAULT_HOST, DEFAULT_PORT, KEEPALIVE_INTERVAL
+
+DEFAULT_SERVICE_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+# Seconds to wait for a request, and between reconnects of the event stream
+REQUEST_TIMEOUT = 10
+RECONNECT_DELAYS = (1, 2, 5, 10)
+
+JOB_FIELDS = ("url", "quality", "framerate", "format_ext", "output_path", "title")
+
+
+class ServiceError(BackendError):
+    """The job service could not be reached or rejected a request"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status  # HTTP status of a rejected request
+
+
+def request_json(base_url, method, path, data=None, timeout=REQUEST_TIMEOUT, raw=False):
+    """Send a request to a service and return ``(decoded JSON, response headers)``
+
+    With ``raw`` the response body is returned as text instead.
+    """
+    body = None if data is None else json.dumps(data).encode("utf-8")
+    req = urllib.request.Request(base_url + path, data=body, method=method)
+    if body is not None:
+        req.add_header("Content-Type", "application/json")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            text = response.read().decode("utf-8")
+            return (text if raw else json.loads(text)), response.headers
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read().decode("utf-8"))["error"]
+        except (ValueError, KeyError, TypeError):
+            message = f"{e.code} {e.reason}"
+        raise ServiceError(message, e.code)
+    except (urllib.error.URLError, OSError) as e:
+        raise ServiceError(f"Download service not reachable at {base_url}: {e}")
+
+
+class RemoteJobs:
+    """Local mirror of the service's jobs, shaped like DownloadManager"""
+
+    def __init__(self, client):
+        self.client = client
+        self.jobs = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def stop(self, job_id):
+        """Cancel a single job on the service"""
+        self.client.request("DELETE", f"/jobs/{job_id}")
+
+    def stop_all(self):
+        self.client.request("DELETE", "/jobs")
+
+    def forget_finished(self):
+        """Drop finished jobs from the local mirror; the service keeps them"""
+        with self._lock:
+            for job_id in [j.job_id for j in self.jobs.values() if j.finished]:
+                del self.jobs[job_id]
+
+    def snapshot(self):
+        """Return all mirrored jobs; safe to iterate while events arrive"""
+        with self._lock:
+            return list(self.jobs.values())
+
+    def get(self, job_id):
+        """Return the mirrored job, or None"""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def counts(self):
+        """Return (queued, running, finished) job counts"""
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return (
+            statuses.count(QUEUED),
+            statuses.count(RUNNING),
+            sum(1 for status in statuses if status in FINISHED_STATES),
+        )
+
+    @property
+    def busy(self):
+        with self._lock:
+            return any(job.status in (QUEUED, RUNNING, CONVERTING) for job in self.jobs.values())
+
+    def update(self, record):
+        """Apply a ``job`` event record, returns ``(job, created)``"""
+        job_id = record["job"]
+        with self._lock:
+            job = self.jobs.get(job_id)
+            created = job is None
+            if created:
+                job = DownloadJob(job_id=job_id, **{name: record.get(name) for name in JOB_FIELDS})
+                self.jobs[job_id] = job
+        job.title = record.get("title") or job.title
+        job.status = record.get("status", job.status)
+        job.percent = record.get("percent") or 0.0
+        job.speed = record.get("speed") or 0.0
+        job.eta = record.get("eta")
+        job.return_code = record.get("return_code")
+        job.predicted_size = record.get("predicted_size") or job.predicted_size
+        return job, created
+
+
+class ServiceClient:
+    """Talks to a running job service and reports its events like DownloaderCore"""
+
+    def __init__(self, base_url, events):
+        self.base_url = (base_url or DEFAULT_SERVICE_URL).rstrip("/")
+        self.events = events
+        self.manager = RemoteJobs(self)
+        self._closed = threading.Event()
+        self._response = None
+        self._thread = threading.Thread(target=self._listen, name="service-events", daemon=True)
+        self._thread.start()
+
+    def request(self, method, path, data=None, timeout=REQUEST_TIMEOUT, raw=False):
+        """Send a request and return ``(decoded JSON, response headers)``
+
+        With ``raw`` the response body is returned as text instead.
+        """
+        return request_json(self.base_url, method, path, data, timeout, raw)
+
+    def settings(self):
+        return self.request("GET", "/settings")[0]
+
+    def set_workers(self, count):
+        """Change the number of parallel downloads of the service"""
+        self.request("POST", "/settings", {"workers": int(count)})
+
+    def set_engine(self, engine):
+        """Switch the service's yt-dlp backend"""
+        return self.request("POST", "/settings", {"engine": engine})[0]["engine"]
+
+    def set_bandwidth_limit(self, limit):
+        """Change the service's global rate limit in bytes per second"""
+        self.request("POST", "/settings", {"bandwidth_limit": limit})
+
+    def set_fragments(self, fragments):
+        """Change the service's concurrent fragments, a number or ``auto``"""
+        self.request("POST", "/settings", {"fragments": fragments})
+
+    def set_order(self, order):
+        """Start the service's queued jobs in submission order or shortest first"""
+        self.request("POST", "/settings", {"order": order})
+
+    def import_archive(self, path):
+        """Send the entries of a yt-dlp ``--download-archive`` file to the service's archive"""
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        return self.request("POST", "/archive", {"text": text})[0]["imported"]
+
+    def version(self):
+        """Return the service's yt-dlp version, raising if it cannot be reached"""
+        return self.request("GET", "/version")[0]["version"]
+
+    def probe_toolchain(self):
+        """Return the service's Toolchain"""
+        try:
+            data = self.request("GET", "/version")[0]
+        except BackendError as e:
+            return Toolchain(error=str(e))
+        return Toolchain(engine=data.get("engine"), ytdlp_version=data.get("version"), ffmpeg=data.get("ffmpeg"),
+                         ffmpeg_version=data.get("ffmpeg_version"))
+
+    def fetch_info(self, url, timeout=30):
+        """Return ``(json_text, cached)`` with the info of a single video"""
+        query = urllib.parse.urlencode({"url": url})
+        text, headers = self.request("GET", f"/info?{query}", timeout=timeout, raw=True)
+        return text, headers.get("X-Cache") == "HIT"
+
+    def start_bulk_info(self, urls, options=None, slim=False):
+        """Have the service fetch the info of many URLs; the results arrive as events
+
+        Returns None, as the fetch runs on the service and cannot be stopped from here.
+        """
+        self.request("POST", "/info", {"urls": list(urls), "options": options, "slim": slim})
+
+    def submit_urls(self, urls, options):
+        """Queue the URLs on the service; the jobs arrive as events"""
+        return self.request("POST", "/jobs", dict(options, urls=list(urls)))[0]["jobs"]
+
+    def stop_all(self):
+        self.manager.stop_all()
+
+    def resume_unfinished(self):
+        """The service resumes its own unfinished jobs when it starts"""
+        return []
+
+    def close(self):
+        self._closed.set()
+        response = self._response
+        if response is not None:
+            response.close()
+
+    def _listen(self):
+        """Follow the event stream, reconnecting whenever it drops"""
+        failures = 0
+        while not self._closed.is_set():
+            try:
+                self._response = urllib.request.urlopen(
+                    self.base_url + "/events?logs=1", timeout=KEEPALIVE_INTERVAL * 2
+                )
+                self.events.put(("log", f"🌐 Connected to download service at {self.base_url}"))
+                failures = 0
+                self._read_stream(self._response)
+            except (urllib.error.URLError, OSError, ValueError):
+                pass
+            finally:
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+
+            if self._closed.is_set():
+                break
+            if failures == 0:
+                self.events.put(("log", f"🔌 Lost connection to download service at {self.base_url}, retrying..."))
+            self._closed.wait(RECONNECT_DELAYS[min(failures, len(RECONNECT_DELAYS) - 1)])
+            failures += 1
+
+    def _read_stream(self, response):
+        """Apply server-sent events until the stream ends"""
+        data_lines = []
+        for raw in response:
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+            elif not line and data_lines:
+                self._apply(json.loads("\n".join(data_lines)))
+                data_lines = []
+
+    def _apply(self, record):
+        """Report an event record from the service as a core event"""
+        event = record.get("event")
+        job_id = record.get("job")
+        job = self.manager.get(job_id)
+
+        if event == "job":
+            job, created = self.manager.update(record)
+            self.events.put(("new_job", job) if created else ("job_status", (job_id, job.status)))
+        elif event == "status" and job is not None:
+            job.status = record["status"]
+            job.return_code = record.get("return_code")
+            self.events.put(("job_status", (job_id, job.status)))
+        elif event == "progress" and job is not None:
+            progress = ProgressRecord(**{
+                name: value for name, value in record.items() if name not in ("event", "job", "percent")
+            })
+            job.progress = progress
+            job.percent = progress.percent
+            job.speed = progress.speed or 0
+            job.eta = progress.eta_str
+            self.events.put(("progress", (job_id, progress)))
+        elif event == "log":
+            if job_id is None:
+                self.events.put(("log", record["message"]))
+            else:
+                self.events.put(("job_log", (job_id, record["message"])))
+        elif event == "error":
+            self.events.put(("error", record["message"]))
+        elif event in ("pipeline", "estimate"):
+            self.events.put((event, {name: value for name, value in record.items() if name != "event"}))
+        elif event == "info":
+            self.events.put(("info_result", InfoResult.from_dict(record)))
@@ -0,0 +1,144 @@
+"""yt-dlp command lines used by the app
+
+Commands are built as ``["yt-dlp", ...]`` lists; the backends substitute the
+real executable or hand the arguments to a warm worker.
+"""
+import os
+
+from .progress import PROGRESS_TEMPLATE
+from .sections import SECTION_SUFFIX, section_args
+
+# Choices offered for a download
+QUALITY_OPTIONS = ["Best Quality (Highest Bitrate)", "1080p", "720p", "480p", "360p", "Audio Only"]
+FRAMERATE_OPTIONS = ["Auto", "Highest", "60", "30", "24"]
+FORMAT_OPTIONS = ["mp4", "webm", "mkv", "avi", "flv", "wav", "mp3", "m4a", "flac"]
+
+AUDIO_FORMATS = ["mp3", "wav", "m4a", "flac"]
+
+# The fields of a slim info document: what the info summary and format
+# selection read, out of an info dict that can run to megabytes
+SLIM_INFO_FIELDS = ("id", "title", "uploader", "duration", "view_count", "height", "fps", "extractor",
+                    "extractor_key", "webpage_url", "original_url")
+SLIM_FORMAT_FIELDS = ("format_id", "ext", "vcodec", "acodec", "height", "width", "fps", "tbr", "vbr", "abr",
+                      "filesize", "filesize_approx")
+
+# yt-dlp cannot project nested fields in one template field, so the formats
+# come separately and bulk_info.parse_slim_info() puts them back in
+SLIM_INFO_TEMPLATE = (
+    f'{{"info": %(.{{{",".join(SLIM_INFO_FIELDS)}}})j, '
+    f'"formats": %(formats.:.{{{",".join(SLIM_FORMAT_FIELDS)}}}|[])j}}'
+)
+
+
+def build_info_command(url):
+    """Command that prints the info JSON of a single video"""
+    return ["yt-dlp", "--dump-json", "--no-playlist", url]
+
+
+def build_bulk_info_command(urls, slim=False):
+    """Command that prints the info JSON of several videos, one per line, going on past failures
+
+    With ``slim`` only the fields of ``SLIM_INFO_TEMPLATE`` are printed.
+    """
+    output = ["-O", SLIM_INFO_TEMPLATE] if slim else ["--dump-json"]
+    return ["yt-dlp"] + output + ["--no-playlist", "--ignore-errors", "--"] + list(urls)
+
+
+def build_flat_playlist_command(url):
+    """Command that lists a playlist or channel, one JSON entry per line, without extracting the entries"""
+    return ["yt-dlp", "--flat-playlist", "--dump-json", url]
+
+
+def build_download_command(job, info_json=None, info_template=None, filepath_file=None):
+    """Build yt-dlp command based on the job's options
+
+    ``info_json`` is a previously extracted info file to download from
+    instead of the URL; ``info_template`` is an ``infojson:`` output
+    template the extracted info should be written to. The path of the
+    downloaded file is written to ``filepath_file`` if one is given.
+    """
+    output_template = os.path.join(job.output_path, '%(title)s' + (SECTION_SUFFIX if job.sections else '') + '.%(ext)s')
+
+    # Base command; progress is reported as one JSON object per line
+    cmd = ["yt-dlp", "-o", output_template, "--newline", "--progress",
+           "--progress-template", PROGRESS_TEMPLATE]
+
+    # Resume .part files left behind by a stopped or interrupted run
+    cmd.append("--continue")
+
+    # A job is one video, also when its URL names the list it was found in
+    cmd.append("--no-playlist")
+
+    # Fetch DASH/HLS fragments in parallel
+    if job.fragments and job.fragments > 1:
+        cmd.extend(["--concurrent-fragments", str(job.fragments)])
+
+    # The job's share of the bandwidth budget
+    if job.rate_limit:
+        cmd.extend(["--limit-rate", str(int(job.rate_limit))])
+
+    if info_template:
+        cmd.extend(["--write-info-json", "-o", info_template])
+
+    # Only the sections' fragments or byte ranges are fetched
+    if job.sections:
+        cmd.extend(section_args(job.sections))
+        if job.force_keyframes:
+            cmd.append("--force-keyframes-at-cuts")
+
+    # Formats resolved from the extracted info, otherwise filters for yt-dlp
+    spec, extra = format_options(job.quality, job.framerate, job.format_ext)
+    if job.convert_to:
+        # Converted by the post-processing stage instead of inline
+        extra = []
+    cmd.extend(["-f", job.format_id or spec] + extra)
+
+    if filepath_file:
+        cmd.extend(["--print-to-file", "after_move:filepath", filepath_file])
+
+    # Merge separate video and audio streams straight into the target container
+    if job.container:
+        cmd.extend(["--merge-output-format", job.container])
+
+    # Add URL, or the info extracted from it earlier
+    if info_json:
+        cmd.extend(["--load-info-json", info_json])
+    else:
+        cmd.append(job.url)
+
+    return cmd
+
+
+def format_options(quality, framerate, format_ext):
+    """Return ``(format_spec, extra_args)``: yt-dlp format filters for the options
+
+    Used when the formats could not be resolved locally with
+    ``formats.select_formats``; the extra arguments convert audio.
+    """
+    # Build format string based on framerate selection
+    if framerate == "Highest":
+        framerate_filter = "[fps>30]"  # Prefer higher than 30fps
+    elif framerate == "60":
+        framerate_filter = "[fps=60]"
+    elif framerate == "30":
+        framerate_filter = "[fps=30]"
+    elif framerate == "24":
+        framerate_filter = "[fps=24]"
+    else:  # Auto
+        framerate_filter = ""
+
+    if quality == "Audio Only":
+        return "bestaudio", ["-x", "--audio-format", "mp3"]
+    if format_ext in AUDIO_FORMATS:
+        return "bestaudio", ["-x", "--audio-format", format_ext]
+
+    if quality == "Best Quality (Highest Bitrate)":
+        if framerate_filter:
+            return f"bestvideo{framerate_filter}+bestaudio/best{framerate_filter}", []
+        return "best", []
+
+    # For specific resolutions, try to get the best video with that resolution
+    resolution = quality.replace("p", "")
+    if framerate_filter:
+        return f"bestvideo[height<={resolution}]{framerate_filter}+bestaudio/best[height<={resolution}]{framerate_filter}", []
+    return f"bestvideo[height<={resolution}]+bestaudio/best[height<={resolution}]", []
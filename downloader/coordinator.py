@@ -0,0 +1,377 @@
+"""Job queue shared by download workers on any number of hosts
+
+    python -m downloader.coordinator --host 0.0.0.0 --port 8643
+    python -m downloader.worker http://coordinator:8643 -j 4    # on every host
+
+One machine's network link and disk cap how fast a single service can
+download. The coordinator only holds the queue: jobs are submitted to it
+with the same options as to the job service, and ``downloader.worker``
+processes lease them one at a time, highest ``priority`` first, download
+them with their own DownloaderCore and report back. A lease lasts
+``--lease`` seconds and is renewed by every heartbeat, which also carries the job's progress; a lease
+that runs out because its worker died or lost the network puts the job
+back at the front of the queue for another worker, up to ``--attempts``
+times. yt-dlp continues the ``.part`` file when the workers write to shared
+storage.
+
+    GET    /jobs                 {"jobs": [job, ...]}, each with its "worker" and "attempts"
+    POST   /jobs                 {"urls": [...], "quality": ..., ...} as for the job service
+    GET    /jobs/<id>            job
+    DELETE /jobs/<id>            cancel one job; a leased one is stopped by its worker
+    DELETE /jobs                 cancel all jobs
+    GET    /workers              {"workers": [{"worker": "...", "jobs": [1, 2], "last_seen": 0.4}, ...]}
+    POST   /leases               {"worker": "host-1234"} -> {"lease": "...", "ttl": 30, "job": job},
+                                 or {"lease": null, "leased": 3} when nothing is queued, with the
+                                 number of jobs other workers still hold
+    POST   /leases/<lease>       heartbeat {"status": "Downloading", "percent": 12.5, "speed": ..., "eta": ...,
+                                 "title": ..., "predicted_size": ...} -> {"ttl": 30, "cancel": false}
+    POST   /leases/<lease>/done  {"status": "Completed", "return_code": 0}
+    DELETE /leases/<lease>       give a job back unfinished, e.g. when a worker shuts down
+
+A heartbeat or report for a lease that ran out answers 410: the job may
+already be running elsewhere, so the worker stops it. Playlist URLs are
+rejected, since a lease covers one video. Jobs are journaled and the
+unfinished ones are queued again when the coordinator restarts, unless
+``--no-resume`` is given. Like the job service it has no authentication,
+so only listen on a network the workers and clients can be trusted on.
+"""
+import argparse
+import collections
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from http import HTTPStatus
+
+from .jobs import CONVERTING, ERROR, FINISHED_STATES, QUEUED, RUNNING, STOPPED, DownloadJob
+from .journal import JobJournal
+from .paths import data_dir
+from .playlist import is_playlist_url
+from .service import (
+    DEFAULT_HOST, RequestError, ServiceRequestHandler, ServiceServer, parse_job_options, request_urls
+)
+
+DEFAULT_PORT = 8643
+COORDINATOR_JOURNAL_FILE = "coordinator.sqlite3"
+
+# Seconds a lease lasts without a heartbeat
+LEASE_SECONDS = 30
+
+# Leases a job may lose before it is given up
+MAX_ATTEMPTS = 3
+
+# Progress fields a heartbeat may update with their types, and the states it may report
+HEARTBEAT_FIELDS = {
+    "percent": (int, float),
+    "speed": (int, float),
+    "eta": str,
+    "title": str,
+    "predicted_size": (int, float),
+}
+HEARTBEAT_STATES = (RUNNING, CONVERTING)
+
+
+@dataclass
+class Lease:
+    """A job handed to a worker until ``expires``"""
+    token: str
+    job: DownloadJob
+    worker: str
+    expires: float
+    cancel: bool = False
+
+
+class Coordinator:
+    """The queue of jobs and the leases of the workers downloading them"""
+
+    def __init__(self, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, default_output=None, journal=None):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.default_output = default_output
+        self.journal = journal
+        self.jobs = collections.OrderedDict()
+        self.leases = {}
+        self._job_leases = {}  # job ID -> its lease
+        self.workers = {}  # worker name -> time of its last request
+        self._queue = collections.deque()
+        self._attempts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def resume_unfinished(self):
+        """Queue the jobs the journal has as unfinished, returns how many"""
+        if not self.journal:
+            return 0
+        unfinished = self.journal.unfinished()
+        with self._lock:
+            for journal_id, url, title, options in unfinished:
+                self._add(DownloadJob(url=url, title=title, journal_id=journal_id, **options))
+        return len(unfinished)
+
+    def submit(self, request):
+        """Queue the URLs of a submit request, returns the created jobs"""
+        urls = request_urls(request)
+        playlists = [url for url in urls if is_playlist_url(url)]
+        if playlists:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Playlist URLs cannot be leased, queue their videos: "
+                                                       f"{playlists[0]}")
+        options = parse_job_options(request, self.default_output)
+        with self._lock:
+            jobs = [self._add(DownloadJob(url=url, **options)) for url in urls]
+        return {"jobs": [self.job_record(job) for job in jobs]}
+
+    def _add(self, job):
+        if self.journal and job.journal_id is None:
+            self.journal.add(job)
+        self.jobs[job.job_id] = job
+        self._queue.append(job)
+        return job
+
+    def _set_status(self, job, status):
+        job.status = status
+        if self.journal:
+            self.journal.update(job)
+
+    def job_record(self, job):
+        """A job as the API returns it"""
+        lease = self._lease_of(job)
+        return dict(job.to_dict(), worker=lease.worker if lease else None, attempts=self._attempts[job.job_id])
+
+    def _lease_of(self, job):
+        return self._job_leases.get(job.job_id)
+
+    def _end_lease(self, lease):
+        del self.leases[lease.token]
+        del self._job_leases[lease.job.job_id]
+
+    def job(self, job_id):
+        with self._lock:
+            self._expire()
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"No job {job_id}")
+            return self.job_record(job)
+
+    def list_jobs(self):
+        with self._lock:
+            self._expire()
+            return {"jobs": [self.job_record(job) for job in self.jobs.values()]}
+
+    def list_workers(self):
+        now = time.monotonic()
+        with self._lock:
+            self._expire()
+            jobs = collections.defaultdict(list)
+            for lease in self.leases.values():
+                jobs[lease.worker].append(lease.job.job_id)
+            return {"workers": [{"worker": worker, "jobs": jobs[worker], "last_seen": round(now - seen, 1)}
+                                for worker, seen in self.workers.items()]}
+
+    def cancel(self, job_id):
+        """Stop a queued job now and a leased one at its next heartbeat"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"No job {job_id}")
+            self._cancel(job)
+            return self.job_record(job)
+
+    def cancel_all(self):
+        with self._lock:
+            for job in list(self.jobs.values()):
+                self._cancel(job)
+
+    def _cancel(self, job):
+        if job in self._queue:
+            self._queue.remove(job)
+            self._set_status(job, STOPPED)
+        else:
+            lease = self._lease_of(job)
+            if lease is not None:
+                lease.cancel = True
+
+    def lease(self, request):
+        """Hand the next queued job to the requesting worker"""
+        worker = request.get("worker")
+        if not isinstance(worker, str) or not worker:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Expected the worker's name in \"worker\"")
+        now = time.monotonic()
+        with self._lock:
+            self.workers[worker] = now
+            self._expire()
+            if not self._queue:
+                return {"lease": None, "leased": len(self.leases)}
+            # The first of the jobs with the highest priority
+            job = max(self._queue, key=lambda queued: queued.priority)
+            self._queue.remove(job)
+            lease = Lease(secrets.token_urlsafe(12), job, worker, now + self.lease_seconds)
+            self.leases[lease.token] = self._job_leases[job.job_id] = lease
+            self._attempts[job.job_id] += 1
+            self._set_status(job, RUNNING)
+            return {"lease": lease.token, "ttl": self.lease_seconds, "job": job.to_dict()}
+
+    def _held(self, token):
+        """Return a lease that has not run out; the lock has to be held"""
+        self._expire()
+        lease = self.leases.get(token)
+        if lease is None:
+            raise RequestError(HTTPStatus.GONE, "The lease ran out or is unknown")
+        self.workers[lease.worker] = time.monotonic()
+        return lease
+
+    def heartbeat(self, token, request):
+        """Renew a lease and take the job's progress from it"""
+        progress = {}
+        for name, types in HEARTBEAT_FIELDS.items():
+            value = request.get(name)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not isinstance(value, types):
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid {name}: {value!r}")
+            progress[name] = value
+        with self._lock:
+            lease = self._held(token)
+            lease.expires = time.monotonic() + self.lease_seconds
+            job = lease.job
+            for name, value in progress.items():
+                setattr(job, name, value)
+            if request.get("status") in HEARTBEAT_STATES and request["status"] != job.status:
+                self._set_status(job, request["status"])
+            return {"ttl": self.lease_seconds, "cancel": lease.cancel}
+
+    def done(self, token, request):
+        """Take the final status of a leased job"""
+        status = request.get("status")
+        if status not in FINISHED_STATES:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid status: {status!r}")
+        with self._lock:
+            lease = self._held(token)
+            self._end_lease(lease)
+            lease.job.return_code = request.get("return_code")
+            self._set_status(lease.job, status)
+            return self.job_record(lease.job)
+
+    def release(self, token):
+        """Queue a leased job again without counting the attempt"""
+        with self._lock:
+            lease = self._held(token)
+            self._end_lease(lease)
+            self._attempts[lease.job.job_id] -= 1
+            self._requeue(lease.job)
+            return self.job_record(lease.job)
+
+    def _requeue(self, job):
+        job.percent, job.speed, job.eta = 0.0, 0.0, None
+        self._set_status(job, QUEUED)
+        # It waited its turn once already
+        self._queue.appendleft(job)
+
+    def _expire(self):
+        """Queue the jobs of leases that ran out again; the lock has to be held"""
+        now = time.monotonic()
+        for lease in list(self.leases.values()):
+            if lease.expires > now:
+                continue
+            self._end_lease(lease)
+            job = lease.job
+            if lease.cancel:
+                self._set_status(job, STOPPED)
+            elif self._attempts[job.job_id] >= self.max_attempts:
+                self._set_status(job, ERROR)
+            else:
+                self._requeue(job)
+
+
+class CoordinatorRequestHandler(ServiceRequestHandler):
+    """Routes the HTTP API to the server's Coordinator"""
+
+    server_version = "py-youtube-coordinator"
+
+    @property
+    def coordinator(self):
+        return self.server.service
+
+    def get(self, segments, query):
+        if segments == ["jobs"]:
+            self.send_json(self.coordinator.list_jobs())
+        elif len(segments) == 2 and segments[0] == "jobs":
+            self.send_json(self.coordinator.job(self.job_id(segments[1])))
+        elif segments == ["workers"]:
+            self.send_json(self.coordinator.list_workers())
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+    def post(self, segments, query):
+        if segments == ["jobs"]:
+            self.send_json(self.coordinator.submit(self.read_json()), HTTPStatus.CREATED)
+        elif segments == ["leases"]:
+            self.send_json(self.coordinator.lease(self.read_json()))
+        elif len(segments) == 2 and segments[0] == "leases":
+            self.send_json(self.coordinator.heartbeat(segments[1], self.read_json()))
+        elif len(segments) == 3 and segments[0] == "leases" and segments[2] == "done":
+            self.send_json(self.coordinator.done(segments[1], self.read_json()))
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+    def delete(self, segments, query):
+        if segments == ["jobs"]:
+            self.coordinator.cancel_all()
+            self.send_json({"stopped": True})
+        elif len(segments) == 2 and segments[0] == "jobs":
+            self.send_json(self.coordinator.cancel(self.job_id(segments[1])), HTTPStatus.ACCEPTED)
+        elif len(segments) == 2 and segments[0] == "leases":
+            self.send_json(self.coordinator.release(segments[1]))
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+
+class CoordinatorServer(ServiceServer):
+    """HTTP server for a Coordinator"""
+
+    handler_class = CoordinatorRequestHandler
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m downloader.coordinator",
+        description="Hold a download queue that worker processes on any host lease jobs from."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("-o", "--output", help="directory for jobs that do not name one")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS, metavar="SECONDS",
+                        help=f"seconds a lease lasts without a heartbeat (default {LEASE_SECONDS})")
+    parser.add_argument("--attempts", type=int, default=MAX_ATTEMPTS,
+                        help=f"leases a job may lose before it is given up (default {MAX_ATTEMPTS})")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="do not journal jobs or queue the ones left unfinished by the last run")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    journal = JobJournal(os.path.join(data_dir(), COORDINATOR_JOURNAL_FILE)) if args.resume else None
+    coordinator = Coordinator(lease_seconds=args.lease, max_attempts=args.attempts, default_output=args.output,
+                              journal=journal)
+    resumed = coordinator.resume_unfinished()
+    server = CoordinatorServer((args.host, args.port), coordinator, verbose=args.verbose)
+
+    host, port = server.server_address[:2]
+    print(f"🌐 Download coordinator listening on http://{host}:{port}", flush=True)
+    if resumed:
+        print(f"♻️ Queued {resumed} unfinished jobs from the last run", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if journal:
+            journal.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(main())
@@ -0,0 +1,694 @@
+"""GUI-independent downloader core
+
+``DownloaderCore`` ties together the job pool, the yt-dlp backend, the info
+cache and playlist expansion. It never touches a UI: everything that happens
+is reported as ``(msg_type, data)`` events through ``events.put()``, where
+``events`` is usually an ``EventPump``:
+
+* ``("log", message)`` and ``("job_log", (job_id, message))``
+* ``("progress", (job_id, ProgressRecord))``
+* ``("new_job", job)`` and ``("job_status", (job_id, status))``
+* ``("error", message)``
+* ``("pipeline", stats)`` with the queue depth and stage timings of the
+  post-processing stage
+* ``("estimate", {"remaining": seconds, "jobs": n, "unknown": n})`` with the
+  predicted time until every running and queued job is downloaded
+* ``("info_result", InfoResult)`` for every URL of a bulk info fetch
+
+With a ``JobJournal`` every job and state change is journaled, and
+``resume_unfinished()`` queues the jobs an earlier run left unfinished.
+With a ``DownloadArchive`` videos downloaded before are skipped: by URL or
+playlist entry before anything is extracted, otherwise once their info is.
+Jobs with ``sections`` download clips: they are neither skipped for nor
+recorded in the archive.
+With a ``MetricsCollector`` the timings of every job are recorded and
+exported when it finishes. Queued jobs start by ``priority``, and a
+``HostLimiter`` keeps the downloads from a site that throttles below its
+current limit and retries the jobs it failed after a backoff.
+"""
+import concurrent.futures
+import dataclasses
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .archive import info_key, url_key
+from .backends import create_backend, default_engine
+from .bandwidth import BandwidthScheduler
+from .bulk_info import BATCH_SIZE, RUNS, URL_TIMEOUT, BulkInfoFetch, InfoResult, parse_slim_info
+from .fragments import AUTO, FragmentTuner
+from .formats import select_formats
+from .commands import (
+    build_bulk_info_command,
+    build_download_command,
+    build_flat_playlist_command,
+    build_info_command,
+)
+from .estimate import FIFO, SHORTEST_FIRST, ThroughputEstimator
+from .info_cache import DEFAULT_PREFETCH_WORKERS, InfoCache, InfoPrefetcher
+from .jobs import COMPLETED, CONVERTING, ERROR, FAILED, QUEUED, RUNNING, SKIPPED, STOPPED, DownloadJob, DownloadManager
+from .playlist import PlaylistExpansion, entry_url, is_playlist_url
+from .postprocess import PostProcessor, target_format
+from .progress import ProgressRecord, parse_progress_line
+from .sections import format_sections
+from .throttle import MAX_RETRIES, HostLimiter
+from .toolchain import Toolchain, ffmpeg_version
+
+DEFAULT_WORKERS = 3
+
+# Seconds between queue-wide estimates
+ESTIMATE_INTERVAL = 1.0
+
+# Queued jobs whose info is extracted ahead of their download; further ahead
+# the cached info would be evicted or its stream URLs expire before it is used
+PREFETCH_AHEAD = 4
+
+
+class DownloaderCore:
+    """Runs download jobs and reports what happens as events"""
+
+    def __init__(self, events, max_workers=DEFAULT_WORKERS, engine=None, info_cache=None, journal=None,
+                 bandwidth_limit=None, fragments=AUTO, archive=None, convert_workers=None,
+                 metrics=None, order=FIFO):
+        self.events = events
+
+        # Persistent record of jobs, so unfinished ones survive a restart
+        self.journal = journal
+        self.closing = False
+
+        # Videos downloaded before, which are not downloaded again
+        self.archive = archive
+
+        # Per-job timings, exported as JSON lines and Prometheus metrics
+        self.metrics = metrics
+
+        # Extracted video info shared by info fetches and downloads
+        self.info_cache = info_cache or InfoCache()
+
+        # Per-host concurrency limits that back off when a site throttles
+        self.host_limiter = HostLimiter(events)
+
+        # Bounded pool of download workers, one yt-dlp run per job
+        self.manager = DownloadManager(
+            self.run_job,
+            max_workers=max_workers,
+            on_status=self.on_status,
+            limiter=self.host_limiter
+        )
+
+        # Smoothed speeds, per-host history and the predictions built on them
+        self.estimator = ThroughputEstimator()
+        self.order = FIFO
+        self.set_order(order)
+        self.last_estimate = 0.0
+
+        # Conversions run on their own pool so they do not hold download slots
+        self.postprocessor = PostProcessor(events, self.on_converted, workers=convert_workers)
+
+        # Global rate limit split across the running jobs
+        self.bandwidth = BandwidthScheduler(bandwidth_limit, slots=max_workers, events=events)
+
+        # Concurrent fragments per job: a fixed number, or AUTO to tune them per host
+        self.fragments = fragments
+        self.fragment_tuner = FragmentTuner()
+
+        # yt-dlp execution backend
+        self.backend = create_backend(engine or default_engine(), size=self.backend_size())
+
+        # Playlist listings and bulk info fetches in progress, and extraction
+        # running ahead of the downloads of the next queued jobs
+        self.expansions = set()
+        self.info_fetches = set()
+        self.prefetcher = InfoPrefetcher(self.info_cache, lambda: self.backend)
+
+    def backend_size(self):
+        """Warm workers needed: one per download plus the info prefetchers,
+        which also keep info fetches responsive"""
+        return self.manager.max_workers + DEFAULT_PREFETCH_WORKERS
+
+    def set_workers(self, count):
+        """Change the number of parallel downloads"""
+        self.manager.set_max_workers(count)
+        self.bandwidth.set_slots(count)
+        self.backend.resize(self.backend_size())
+
+    def set_engine(self, engine):
+        """Switch the yt-dlp backend; running jobs finish on the old one"""
+        old_backend = self.backend
+        self.backend = create_backend(engine, size=self.backend_size())
+        old_backend.close()
+        return self.backend.name
+
+    def set_bandwidth_limit(self, limit):
+        """Change the global rate limit in bytes per second; None removes it"""
+        self.bandwidth.set_limit(limit)
+
+    def set_fragments(self, fragments):
+        """Use a fixed number of concurrent fragments, or AUTO"""
+        self.fragments = fragments
+
+    def set_order(self, order):
+        """Start queued jobs in submission order (FIFO) or shortest predicted first"""
+        if order not in (FIFO, SHORTEST_FIRST):
+            raise ValueError(f"Invalid order: {order!r}")
+        self.order = order
+        self.manager.order = self.estimator.sort_key if order == SHORTEST_FIRST else None
+
+    def version(self):
+        """Return the yt-dlp version, raising if it cannot be run"""
+        return self.backend.version()
+
+    def probe_toolchain(self):
+        """Return the Toolchain: the backend's yt-dlp version and the ffmpeg conversions use"""
+        toolchain = Toolchain(engine=self.backend.name)
+        try:
+            toolchain.ytdlp_version = self.backend.version()
+        except Exception as e:
+            toolchain.error = str(e) or "yt-dlp not found or not working properly!"
+        toolchain.ffmpeg, toolchain.ffmpeg_version = ffmpeg_version(self.postprocessor.executable)
+        return toolchain
+
+    def fetch_info(self, url, timeout=30):
+        """Return ``(json_text, cached)`` with the info of a single video"""
+        text = self.info_cache.get_text(url)
+        if text is not None:
+            return text, True
+
+        cmd = build_info_command(url)
+        self.events.put(("log", f"Running command: {' '.join(cmd)}"))
+        text = self.backend.dump_json(cmd, timeout=timeout)
+        self.info_cache.put(url, text)
+        return text, False
+
+    def start_bulk_info(self, urls, options=None, slim=False):
+        """Fetch the info of many URLs on a background thread, reporting each as an InfoResult
+
+        ``options`` are download options; with them every result says which
+        formats a download would fetch. ``slim`` fetches only the fields the
+        results need and caches nothing.
+        """
+        fetch = BulkInfoFetch(urls, options, slim)
+        self.info_fetches.add(fetch)
+        thread = threading.Thread(target=self.fetch_bulk_info, args=(fetch,))
+        thread.daemon = True
+        thread.start()
+        return fetch
+
+    def fetch_bulk_info(self, fetch):
+        """Answer the cached URLs, then extract the others in batches"""
+        started = time.monotonic()
+        self.events.put(("log", f"🔍 Fetching information for {len(fetch.urls)} URLs"))
+        try:
+            missing = []
+            for url in dict.fromkeys(fetch.urls):
+                text = self.info_cache.get_text(url)
+                try:
+                    info = json.loads(text) if text is not None else None
+                except ValueError:
+                    info = None
+                if info is None:
+                    missing.append(url)
+                else:
+                    self.report_info(fetch, InfoResult.from_info(url, info, fetch.options, cached=True))
+
+            batches = [missing[i:i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+            with concurrent.futures.ThreadPoolExecutor(RUNS, thread_name_prefix="bulk-info") as executor:
+                for _ in executor.map(lambda batch: self.fetch_info_batch(fetch, batch), batches):
+                    pass
+
+            if fetch.stop_flag:
+                self.events.put(("log", f"⏹️ Info fetch stopped after {fetch.done} URLs"))
+            else:
+                failed = f", {fetch.failed} failed" if fetch.failed else ""
+                self.events.put(("log", f"🔍 Fetched information for {fetch.done} URLs{failed}"
+                                        f" in {time.monotonic() - started:.1f}s"))
+        except Exception as e:
+            self.events.put(("error", f"Failed to fetch video information: {str(e)}"))
+        finally:
+            self.info_fetches.discard(fetch)
+
+    def fetch_info_batch(self, fetch, urls):
+        """Extract a batch of URLs in one yt-dlp run; a URL that fails does not stop the others"""
+        if fetch.stop_flag:
+            return
+        answered = set()
+
+        def on_result(url, text, info, error):
+            answered.add(url)
+            if info is None:
+                self.report_info(fetch, InfoResult(url=url, error=error))
+                return
+            if not fetch.slim:
+                self.info_cache.put(url, text)
+            self.report_info(fetch, InfoResult.from_info(url, info, fetch.options))
+
+        run = fetch.new_run()
+        error = "yt-dlp gave no information"
+        try:
+            self.backend.dump_json_many(run, build_bulk_info_command(urls, fetch.slim), urls, on_result,
+                                        timeout=URL_TIMEOUT, parse=parse_slim_info if fetch.slim else json.loads)
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+        finally:
+            fetch.runs.remove(run)
+        if not fetch.stop_flag:
+            for url in urls:
+                if url not in answered:
+                    self.report_info(fetch, InfoResult(url=url, error=error))
+
+    def report_info(self, fetch, result):
+        fetch.record(result)
+        if result.error:
+            self.events.put(("log", f"❌ {result.url}: {result.error}"))
+        self.events.put(("info_result", result))
+
+    def submit_urls(self, urls, options):
+        """Queue one job per URL; playlist and channel URLs are expanded in the background
+
+        ``options`` are the DownloadJob fields shared by all jobs (quality,
+        framerate, format_ext, output_path, priority).
+        """
+        jobs = []
+        for url in urls:
+            if is_playlist_url(url):
+                self.start_expansion(url, options)
+            elif options.get("sections") or not self.archived(url_key(url), url):
+                jobs.append(self.add_job(url, options))
+        return jobs
+
+    def archived(self, key, name):
+        """Return True, and say so, if the archive has the video"""
+        if self.archive is None or key not in self.archive:
+            return False
+        self.events.put(("log", f"⏭️ Already downloaded, skipping: {name}"))
+        return True
+
+    def import_archive(self, path):
+        """Add the entries of a yt-dlp ``--download-archive`` file, returns how many were new"""
+        if self.archive is None:
+            raise ValueError("The download archive is disabled")
+        return self.archive.import_file(path)
+
+    def add_job(self, url, options, title=None, journal_id=None, duration=None):
+        """Create a job and hand it to the pool"""
+        job = DownloadJob(url=url, title=title, journal_id=journal_id, duration=duration, **options)
+        if self.journal and journal_id is None:
+            self.journal.add(job)
+        if self.metrics is not None:
+            self.metrics.queued(job)
+        self.events.put(("new_job", job))
+        self.manager.submit(job)
+        self.prefetch_upcoming()
+        return job
+
+    def prefetch_upcoming(self):
+        """Extract the info of the next queued jobs while earlier ones download"""
+        for job in self.manager.queued_jobs()[:PREFETCH_AHEAD]:
+            self.prefetcher.prefetch(job.url)
+
+    def resume_unfinished(self):
+        """Queue the jobs the journal has as queued or running, returns them
+
+        Their ``.part`` files are continued by yt-dlp.
+        """
+        if not self.journal:
+            return []
+        unfinished = self.journal.unfinished()
+        if unfinished:
+            self.events.put(("log", f"♻️ Resuming {len(unfinished)} unfinished downloads from the last session"))
+        return [
+            self.add_job(url, options, title=title, journal_id=journal_id)
+            for journal_id, url, title, options in unfinished
+        ]
+
+    def on_status(self, job):
+        """Journal and report a job's state change"""
+        # Jobs interrupted by closing the app stay unfinished in the journal
+        if self.journal and not self.closing:
+            self.journal.update(job)
+        self.events.put(("job_status", (job.job_id, job.status)))
+        if self.metrics is not None and job.finished:
+            self.metrics.finished(job)
+        if job.status == STOPPED:
+            self.prefetcher.cancel(job.url)
+        elif job.status == RUNNING:
+            # A job left the queue, the next one moves into the prefetch window
+            self.prefetch_upcoming()
+        self.report_estimate()
+
+    def start_expansion(self, url, options):
+        """List a playlist on a background thread, queueing entries as they arrive"""
+        expansion = PlaylistExpansion(url)
+        self.expansions.add(expansion)
+        thread = threading.Thread(target=self.expand_playlist, args=(expansion, options))
+        thread.daemon = True
+        thread.start()
+        return expansion
+
+    def expand_playlist(self, expansion, options):
+        """List a playlist and queue each entry as soon as it is parsed"""
+        def on_entry(entry):
+            url = entry_url(entry)
+            if not options.get("sections") and self.archived(info_key(entry), entry.get("title") or url):
+                expansion.skipped += 1
+                return
+            self.add_job(url, options, title=entry.get("title"), duration=entry.get("duration"))
+            expansion.count += 1
+
+        def on_line(line):
+            self.events.put(("log", f"📃 {line.strip()}"))
+
+        self.events.put(("log", f"📃 Listing playlist: {expansion.url}"))
+        try:
+            self.backend.flat_playlist(expansion, build_flat_playlist_command(expansion.url), on_entry, on_line)
+            if expansion.stop_flag:
+                self.events.put(("log", f"⏹️ Playlist listing stopped after {expansion.count} videos"))
+            else:
+                skipped = f", skipped {expansion.skipped} already downloaded" if expansion.skipped else ""
+                self.events.put(("log", f"📃 Queued {expansion.count} videos from {expansion.url}{skipped}"))
+        except Exception as e:
+            self.events.put(("error", f"Failed to list playlist: {str(e)}"))
+        finally:
+            self.expansions.discard(expansion)
+
+    @property
+    def busy(self):
+        return bool(self.expansions or self.info_fetches) or self.manager.busy or self.postprocessor.busy
+
+    def wait(self, timeout=None):
+        """Block until all listings, info fetches, jobs and conversions are done"""
+        while self.expansions or self.info_fetches:
+            time.sleep(0.1)
+        return self.manager.wait(timeout) and self.postprocessor.wait(timeout)
+
+    def run_job(self, job):
+        """Worker for downloading a single job, returns the final job status
+
+        Jobs that need a conversion return CONVERTING once downloaded and
+        get their final status from ``on_converted()``. Jobs that failed
+        because their host throttled them, or with a transient error, return
+        QUEUED to be retried after a backoff.
+        """
+        def log(message):
+            self.events.put(("job_log", (job.job_id, message)))
+
+        filepath_file = None
+        self.estimator.start(job)
+        try:
+            # A playlist entry may already be extracting ahead of its download
+            self.prefetcher.wait(job.url)
+
+            log("=" * 50)
+            log(f"🚀 Starting download: {job.url}")
+            log(f"⚙️ Quality: {job.quality}")
+            log(f"🎬 Framerate: {job.framerate}")
+            log(f"📦 Format: {job.format_ext}")
+            log(f"📁 Output: {job.output_path}")
+            if job.sections:
+                log(f"✂️ Sections: {format_sections(job.sections)}" + (" (exact cuts)" if job.force_keyframes else ""))
+
+            def on_line(line):
+                if self.metrics is not None:
+                    self.metrics.output(job)
+                # Progress records and log lines go to separate channels
+                if not self.parse_progress(job, line) and line.strip():
+                    self.fragment_tuner.observe_line(job, line)
+                    self.host_limiter.observe_line(job, line)
+                    log(line.strip())
+
+            def on_progress(record):
+                # Progress hook data from the warm backend
+                self.report_progress(job, record)
+
+            # Reuse info extracted earlier; otherwise extract it now, so the
+            # formats are chosen before the download starts
+            cached = self.info_cache.lookup(job.url) is not None
+            if cached:
+                log("📦 Using cached video information")
+            extraction_started = time.monotonic()
+            info = self.load_info(job, log)
+            if self.metrics is not None:
+                self.metrics.extracted(job, time.monotonic() - extraction_started, info, cached)
+            if job.stop_flag:
+                log("⏹️ Download stopped by user")
+                return STOPPED
+            if info is not None:
+                job.duration = info.get("duration") or job.duration
+                job.archive_key = info_key(info)
+                # A clip does not make the whole video downloaded, nor is it skipped for it
+                if self.archive is not None and job.archive_key in self.archive and not job.sections:
+                    log("⏭️ Already downloaded, skipping")
+                    return SKIPPED
+                self.select_formats(job, info, log)
+            # Without info yt-dlp extracts it during the download and fills the cache
+            info_json = self.info_cache.lookup(job.url)
+
+            # Take a share of the bandwidth budget, if there is one
+            self.bandwidth.add(job, live=self.backend.live_rate_limit)
+            if job.rate_limit:
+                log(f"🚦 Bandwidth share: {job.rate_limit / 1024:.0f} KB/s")
+
+            # Fragment concurrency, learned per host unless fixed
+            if self.fragments == AUTO:
+                job.fragments = self.fragment_tuner.choose(job)
+            else:
+                job.fragments = self.fragments
+            log(f"🧩 Concurrent fragments: {job.fragments}")
+
+            # Conversions happen in the post-processing stage, which needs
+            # to be told where yt-dlp put the file
+            job.convert_to = target_format(job)
+            if job.convert_to:
+                fd, filepath_file = tempfile.mkstemp(prefix="filepath-", suffix=".txt")
+                os.close(fd)
+
+            started = time.monotonic()
+            if self.metrics is not None:
+                self.metrics.command_started(job, self.backend.name)
+            while True:
+                # Build command based on the job's quality selection
+                cmd = build_download_command(
+                    job,
+                    info_json=info_json,
+                    info_template=None if info_json else self.info_cache.output_template_for(job.url),
+                    filepath_file=filepath_file
+                )
+                job.return_code = self.backend.download(job, cmd, on_line, on_progress)
+
+                if job.return_code == 0 or job.stop_flag or not info_json or self.host_limiter.throttling(job):
+                    break
+
+                # The stream URLs in the cached info may have expired
+                log("♻️ Cached video information was rejected, extracting again")
+                self.info_cache.invalidate(job.url)
+                info_json = None
+
+            if job.stop_flag:
+                self.stopped(job, log)
+                return STOPPED
+
+            self.fragment_tuner.finish(job, completed=job.return_code == 0)
+            retry_reason = self.host_limiter.finish(job, completed=job.return_code == 0)
+            self.estimator.finish(job, completed=job.return_code == 0)
+            if job.return_code == 0:
+                self.postprocessor.record(job, "download", time.monotonic() - started)
+                log("✅ Download completed successfully!")
+                # 100% complete
+                if job.progress:
+                    self.report_progress(job, dataclasses.replace(job.progress, status="finished"))
+                else:
+                    self.report_progress(job, ProgressRecord(status="finished"))
+
+                if job.convert_to:
+                    sources = read_filepaths(filepath_file)
+                    if not sources:
+                        log("❌ yt-dlp did not report the downloaded file, it cannot be converted")
+                        return FAILED
+                    # The download slot is free for the next job while this one converts.
+                    # The exited yt-dlp group is no handle to stop it by; ffmpeg's replaces it
+                    job.process = None
+                    self.postprocessor.submit(job, sources, job.convert_to)
+                    return CONVERTING
+
+                self.archive_job(job)
+                return COMPLETED
+            else:
+                delay = self.host_limiter.retry_delay(job) if retry_reason and not self.closing else None
+                if delay is not None:
+                    log(f"🔁 {retry_reason}: retrying in {delay:.0f}s (retry {job.retries} of {MAX_RETRIES})")
+                    job.not_before = time.monotonic() + delay
+                    return QUEUED
+                log(f"❌ Download failed with code: {job.return_code}" + (f" ({retry_reason})" if retry_reason else ""))
+                return FAILED
+
+        except Exception as e:
+            self.events.put(("error", f"Download error: {str(e)}"))
+            return ERROR
+        finally:
+            self.bandwidth.remove(job)
+            self.fragment_tuner.discard(job)
+            self.host_limiter.discard(job)
+            self.estimator.discard(job)
+            if filepath_file:
+                try:
+                    os.remove(filepath_file)
+                except OSError:
+                    pass
+
+    def stopped(self, job, log):
+        """Report a job stopped while downloading and remove its partial files
+
+        When the app is closing, or the job has ``keep_partial``, partial
+        files are kept so the download resumes on the next start or elsewhere.
+        """
+        stop_time = job.timings.get("stop")
+        log("⏹️ Download stopped by user" + (f" in {stop_time:.2f}s" if stop_time is not None else ""))
+        if not (self.closing or job.keep_partial):
+            removed = remove_partial_files(job.files)
+            if removed:
+                log(f"🧹 Removed {len(removed)} partial files")
+
+    def on_converted(self, job, status):
+        """Finish a job that left the post-processing stage"""
+        def log(message):
+            self.events.put(("job_log", (job.job_id, message)))
+
+        if status == COMPLETED:
+            log(f"✅ Converted to {job.convert_to}")
+            self.archive_job(job)
+        elif status == STOPPED:
+            log("⏹️ Conversion stopped by user")
+        timings = job.timings
+        log(f"⏱️ Downloaded in {timings.get('download', 0):.1f}s, waited {timings.get('wait', 0):.1f}s"
+            f" for a converter, converted in {timings.get('convert', 0):.1f}s")
+        self.manager.set_status(job, status)
+
+    def archive_job(self, job):
+        """Record a finished download in the archive"""
+        if self.archive is not None and not job.sections:
+            self.archive.add(job.archive_key or url_key(job.url))
+
+    def load_info(self, job, log):
+        """Return the info dict of a job's video, extracting it if it is not cached, or None"""
+        try:
+            text, _ = self.fetch_info(job.url)
+            return json.loads(text)
+        except Exception as e:
+            log(f"⚠️ Could not extract video information ahead of the download: {e}")
+            return None
+
+    def select_formats(self, job, info, log):
+        """Resolve the job's options to explicit format IDs from the video info
+
+        If the info has no usable formats, the job keeps the format filters
+        and yt-dlp chooses.
+        """
+        selection = select_formats(info, job.quality, job.framerate, job.format_ext)
+        if selection is None:
+            return None
+
+        if selection.selector:
+            job.format_id = selection.selector
+            job.container = selection.container
+        job.predicted_size = selection.size
+        if job.sections and selection.size and job.duration:
+            # Only the sections' share of the media is fetched
+            covered = job.media_duration
+            if covered is not None:
+                job.predicted_size = int(selection.size * min(1.0, covered / job.duration))
+        log(f"🎯 Formats: {selection.describe()}")
+        return selection
+
+    def parse_progress(self, job, line):
+        """Report a --progress-template line as a progress record
+
+        Returns False for free-form output lines, which belong in the log.
+        """
+        record = parse_progress_line(line)
+        if record is None:
+            return False
+        self.report_progress(job, record)
+        return True
+
+    def report_progress(self, job, record):
+        """Update a job's progress state and report it with the smoothed speed and ETA"""
+        if record.filename:
+            job.files.add(record.filename)
+        # The tuners and metrics judge the raw speed yt-dlp measured
+        self.bandwidth.report(job, record.speed)
+        self.fragment_tuner.observe(job, record)
+        if self.metrics is not None:
+            self.metrics.progress(job, record)
+
+        speed, eta = self.estimator.observe(job, record)
+        if record.status == "downloading":
+            self.host_limiter.observe_speed(job, speed)
+            record = dataclasses.replace(record, speed=speed, eta=eta if eta is not None else record.eta)
+        job.progress = record
+        job.percent = record.percent
+        job.speed = record.speed or 0
+        job.eta = record.eta_str
+        self.events.put(("progress", (job.job_id, record)))
+        self.report_estimate()
+
+    def report_estimate(self):
+        """Report the predicted time until the queue is downloaded, at most every ESTIMATE_INTERVAL"""
+        now = time.monotonic()
+        if now - self.last_estimate < ESTIMATE_INTERVAL:
+            return
+        self.last_estimate = now
+        estimate = self.estimator.queue_estimate(
+            self.manager.running_jobs(), self.manager.queued_jobs(), self.manager.max_workers
+        )
+        self.events.put(("estimate", estimate))
+
+    def stop_all(self):
+        """Stop playlist listings, info fetches, pending prefetches and all jobs"""
+        for expansion in list(self.expansions) + list(self.info_fetches):
+            expansion.stop()
+        self.prefetcher.cancel_all()
+        self.manager.stop_all()
+
+    def close(self):
+        """Shut down; running jobs are interrupted and resumed on the next start"""
+        self.closing = True
+        self.stop_all()
+        self.backend.close()
+        self.postprocessor.close()
+        if self.journal:
+            self.journal.close()
+        if self.archive is not None:
+            self.archive.close()
+
+
+def remove_partial_files(filenames):
+    """Delete yt-dlp's temporary files for the given downloads, returns the removed paths
+
+    Only ``.part``, fragment, ``.ytdl`` and merge temp files are touched,
+    never a finished file.
+    """
+    removed = []
+    for filename in filenames:
+        base, ext = os.path.splitext(filename)
+        candidates = [filename + ".part", filename + ".ytdl", f"{base}.temp{ext}"]
+        candidates += glob.glob(glob.escape(filename) + ".part-Frag*")
+        for path in candidates:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed.append(path)
+    return removed
+
+
+def read_filepaths(path):
+    """Return the paths yt-dlp printed to a ``--print-to-file`` file, one per section"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    except OSError:
+        return []
+    return list(dict.fromkeys(lines))
@@ -0,0 +1,244 @@
+"""Smoothed download speeds and completion estimates for the whole queue
+
+yt-dlp's own speed is the rate of the last few blocks and its ETA only
+covers the current file, so both jump around. ``ThroughputEstimator``
+measures each job from the bytes it has downloaded instead, smoothed by an
+exponentially weighted moving average whose weight depends on the time
+between updates, and derives the job's ETA from the bytes still expected
+for all of its files.
+
+Finished jobs feed a per-host history, kept on disk like the fragment
+tuning: the smoothed speed of a job, its size, its bytes per second of
+media and the time from its start to the first byte. Queued jobs are
+predicted from that history, and ``queue_estimate()`` plays the running and
+queued jobs through the worker slots to tell when the whole queue will be
+done. The same predictions let the job pool start the shortest jobs first.
+"""
+import heapq
+import json
+import math
+import os
+import threading
+import time
+
+from .fragments import host_key
+from .paths import data_dir
+
+HISTORY_FILE = "throughput.json"
+
+# Orders the job pool can start queued jobs in
+FIFO = "fifo"
+SHORTEST_FIRST = "shortest"
+ORDERS = (FIFO, SHORTEST_FIRST)
+
+# Seconds after which an old speed sample has lost 63% of its weight
+SPEED_TIME_CONSTANT = 5.0
+
+# Updates closer together than this are merged into one sample
+MIN_SAMPLE_INTERVAL = 0.2
+
+# Weight of a finished job in its host's history
+HOST_SMOOTHING = 0.3
+
+# Hosts kept in the history, the least recently used are dropped
+MAX_HOSTS = 200
+
+
+class _JobEstimate:
+    """Byte progress of one running job"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_byte = None
+        self.last_time = None
+        self.last_bytes = 0
+        self.speed = None  # smoothed bytes per second
+        self.file = None
+        self.file_bytes = 0
+        self.file_total = None
+        self.done_bytes = 0  # bytes of the job's earlier files
+        self.files = 0
+
+    @property
+    def downloaded(self):
+        return self.done_bytes + self.file_bytes
+
+
+class ThroughputEstimator:
+    """Smooths job speeds, learns per-host throughput and predicts durations"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), HISTORY_FILE)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self.hosts = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                hosts = json.load(f)
+            return hosts if isinstance(hosts, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.hosts, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def start(self, job):
+        """Start measuring a job that left the queue"""
+        with self._lock:
+            self._jobs[job.job_id] = _JobEstimate()
+
+    def observe(self, job, record):
+        """Add a progress record, returns the job's ``(smoothed speed, eta seconds)``"""
+        with self._lock:
+            state = self._jobs.get(job.job_id)
+            if state is None:
+                state = self._jobs[job.job_id] = _JobEstimate()
+            now = time.monotonic()
+
+            if record.filename != state.file:
+                # Each file of a job (video, then audio) counts from zero
+                state.done_bytes += state.file_bytes
+                state.file = record.filename
+                state.files += 1
+                state.file_bytes = state.last_bytes = 0
+            state.file_bytes = record.downloaded_bytes or 0
+            state.file_total = record.total_bytes
+            if state.first_byte is None and state.file_bytes:
+                state.first_byte = now
+
+            if state.last_time is None:
+                state.last_time, state.last_bytes = now, state.file_bytes
+                state.speed = record.speed
+            elif now - state.last_time >= MIN_SAMPLE_INTERVAL:
+                elapsed = now - state.last_time
+                rate = max(0, state.file_bytes - state.last_bytes) / elapsed
+                if state.speed is None:
+                    state.speed = rate
+                else:
+                    state.speed += (1 - math.exp(-elapsed / SPEED_TIME_CONSTANT)) * (rate - state.speed)
+                state.last_time, state.last_bytes = now, state.file_bytes
+
+            return state.speed, self._eta(job, state)
+
+    @staticmethod
+    def _remaining_bytes(job, state):
+        # Separate video and audio formats are downloaded one after the other
+        files = job.format_id.count("+") + 1 if job.format_id else 1
+        if state.files < files and job.predicted_size and job.predicted_size > state.downloaded:
+            return job.predicted_size - state.downloaded
+        if state.file_total:
+            return max(0, state.file_total - state.file_bytes)
+        return None
+
+    def _eta(self, job, state):
+        remaining = self._remaining_bytes(job, state)
+        if remaining is None or not state.speed:
+            return None
+        return remaining / state.speed
+
+    def finish(self, job, completed):
+        """Learn from a job that ended; only completed, unthrottled downloads count"""
+        with self._lock:
+            state = self._jobs.pop(job.job_id, None)
+            if state is None or not completed or job.rate_limit is not None:
+                return
+            if state.first_byte is None or not state.downloaded:
+                return
+            download_time = max(time.monotonic() - state.first_byte, MIN_SAMPLE_INTERVAL)
+            sample = {
+                "speed": state.downloaded / download_time,
+                "size": state.downloaded,
+                "startup": state.first_byte - state.started,
+            }
+            if job.media_duration:
+                sample["byterate"] = state.downloaded / job.media_duration
+
+            key = host_key(job.url)
+            history = self.hosts.pop(key, None) or {"jobs": 0}
+            for name, value in sample.items():
+                old = history.get(name)
+                history[name] = value if old is None else old + HOST_SMOOTHING * (value - old)
+            history["jobs"] += 1
+            history["updated"] = time.time()
+            # Most recently used last, so the oldest are dropped first
+            self.hosts[key] = history
+            while len(self.hosts) > MAX_HOSTS:
+                del self.hosts[next(iter(self.hosts))]
+            self._save()
+
+    def discard(self, job):
+        """Forget a job that was stopped or could not run"""
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+
+    def predict(self, job):
+        """Return the seconds a job still needs to download, or None if nothing is known"""
+        with self._lock:
+            return self._predict(job)
+
+    def _predict(self, job):
+        history = self.hosts.get(host_key(job.url)) or {}
+        state = self._jobs.get(job.job_id)
+        if state is not None and state.speed:
+            remaining = self._remaining_bytes(job, state)
+            if remaining is not None:
+                return remaining / state.speed
+
+        speed = history.get("speed") or self._average("speed")
+        if not speed:
+            return None
+        size = job.predicted_size
+        if size is None and job.media_duration:
+            byterate = history.get("byterate") or self._average("byterate")
+            size = job.media_duration * byterate if byterate else None
+        if size is None:
+            size = history.get("size") or self._average("size")
+        if size is None:
+            return None
+        if state is not None:
+            size = max(0, size - state.downloaded)
+        startup = history.get("startup", 0) if state is None or state.first_byte is None else 0
+        return startup + size / speed
+
+    def _average(self, name):
+        values = [history[name] for history in self.hosts.values() if history.get(name)]
+        return sum(values) / len(values) if values else None
+
+    def sort_key(self, job):
+        """Order of jobs for SHORTEST_FIRST: predicted duration, unknown ones last, then by age"""
+        predicted = self.predict(job)
+        return (math.inf if predicted is None else predicted, job.job_id)
+
+    def queue_estimate(self, running, queued, workers):
+        """Predict when the running and queued jobs will all be downloaded
+
+        ``queued`` has to be in the order the jobs will start. Returns a dict
+        with the seconds ``remaining`` (None if nothing can be predicted), the
+        number of ``jobs`` and how many of them had to be guessed as
+        ``unknown``.
+        """
+        with self._lock:
+            running_times = [self._predict(job) for job in running]
+            queued_times = [self._predict(job) for job in queued]
+        known = [t for t in running_times + queued_times if t is not None]
+        unknown = len(running_times) + len(queued_times) - len(known)
+        if not known:
+            return {"remaining": None, "jobs": len(running) + len(queued), "unknown": unknown}
+        # Jobs without a prediction are assumed to take as long as the average one
+        average = sum(known) / len(known)
+
+        # Each slot is free at some time from now; queued jobs take the earliest free slot
+        slots = [average if t is None else t for t in running_times]
+        slots += [0.0] * max(0, workers - len(slots))
+        heapq.heapify(slots)
+        for t in queued_times:
+            heapq.heapreplace(slots, slots[0] + (average if t is None else t))
+        return {"remaining": round(max(slots), 1), "jobs": len(running) + len(queued), "unknown": unknown}
@@ -0,0 +1,158 @@
+"""Coalescing event channel from worker threads to the UI thread
+
+Workers produce far more events than a UI can show: every job reports
+progress many times a second and yt-dlp prints a log line for nearly
+everything it does. ``EventPump`` keeps only the latest progress record per
+job, batches log lines so the UI can insert them in one go, and keeps every
+other message in order. When the UI falls behind, producers adding log
+lines are slowed down instead of growing the backlog without limit.
+"""
+import collections
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .jobs import FINISHED_STATES
+
+# Log lines waiting for the UI before producers are made to wait
+DEFAULT_MAX_PENDING_LOGS = 5000
+
+# Longest a producer waits for room; the line is accepted afterwards anyway
+DEFAULT_PUT_TIMEOUT = 0.5
+
+
+@dataclass
+class EventBatch:
+    """Everything the UI has to apply in one tick"""
+    messages: list = field(default_factory=list)
+    logs: list = field(default_factory=list)
+    progress: dict = field(default_factory=dict)
+
+    def __bool__(self):
+        return bool(self.messages or self.logs or self.progress)
+
+    def records(self, jobs, logs=False):
+        """Yield the batch as JSON-ready dicts with an ``event`` key
+
+        ``jobs`` maps job IDs to jobs. New jobs come first, then progress,
+        then state changes, so a job's final progress precedes its final
+        status. Log lines and messages other than errors, post-processing
+        stats, queue estimates and info results are only included with ``logs``.
+        """
+        if logs:
+            for job_id, message in self.logs:
+                yield {"event": "log", "job": job_id, "message": message}
+
+        for msg_type, data in self.messages:
+            if msg_type == "new_job":
+                record = data.to_dict()
+                yield dict({"event": "job", "job": record.pop("job_id")}, **record)
+
+        for job_id, record in self.progress.items():
+            yield dict({"event": "progress", "job": job_id}, **record.to_dict())
+
+        for msg_type, data in self.messages:
+            if msg_type == "job_status":
+                job_id, status = data
+                job = jobs.get(job_id)
+                return_code = job.return_code if job is not None and status in FINISHED_STATES else None
+                yield {"event": "status", "job": job_id, "status": status, "return_code": return_code}
+            elif msg_type == "error":
+                yield {"event": "error", "message": data}
+            elif msg_type in ("pipeline", "estimate"):
+                yield dict({"event": msg_type}, **data)
+            elif msg_type == "info_result":
+                yield dict({"event": "info"}, **data.to_dict())
+            elif msg_type != "new_job" and logs:
+                yield {"event": msg_type, "message": data}
+
+
+class EventPump:
+    """Drop-in replacement for the ``queue.Queue`` of ``(msg_type, data)`` tuples
+
+    ``("log", line)`` and ``("job_log", (job_id, line))`` messages are batched
+    as ``(job_id, line)`` pairs, ``("progress", (job_id, record))`` messages
+    are coalesced per job and all other messages are delivered in order by
+    ``drain()``.
+    """
+
+    def __init__(self, max_pending_logs=DEFAULT_MAX_PENDING_LOGS, put_timeout=DEFAULT_PUT_TIMEOUT):
+        self.max_pending_logs = max_pending_logs
+        self.put_timeout = put_timeout
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._messages = collections.deque()
+        self._logs = collections.deque()
+        self._progress = {}
+        self._overflow = False
+
+        # Counters for diagnostics and benchmarks
+        self.coalesced = 0
+        self.throttled = 0
+
+    def put(self, item):
+        msg_type, data = item
+        if msg_type == "log":
+            self.put_log(data)
+        elif msg_type == "job_log":
+            job_id, line = data
+            self.put_log(line, job_id)
+        elif msg_type == "progress":
+            self.put_progress(*data)
+        else:
+            with self._lock:
+                self._messages.append(item)
+
+    def put_log(self, line, job_id=None):
+        """Queue a log line, waiting briefly if the UI is behind
+
+        The UI thread itself never waits. If the UI does not drain within the
+        timeout (e.g. a modal dialog is open) producers stop waiting until
+        the next drain, so a stuck UI cannot stall downloads indefinitely.
+        """
+        with self._not_full:
+            if (len(self._logs) >= self.max_pending_logs and not self._overflow
+                    and threading.current_thread() is not threading.main_thread()):
+                self.throttled += 1
+                deadline = time.monotonic() + self.put_timeout
+                while len(self._logs) >= self.max_pending_logs:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._overflow = True
+                        break
+                    self._not_full.wait(remaining)
+            self._logs.append((job_id, line))
+
+    def put_progress(self, job_id, record):
+        """Set the latest progress of a job, replacing any undelivered one"""
+        with self._lock:
+            if job_id in self._progress:
+                self.coalesced += 1
+            self._progress[job_id] = record
+
+    def drain(self, max_logs=None):
+        """Take everything waiting, with at most ``max_logs`` log lines"""
+        batch = EventBatch()
+        with self._not_full:
+            batch.messages = list(self._messages)
+            self._messages.clear()
+
+            if max_logs is None or len(self._logs) <= max_logs:
+                batch.logs = list(self._logs)
+                self._logs.clear()
+            else:
+                batch.logs = [self._logs.popleft() for _ in range(max_logs)]
+
+            batch.progress = self._progress
+            self._progress = {}
+            self._overflow = False
+            self._not_full.notify_all()
+        return batch
+
+    def pending(self):
+        """Return True if anything is waiting for the UI"""
+        with self._lock:
+            return bool(self._messages or self._logs or self._progress)
+
+    def empty(self):
+        return not self.pending()
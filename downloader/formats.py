@@ -0,0 +1,199 @@
+"""Local format selection from an extracted formats table
+
+Instead of sending yt-dlp filter strings like
+``bestvideo[height<=1080][fps=60]+bestaudio/best...`` (which quietly fall
+back to a low quality progressive ``best`` and make yt-dlp redo the
+selection), ``select_formats`` resolves the Quality, Framerate and Format
+choices against the ``formats`` of an info dict to explicit format IDs. It
+prefers formats already in the target container, so the merge is a plain
+copy and nothing has to be re-encoded, and predicts the download size.
+"""
+from dataclasses import dataclass
+
+from .commands import AUDIO_FORMATS
+
+# Audio streams that go into each container without conversion
+COMPATIBLE_AUDIO = {
+    "mp4": ("m4a", "mp4"),
+    "webm": ("webm",),
+    "m4a": ("m4a", "mp4"),
+}
+
+# Containers any stream can be merged into by copying
+ANY_CODEC_CONTAINERS = ("mkv",)
+
+# Containers yt-dlp can merge separate video and audio into
+MERGE_FORMATS = ("mp4", "webm", "mkv")
+
+# Format IDs yt-dlp would read as an extension filter or selector syntax
+# instead of an ID, e.g. the single "mp4" format of a direct file link
+AMBIGUOUS_IDS = ("mp4", "flv", "webm", "3gp", "m4a", "mp3", "ogg", "aac", "wav", "mhtml")
+SELECTOR_CHARS = set("/+,[]()*=!<>?")
+
+
+@dataclass(frozen=True)
+class FormatSelection:
+    """Explicit formats chosen for a download"""
+    format_id: str
+    video: dict = None
+    audio: dict = None
+    size: int = None  # predicted bytes, None if unknown
+    container: str = None  # merge output format, if the streams fit the target
+    remux: bool = False  # True if the streams are not already in the target container or codec
+
+    @property
+    def selector(self):
+        """The ``-f`` argument that selects exactly these formats, or None"""
+        parts = []
+        for part in self.format_id.split("+"):
+            if not part or SELECTOR_CHARS & set(part):
+                return None
+            # b* is the best format with video, audio or both; the filter
+            # narrows it down to the one ID
+            parts.append(f"b*[format_id={part}]" if part in AMBIGUOUS_IDS else part)
+        return "+".join(parts)
+
+    def describe(self):
+        parts = []
+        if self.video:
+            parts.append(describe_format(self.video))
+        if self.audio and self.audio is not self.video:
+            parts.append(describe_format(self.audio))
+        text = f"{self.format_id}: {' + '.join(parts)}"
+        if self.size:
+            text += f", ~{format_size(self.size)}"
+        if self.remux:
+            text += " (remuxed)" if self.video else " (converted)"
+        return text
+
+
+def format_size(size):
+    """Format a byte count for display"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def describe_format(fmt):
+    """Short description of a format, e.g. ``1080p60 avc1 mp4`` or ``129k m4a``"""
+    if has_video(fmt):
+        fps = int(fmt["fps"]) if fmt.get("fps") else ""
+        codec = (fmt.get("vcodec") or "").split(".")[0]
+        return " ".join(part for part in (f"{fmt.get('height') or '?'}p{fps}", codec, fmt.get("ext")) if part)
+    abr = f"{fmt['abr']:.0f}k" if fmt.get("abr") else ""
+    return " ".join(part for part in (abr, fmt.get("ext")) if part)
+
+
+def has_video(fmt):
+    return fmt.get("vcodec") != "none"
+
+
+def has_audio(fmt):
+    return fmt.get("acodec") != "none"
+
+
+def predicted_size(fmt, duration=None):
+    """Return the size of a format, estimated from its bitrate if needed"""
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if not size and fmt.get("tbr") and duration:
+        size = fmt["tbr"] * 1000 / 8 * duration
+    return int(size) if size else None
+
+
+def _bitrate(fmt):
+    return fmt.get("tbr") or fmt.get("vbr") or fmt.get("abr") or 0
+
+
+def _fps_key(fmt, framerate):
+    """Sort key part for the framerate choice; higher is better"""
+    fps = fmt.get("fps") or 0
+    if framerate == "Highest":
+        return fps > 30
+    if framerate in ("60", "30", "24"):
+        return abs(fps - int(framerate)) <= 1
+    return 0
+
+
+def _best_audio(formats, container):
+    compatible = COMPATIBLE_AUDIO.get(container, ())
+    return max(
+        formats,
+        key=lambda fmt: (fmt.get("ext") in compatible, fmt.get("abr") or _bitrate(fmt)),
+        default=None
+    )
+
+
+def select_formats(info, quality, framerate, format_ext):
+    """Resolve the download options to explicit formats, or None if they cannot be
+
+    ``info`` is a yt-dlp info dict with a ``formats`` list.
+    """
+    formats = [
+        fmt for fmt in info.get("formats") or []
+        if fmt.get("format_id") and (has_video(fmt) or has_audio(fmt))
+    ]
+    if not formats:
+        return None
+    duration = info.get("duration")
+    audio_only = [fmt for fmt in formats if has_audio(fmt) and not has_video(fmt)]
+
+    # Audio downloads: the best audio stream, without conversion when the
+    # target is a container the stream already is in
+    if quality == "Audio Only" or format_ext in AUDIO_FORMATS:
+        target = format_ext if format_ext in AUDIO_FORMATS else "mp3"
+        audio = _best_audio(audio_only or [fmt for fmt in formats if has_audio(fmt)], target)
+        if audio is None:
+            return None
+        return FormatSelection(
+            format_id=audio["format_id"],
+            audio=audio,
+            size=predicted_size(audio, duration),
+            remux=audio.get("ext") not in COMPATIBLE_AUDIO.get(target, ()),
+        )
+
+    videos = [fmt for fmt in formats if has_video(fmt)]
+    if quality != "Best Quality (Highest Bitrate)":
+        max_height = int(quality.rstrip("p"))
+        capped = [fmt for fmt in videos if (fmt.get("height") or 0) <= max_height]
+        # Nothing small enough: take the smallest rather than failing
+        videos = capped or sorted(videos, key=lambda fmt: fmt.get("height") or 0)[:1]
+    if not videos:
+        return None
+
+    def video_key(fmt):
+        return (
+            _fps_key(fmt, framerate),
+            fmt.get("height") or 0,
+            fmt.get("ext") == format_ext or format_ext in ANY_CODEC_CONTAINERS,
+            fmt.get("fps") or 0,
+            has_audio(fmt),  # a progressive format needs no merge
+            _bitrate(fmt),
+        )
+
+    video = max(videos, key=video_key)
+    if has_audio(video):
+        return FormatSelection(
+            format_id=video["format_id"],
+            video=video,
+            audio=video,
+            size=predicted_size(video, duration),
+            remux=video.get("ext") != format_ext and format_ext not in ANY_CODEC_CONTAINERS,
+        )
+
+    audio = _best_audio(audio_only, video.get("ext"))
+    if audio is None:
+        return FormatSelection(format_id=video["format_id"], video=video, size=predicted_size(video, duration))
+
+    sizes = [predicted_size(video, duration), predicted_size(audio, duration)]
+    fits_target = format_ext in ANY_CODEC_CONTAINERS or (
+        video.get("ext") == format_ext and audio.get("ext") in COMPATIBLE_AUDIO.get(format_ext, ())
+    )
+    return FormatSelection(
+        format_id=f"{video['format_id']}+{audio['format_id']}",
+        video=video,
+        audio=audio,
+        size=sum(sizes) if all(sizes) else None,
+        container=format_ext if fits_target and format_ext in MERGE_FORMATS else None,
+        remux=not fits_target,
+    )
@@ -0,0 +1,169 @@
+"""Adaptive ``--concurrent-fragments`` per host
+
+DASH and HLS formats are downloaded fragment by fragment; fetching several
+fragments at once hides the latency of each request. The best number
+depends on the link and the server, so ``FragmentTuner`` learns it per host
+by hill climbing across jobs: every job of a host runs with the host's
+current concurrency, or with double that as a probe. A probe that improves
+the average fragment throughput by enough becomes the new concurrency and
+the next probe doubles again; one that does not ends the climb for a while.
+HTTP errors and throttling (403/429, fragment retries) halve the
+concurrency instead. The learned values are kept on disk so later sessions
+start from them.
+
+yt-dlp reads the fragment concurrency once per file, so the tuning happens
+between jobs rather than within one.
+"""
+import json
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+from .paths import data_dir
+
+TUNING_FILE = "fragments.json"
+
+AUTO = "auto"
+START_FRAGMENTS = 2
+MAX_FRAGMENTS = 16
+
+# A probe has to be this much faster to be kept
+MIN_IMPROVEMENT = 0.10
+
+# Jobs to wait before probing again after a failed probe or a back-off
+HOLD_JOBS = 5
+
+# Smoothing of the throughput measured at the current concurrency
+THROUGHPUT_SMOOTHING = 0.5
+
+# Output of yt-dlp that means the server is refusing or throttling us
+THROTTLE_RE = re.compile(r"HTTP Error (?:403|429)|Got error:|Retrying fragment|fragment not found", re.IGNORECASE)
+
+
+def parse_fragments(value):
+    """Parse a fragments setting: ``auto`` or a positive number"""
+    if str(value).strip().lower() == AUTO:
+        return AUTO
+    fragments = int(value)
+    if fragments < 1:
+        raise ValueError(f"Invalid number of fragments: {value!r}")
+    return fragments
+
+
+def host_key(url):
+    """Return the host jobs for ``url`` share tuning with"""
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return "youtube.com" if host == "youtu.be" else host
+
+
+class _JobSample:
+    """Fragment throughput observed for one running job"""
+
+    def __init__(self, fragments):
+        self.fragments = fragments
+        self.speed_total = 0.0
+        self.speed_count = 0
+        self.throttled = False
+
+
+class FragmentTuner:
+    """Chooses the fragment concurrency of each job and learns from the result"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), TUNING_FILE)
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.hosts = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                hosts = json.load(f)
+            return hosts if isinstance(hosts, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.hosts, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def choose(self, job):
+        """Return the fragment concurrency for a job starting now"""
+        with self._lock:
+            state = self.hosts.get(host_key(job.url))
+            if state is None:
+                fragments = START_FRAGMENTS
+            else:
+                fragments = state.get("probe") or state["fragments"]
+            self._samples[job.job_id] = _JobSample(fragments)
+            return fragments
+
+    def observe(self, job, record):
+        """Collect the speed of a progress record of a fragmented download"""
+        sample = self._samples.get(job.job_id)
+        if sample is not None and record.fragment_count and record.speed:
+            sample.speed_total += record.speed
+            sample.speed_count += 1
+
+    def observe_line(self, job, line):
+        """Notice yt-dlp output that means the server is throttling the job"""
+        sample = self._samples.get(job.job_id)
+        if sample is not None and THROTTLE_RE.search(line):
+            sample.throttled = True
+
+    def finish(self, job, completed):
+        """Learn from a job that ended; throttling counts even if it failed for good"""
+        with self._lock:
+            sample = self._samples.pop(job.job_id, None)
+            if sample is None or not (sample.throttled or completed):
+                return
+            key = host_key(job.url)
+            state = self.hosts.setdefault(key, {"fragments": sample.fragments, "throughput": None, "probe": None,
+                                                "hold": 0})
+
+            if sample.throttled:
+                # Back off, and stay there for a while
+                state["fragments"] = max(1, min(state["fragments"], sample.fragments) // 2)
+                state.update(throughput=None, probe=None, hold=HOLD_JOBS)
+            elif sample.speed_count and job.rate_limit is None:
+                # Rate limited jobs say nothing about what concurrency can do
+                self._learn(state, sample.fragments, sample.speed_total / sample.speed_count)
+            else:
+                return
+            state["updated"] = time.time()
+            self._save()
+
+    def discard(self, job):
+        """Forget a job that was stopped or could not run"""
+        with self._lock:
+            self._samples.pop(job.job_id, None)
+
+    @staticmethod
+    def _learn(state, fragments, throughput):
+        if fragments == state.get("probe"):
+            baseline = state["throughput"]
+            if baseline is None or throughput > baseline * (1 + MIN_IMPROVEMENT):
+                # The probe paid off; keep climbing
+                state.update(fragments=fragments, throughput=throughput)
+                state["probe"] = min(MAX_FRAGMENTS, fragments * 2) if fragments < MAX_FRAGMENTS else None
+            else:
+                state.update(probe=None, hold=HOLD_JOBS)
+        elif fragments == state["fragments"]:
+            if state["throughput"] is None:
+                state["throughput"] = throughput
+            else:
+                state["throughput"] += THROUGHPUT_SMOOTHING * (throughput - state["throughput"])
+            if state["hold"]:
+                state["hold"] -= 1
+            elif state["probe"] is None and fragments < MAX_FRAGMENTS:
+                state["probe"] = min(MAX_FRAGMENTS, fragments * 2)
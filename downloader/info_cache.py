@@ -0,0 +1,212 @@
+"""On-disk LRU cache of yt-dlp info dicts
+
+Entries are the JSON documents printed by ``yt-dlp --dump-json`` (or written
+by ``--write-info-json``), stored one file per video so the download command
+can reuse them with ``--load-info-json``. A file's mtime is the time it was
+written and is used for the TTL; its atime is set on every hit and used for
+LRU eviction once the cache grows past its entry or size limits.
+"""
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from .commands import build_info_command
+from .paths import cache_dir
+
+# YouTube video IDs in the usual URL shapes
+YOUTUBE_ID_RE = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)'
+    r'([0-9A-Za-z_-]{11})'
+)
+
+INFO_SUFFIX = ".info.json"
+
+# Stream URLs inside an info dict expire after a few hours on YouTube
+DEFAULT_TTL = 3 * 60 * 60
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Parallel extractions run ahead of the downloads of the next queued jobs
+DEFAULT_PREFETCH_WORKERS = 2
+PREFETCH_TIMEOUT = 60
+
+
+def video_key(url):
+    """Return a cache key for a URL without touching the network"""
+    match = YOUTUBE_ID_RE.search(url)
+    if match:
+        return f"youtube_{match.group(1)}"
+    return "url_" + hashlib.sha1(url.strip().encode("utf-8")).hexdigest()
+
+
+class InfoCache:
+    """Size-bounded, TTL-limited LRU cache of info JSON files keyed by video"""
+
+    def __init__(self, directory=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or cache_dir("info")
+        os.makedirs(self.directory, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, url):
+        """Return the file an entry for ``url`` is stored in, whether or not it exists"""
+        return os.path.join(self.directory, video_key(url) + INFO_SUFFIX)
+
+    def output_template_for(self, url):
+        """Return a yt-dlp ``infojson:`` output template that writes into the cache"""
+        path = self.path_for(url)[:-len(INFO_SUFFIX)]
+        return "infojson:" + path.replace("%", "%%")
+
+    def lookup(self, url):
+        """Return the path of a fresh entry for ``url`` and mark it used, or None"""
+        path = self.path_for(url)
+        with self._lock:
+            try:
+                written = os.stat(path).st_mtime
+            except OSError:
+                return None
+
+            now = time.time()
+            if now - written > self.ttl:
+                self._remove(path)
+                return None
+
+            # Record the hit in atime, keep mtime as the write time
+            os.utime(path, (now, written))
+            return path
+
+    def get_text(self, url):
+        """Return the cached JSON text for ``url``, or None"""
+        path = self.lookup(url)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get(self, url):
+        """Return the cached info dict for ``url``, or None"""
+        text = self.get_text(url)
+        if text is None:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            self.invalidate(url)
+            return None
+
+    def put(self, url, text):
+        """Store the JSON text of an info dict for ``url``"""
+        path = self.path_for(url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        self.prune()
+        return path
+
+    def invalidate(self, url):
+        """Drop the entry for ``url``"""
+        with self._lock:
+            self._remove(self.path_for(url))
+
+    def prune(self):
+        """Remove expired entries, then least recently used ones over the limits"""
+        now = time.time()
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(INFO_SUFFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if now - st.st_mtime > self.ttl:
+                    self._remove(path)
+                else:
+                    entries.append((max(st.st_atime, st.st_mtime), st.st_size, path))
+
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+                _, size, path = entries.pop(0)
+                self._remove(path)
+                total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class InfoPrefetcher:
+    """Extracts info for upcoming downloads on a bounded thread pool
+
+    Each download then starts from a cache hit instead of a serial
+    extraction. ``backend`` is a callable returning the current backend.
+    """
+
+    def __init__(self, cache, backend, max_workers=DEFAULT_PREFETCH_WORKERS):
+        self.cache = cache
+        self.backend = backend
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="info-prefetch")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, url):
+        """Start extracting ``url`` unless it is cached or already in progress"""
+        with self._lock:
+            if url in self._pending or self.cache.lookup(url):
+                return
+            future = self._executor.submit(self._fetch, url)
+            self._pending[url] = future
+        future.add_done_callback(lambda f: self._done(url, f))
+
+    def _fetch(self, url):
+        self.cache.put(url, self.backend().dump_json(build_info_command(url), timeout=PREFETCH_TIMEOUT))
+
+    def _done(self, url, future):
+        with self._lock:
+            if self._pending.get(url) is future:
+                del self._pending[url]
+
+    def wait(self, url, timeout=None):
+        """Wait for a running prefetch of ``url``; failures are left to the download
+
+        A prefetch that has not started yet is cancelled instead, the
+        download extracting the info itself is quicker than queueing.
+        """
+        with self._lock:
+            future = self._pending.get(url)
+        if future is None or future.cancel():
+            return
+        try:
+            future.result(timeout)
+        except Exception:
+            pass
+
+    def cancel(self, url):
+        """Drop the prefetch of ``url`` if it has not started yet"""
+        with self._lock:
+            future = self._pending.get(url)
+        if future is not None:
+            future.cancel()
+
+    def cancel_all(self):
+        """Drop prefetches that have not started yet"""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.cancel()
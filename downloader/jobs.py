@@ -0,0 +1,286 @@
+"""Download jobs and the bounded worker pool that runs them"""
+import collections
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .sections import sections_duration
+
+# Job states
+QUEUED = "Queued"
+RUNNING = "Downloading"
+CONVERTING = "Converting"  # downloaded, waiting for or in the post-processing stage
+COMPLETED = "Completed"
+FAILED = "Failed"
+STOPPED = "Stopped"
+ERROR = "Error"
+SKIPPED = "Skipped"  # already in the download archive
+
+FINISHED_STATES = (COMPLETED, FAILED, STOPPED, ERROR, SKIPPED)
+
+_job_ids = itertools.count(1)
+
+
+@dataclass(eq=False)
+class DownloadJob:
+    """A single URL queued for download, with its own options and progress state"""
+    url: str
+    quality: str = "1080p"
+    framerate: str = "Auto"
+    format_ext: str = "mp4"
+    output_path: str = os.path.expanduser("~/Downloads")
+    title: str = None
+    weight: float = 1.0  # share of the bandwidth budget relative to other jobs
+    sections: list = None  # [start, end] seconds to download instead of the whole video
+    force_keyframes: bool = False  # cut sections exactly, re-encoding around the cuts
+    priority: int = 0  # queued jobs with a higher priority start first
+    job_id: int = field(default_factory=lambda: next(_job_ids))
+    journal_id: int = field(default=None, repr=False)  # row in the JobJournal, if any
+
+    # Runtime state, owned by the worker running the job
+    status: str = QUEUED
+    percent: float = 0.0
+    speed: float = 0.0
+    eta: str = None
+    rate_limit: float = None  # bytes per second assigned by the BandwidthScheduler
+    fragments: int = None  # concurrent fragments of DASH/HLS downloads
+    format_id: str = None  # explicit yt-dlp formats resolved from the video info
+    container: str = None  # merge output format, if the chosen streams fit it
+    predicted_size: int = None  # expected bytes of the chosen formats
+    duration: float = None  # seconds of media, if known
+    archive_key: str = field(default=None, repr=False)  # DownloadArchive entry, once known
+    convert_to: str = None  # format the PostProcessor converts the download to
+    retries: int = 0  # times the job was queued again after being throttled
+    not_before: float = 0.0  # monotonic time a queued retry may start at
+    keep_partial: bool = False  # keep the .part files if stopped, so the download can be resumed
+    timings: dict = field(default_factory=dict)  # seconds spent per stage
+    files: set = field(default_factory=set, repr=False)  # files yt-dlp reported downloading
+    progress: object = field(default=None, repr=False)  # latest ProgressRecord
+    return_code: int = None
+    stop_flag: bool = False
+    process: object = field(default=None, repr=False)
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def media_duration(self):
+        """Seconds of media the job downloads, its sections' if it has any"""
+        if self.sections:
+            return sections_duration(self.sections, self.duration)
+        return self.duration
+
+    def to_dict(self):
+        """Return the options and state of the job as a JSON-ready dict"""
+        return {
+            "job_id": self.job_id,
+            "url": self.url,
+            "title": self.title,
+            "quality": self.quality,
+            "framerate": self.framerate,
+            "format_ext": self.format_ext,
+            "output_path": self.output_path,
+            "weight": self.weight,
+            "sections": self.sections,
+            "force_keyframes": self.force_keyframes,
+            "priority": self.priority,
+            "status": self.status,
+            "percent": round(self.percent, 1),
+            "speed": self.speed,
+            "eta": self.eta,
+            "rate_limit": self.rate_limit,
+            "format_id": self.format_id,
+            "predicted_size": self.predicted_size,
+            "timings": self.timings,
+            "return_code": self.return_code,
+            "retries": self.retries,
+        }
+
+
+class DownloadManager:
+    """Runs queued jobs concurrently on a bounded pool of worker threads
+
+    ``run_job(job)`` does the actual work on a worker thread and returns the
+    final job status, or a status that is not final when the job was handed
+    on to a later stage that calls ``set_status()`` once it is done.
+    ``on_status(job)`` is called whenever a job changes state, from
+    whichever thread made the change. Queued jobs start by priority, then
+    in submission order or by ``order(job)`` if that key function is set.
+    With a ``limiter`` (a ``HostLimiter``) a job only starts when it can
+    ``acquire()`` a slot of its host, which is released when it leaves the
+    pool. ``run_job`` may return QUEUED to have the job queued again, to
+    start no earlier than its ``not_before``.
+    """
+
+    def __init__(self, run_job, max_workers=3, on_status=None, order=None, limiter=None):
+        self.run_job = run_job
+        self.on_status = on_status
+        self.order = order
+        self.limiter = limiter
+        self.max_workers = max(1, int(max_workers))
+        self.jobs = collections.OrderedDict()
+        self._pending = collections.deque()
+        self._running = {}
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+
+    def submit(self, job):
+        """Queue a job; it starts as soon as a worker slot is free"""
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._pending.append(job)
+        self._set_status(job, QUEUED)
+        self._dispatch()
+        return job
+
+    def set_max_workers(self, count):
+        """Resize the pool; running jobs are never interrupted by shrinking"""
+        with self._lock:
+            self.max_workers = max(1, int(count))
+        self._dispatch()
+
+    def stop(self, job_id):
+        """Stop a single job, whether it is still queued or already running"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            job.stop_flag = True
+            if job in self._pending:
+                self._pending.remove(job)
+                queued = True
+            else:
+                queued = False
+        if queued:
+            self._set_status(job, STOPPED)
+            with self._idle:
+                self._idle.notify_all()
+        elif job.process:
+            try:
+                job.process.terminate()
+            except OSError:
+                pass
+
+    def stop_all(self):
+        """Stop every queued and running job"""
+        with self._lock:
+            job_ids = [job.job_id for job in self.jobs.values() if not job.finished]
+        for job_id in job_ids:
+            self.stop(job_id)
+
+    def forget_finished(self, job_ids=None):
+        """Drop finished jobs from the job table, all of them or those of ``job_ids``"""
+        with self._lock:
+            for job_id in [j.job_id for j in self.jobs.values() if j.finished]:
+                if job_ids is None or job_id in job_ids:
+                    del self.jobs[job_id]
+
+    def snapshot(self):
+        """Return all known jobs; safe to iterate while jobs are added from other threads"""
+        with self._lock:
+            return list(self.jobs.values())
+
+    def queued_jobs(self):
+        """Return the queued jobs in the order they will start"""
+        with self._lock:
+            return self._ordered()
+
+    def _start_key(self, job):
+        return (-job.priority, self.order(job)) if self.order else -job.priority
+
+    def _ordered(self):
+        """The pending jobs in start order; the lock has to be held"""
+        if self.order or any(job.priority for job in self._pending):
+            # Stable, so jobs that tie keep their submission order
+            return sorted(self._pending, key=self._start_key)
+        return list(self._pending)
+
+    def _next_job(self):
+        """The first pending job that may start now, or None; the lock has to be held"""
+        now = time.monotonic()
+        for job in self._ordered():
+            if job.not_before > now:
+                continue
+            if self.limiter is None or self.limiter.acquire(job):
+                return job
+        return None
+
+    def running_jobs(self):
+        """Return the jobs holding a worker slot"""
+        with self._lock:
+            return [self.jobs[job_id] for job_id in self._running]
+
+    def counts(self):
+        """Return (queued, running, finished) job counts"""
+        with self._lock:
+            finished = sum(1 for job in self.jobs.values() if job.finished)
+            return len(self._pending), len(self._running), finished
+
+    @property
+    def busy(self):
+        with self._lock:
+            return bool(self._pending or self._running)
+
+    def wait(self, timeout=None):
+        """Block until no job is queued or running"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending and not self._running, timeout)
+
+    def set_status(self, job, status):
+        """Set the state of a job that left the pool for a later stage"""
+        self._set_status(job, status)
+        with self._idle:
+            self._idle.notify_all()
+
+    def _set_status(self, job, status):
+        job.status = status
+        if self.on_status:
+            self.on_status(job)
+
+    def _dispatch(self):
+        """Start queued jobs while there are free worker slots"""
+        started = []
+        with self._lock:
+            while self._pending and len(self._running) < self.max_workers:
+                # Jobs of throttled hosts and retries still backing off wait
+                job = self._next_job()
+                if job is None:
+                    break
+                self._pending.remove(job)
+                thread = threading.Thread(target=self._worker, args=(job,), daemon=True)
+                self._running[job.job_id] = thread
+                started.append((job, thread))
+        for job, thread in started:
+            self._set_status(job, RUNNING)
+            thread.start()
+
+    def _worker(self, job):
+        try:
+            status = self.run_job(job)
+        except Exception:
+            status = ERROR
+        if self.limiter is not None:
+            self.limiter.release(job)
+        if status in FINISHED_STATES or not status or status == QUEUED:
+            job.process = None
+        if status == QUEUED:
+            with self._lock:
+                self._running.pop(job.job_id, None)
+                self._pending.append(job)
+            self._set_status(job, QUEUED)
+            delay = job.not_before - time.monotonic()
+            if delay > 0:
+                # Nothing else may finish to dispatch it once its backoff is over
+                timer = threading.Timer(delay, self._dispatch)
+                timer.daemon = True
+                timer.start()
+        else:
+            self._set_status(job, status or ERROR)
+            with self._lock:
+                self._running.pop(job.job_id, None)
+        self._dispatch()
+        with self._idle:
+            self._idle.notify_all()
@@ -0,0 +1,130 @@
+"""Crash-safe journal of download jobs
+
+Every job is written to a small SQLite database when it is queued and again
+on every state change, so the jobs of a session survive the app being
+closed or crashing. On the next start ``unfinished()`` returns the jobs that
+were still queued, downloading or converting; queued again with the same
+options, yt-dlp continues their ``.part`` files (or finds them downloaded)
+instead of fetching the bytes again.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .jobs import CONVERTING, FINISHED_STATES, QUEUED, RUNNING
+from .paths import data_dir
+
+JOURNAL_FILE = "jobs.sqlite3"
+
+# Finished jobs are forgotten after this many seconds
+KEEP_FINISHED = 30 * 24 * 60 * 60
+
+# Job options restored when a job is resumed
+JOB_OPTIONS = ("quality", "framerate", "format_ext", "output_path", "weight", "priority")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    quality TEXT,
+    framerate TEXT,
+    format_ext TEXT,
+    output_path TEXT,
+    title TEXT,
+    status TEXT NOT NULL,
+    return_code INTEGER,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+"""
+
+# Columns added after the first release, with their types; older journals get them on open
+ADDED_COLUMNS = {
+    "sections": "TEXT",  # JSON list of [start, end] pairs
+    "force_keyframes": "INTEGER",
+    "priority": "INTEGER",
+    "weight": "REAL",
+}
+
+
+class JobJournal:
+    """SQLite journal of jobs and their states, safe to use from any thread"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(data_dir(), JOURNAL_FILE)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+
+        # WAL keeps every committed state change across crashes without a
+        # full fsync of the database per write
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, kind in ADDED_COLUMNS.items():
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        self.prune()
+
+    def add(self, job):
+        """Record a new job and set its ``journal_id``"""
+        now = time.time()
+        with self._lock:
+            if self._db is None:
+                return None
+            cursor = self._db.execute(
+                "INSERT INTO jobs (url, quality, framerate, format_ext, output_path, weight, priority, sections,"
+                " force_keyframes, title, status, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.url, job.quality, job.framerate, job.format_ext, job.output_path, job.weight, job.priority,
+                 json.dumps(job.sections) if job.sections else None, int(job.force_keyframes), job.title,
+                 job.status, now, now)
+            )
+        job.journal_id = cursor.lastrowid
+        return job.journal_id
+
+    def update(self, job):
+        """Record the current state of a journaled job"""
+        if job.journal_id is None:
+            return
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "UPDATE jobs SET status = ?, return_code = ?, title = ?, updated = ? WHERE id = ?",
+                (job.status, job.return_code, job.title, time.time(), job.journal_id)
+            )
+
+    def unfinished(self):
+        """Return ``(journal_id, url, title, options)`` of jobs left queued, running or converting"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, url, title, sections, force_keyframes, " + ", ".join(JOB_OPTIONS) + " FROM jobs"
+                " WHERE status IN (?, ?, ?) ORDER BY id",
+                (QUEUED, RUNNING, CONVERTING)
+            ).fetchall()
+        unfinished = []
+        for row in rows:
+            options = {name: value for name, value in zip(JOB_OPTIONS, row[5:]) if value is not None}
+            if row[3]:
+                options["sections"] = json.loads(row[3])
+                options["force_keyframes"] = bool(row[4])
+            unfinished.append((row[0], row[1], row[2], options))
+        return unfinished
+
+    def prune(self, keep=KEEP_FINISHED):
+        """Forget finished jobs older than ``keep`` seconds"""
+        placeholders = ", ".join("?" * len(FINISHED_STATES))
+        with self._lock:
+            self._db.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND updated < ?",
+                (*FINISHED_STATES, time.time() - keep)
+            )
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,98 @@
+"""Bounded in-memory log with a per-session spill file
+
+The UI keeps only the most recent lines in memory and shows only the tail
+of those; every line is also written to a rotating log file for the
+session, so nothing is lost when old lines fall out of the buffer.
+"""
+import collections
+import glob
+import logging
+import logging.handlers
+import os
+import threading
+import time
+
+from .paths import data_dir
+
+DEFAULT_MAX_LINES = 10000
+
+# Rotation of a session's spill file and how many old sessions are kept
+SPILL_MAX_BYTES = 5 * 1024 * 1024
+SPILL_BACKUPS = 3
+KEEP_SESSIONS = 20
+
+
+class LogBuffer:
+    """Ring buffer of ``(job_id, line)`` entries; ``job_id`` is None for app messages"""
+
+    def __init__(self, max_lines=DEFAULT_MAX_LINES, spill_dir=None):
+        self.max_lines = max_lines
+        self._lines = collections.deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self.spill_path = None
+        self._spill = None
+
+        if spill_dir is not False:
+            self._open_spill(spill_dir or data_dir("logs"))
+
+    def _open_spill(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self._prune_sessions(directory)
+
+        self.spill_path = os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S.log"))
+        handler = logging.handlers.RotatingFileHandler(
+            self.spill_path, maxBytes=SPILL_MAX_BYTES, backupCount=SPILL_BACKUPS,
+            encoding="utf-8", delay=True
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self._spill = logging.getLogger(f"{__name__}.{id(self)}")
+        self._spill.propagate = False
+        self._spill.setLevel(logging.INFO)
+        self._spill.addHandler(handler)
+
+    @staticmethod
+    def _prune_sessions(directory):
+        sessions = sorted(glob.glob(os.path.join(directory, "session-*.log")))
+        for path in sessions[:-KEEP_SESSIONS]:
+            for old in glob.glob(path + "*"):
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def extend(self, entries):
+        """Add ``(job_id, line)`` entries"""
+        with self._lock:
+            self._lines.extend(entries)
+        if self._spill:
+            for job_id, line in entries:
+                self._spill.info(line if job_id is None else f"[#{job_id}] {line}")
+
+    def append(self, line, job_id=None):
+        self.extend([(job_id, line)])
+
+    def lines(self, job_id=None, last=None):
+        """Return the buffered entries, optionally for one job and only the last ones"""
+        with self._lock:
+            if job_id is None:
+                entries = list(self._lines)
+            else:
+                entries = [entry for entry in self._lines if entry[0] == job_id]
+        if last is not None:
+            entries = entries[-last:]
+        return entries
+
+    def __len__(self):
+        return len(self._lines)
+
+    def clear(self):
+        """Forget the buffered lines; the spill file keeps them"""
+        with self._lock:
+            self._lines.clear()
+
+    def close(self):
+        if self._spill:
+            for handler in list(self._spill.handlers):
+                handler.close()
+                self._spill.removeHandler(handler)
+            self._spill = None
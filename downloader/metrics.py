@@ -0,0 +1,266 @@
+"""Per-job performance metrics and their export
+
+``MetricsCollector`` follows every job through its stages and, when the
+job finishes, appends one JSON line with its timings to ``jobs.jsonl``:
+
+* ``extraction_s``: getting the video info, ``info_cached`` if from the cache
+* ``spawn_s``: from starting the download command to its first output
+* ``ttfb_s``: from starting the download command to the first bytes
+* ``download_s`` and ``postprocess_s``: the two stages of the pipeline
+* ``stop_s``: from a stop request until the job's processes exited
+* ``throughput``: ``[seconds, bytes per second]`` samples of the download
+* ``bytes``, ``status`` and ``return_code``
+
+The same numbers are aggregated by extractor and host into Prometheus text
+exposition format, rewritten to ``metrics.prom`` after every job (for a
+node_exporter textfile collector) and served by the job service at
+``/metrics``. Slow extractors, throttled hosts and bad network windows show
+up there and in the JSON lines.
+"""
+import collections
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+from .fragments import host_key
+from .paths import data_dir
+
+METRICS_DIR = "metrics"
+JOBS_FILE = "jobs.jsonl"
+PROMETHEUS_FILE = "metrics.prom"
+
+# jobs.jsonl is rotated to jobs.jsonl.1 past this size
+MAX_JOBS_FILE_BYTES = 20 * 1024 * 1024
+
+# Seconds between throughput samples, and the most samples kept per job
+SAMPLE_INTERVAL = 1.0
+MAX_SAMPLES = 600
+
+PREFIX = "pyyoutube"
+
+# Summaries exported with their help text
+SUMMARIES = {
+    "extraction_seconds": "Time to extract video info by extractor, cache hits excluded",
+    "spawn_seconds": "Time from starting a download command to its first output by engine",
+    "ttfb_seconds": "Time from starting a download command to the first bytes by host",
+    "download_seconds": "Time downloading by host",
+    "postprocess_seconds": "Time converting downloads",
+    "stop_seconds": "Time from stopping a job until its processes exited",
+    "throughput_bytes_per_second": "Average download speed of jobs by host",
+}
+
+
+@dataclass
+class JobMetrics:
+    """Timings and totals of one job"""
+    job_id: int
+    url: str
+    host: str
+    extractor: str = None
+    engine: str = None
+    queued_at: float = None  # epoch seconds
+    finished_at: float = None
+    extraction_s: float = None
+    info_cached: bool = None
+    spawn_s: float = None
+    ttfb_s: float = None
+    download_s: float = None
+    postprocess_s: float = None
+    stop_s: float = None
+    bytes: int = 0
+    status: str = None
+    return_code: int = None
+    throughput: list = field(default_factory=list)
+
+    # Bookkeeping while the job runs
+    _command_started: float = field(default=None, repr=False)
+    _last_sample: float = field(default=None, repr=False)
+    _file: str = field(default=None, repr=False)
+    _file_bytes: int = field(default=0, repr=False)
+    _done_bytes: int = field(default=0, repr=False)
+
+    def to_dict(self):
+        return {name: value for name, value in asdict(self).items() if not name.startswith("_")}
+
+
+class _Summary:
+    """Sum and count of an observed value, per label set"""
+
+    def __init__(self):
+        self.sums = collections.defaultdict(float)
+        self.counts = collections.defaultdict(int)
+
+    def observe(self, labels, value):
+        if value is not None:
+            self.sums[labels] += value
+            self.counts[labels] += 1
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+
+class MetricsCollector:
+    """Collects per-job metrics, writes them as JSON lines and aggregates them"""
+
+    def __init__(self, directory=None):
+        self.directory = directory or data_dir(METRICS_DIR)
+        self.jobs_path = os.path.join(self.directory, JOBS_FILE)
+        self.prometheus_path = os.path.join(self.directory, PROMETHEUS_FILE)
+        self._lock = threading.Lock()
+        self._running = {}
+        self._statuses = collections.Counter()
+        self._bytes = collections.Counter()
+        self._summaries = {name: _Summary() for name in SUMMARIES}
+
+    def _get(self, job):
+        metrics = self._running.get(job.job_id)
+        if metrics is None:
+            metrics = self._running[job.job_id] = JobMetrics(
+                job_id=job.job_id, url=job.url, host=host_key(job.url), queued_at=time.time()
+            )
+        return metrics
+
+    def queued(self, job):
+        with self._lock:
+            self._get(job)
+
+    def extracted(self, job, seconds, info, cached):
+        """Record how long getting the job's info took"""
+        with self._lock:
+            metrics = self._get(job)
+            metrics.extraction_s = round(seconds, 3)
+            metrics.info_cached = cached
+            if info:
+                metrics.extractor = (info.get("extractor_key") or info.get("extractor") or "").lower() or None
+
+    def command_started(self, job, engine):
+        """Mark the start of the download command"""
+        with self._lock:
+            metrics = self._get(job)
+            metrics.engine = engine
+            metrics._command_started = time.monotonic()
+
+    def output(self, job):
+        """Mark output of the download command, for the spawn time"""
+        with self._lock:
+            metrics = self._running.get(job.job_id)
+            if metrics is not None and metrics.spawn_s is None and metrics._command_started is not None:
+                metrics.spawn_s = round(time.monotonic() - metrics._command_started, 3)
+
+    def progress(self, job, record):
+        """Take the time to first byte, bytes and throughput samples from a progress record"""
+        with self._lock:
+            metrics = self._running.get(job.job_id)
+            if metrics is None or metrics._command_started is None:
+                return
+            now = time.monotonic()
+            since_start = now - metrics._command_started
+            if metrics.spawn_s is None:
+                metrics.spawn_s = round(since_start, 3)
+            if metrics.ttfb_s is None and record.downloaded_bytes:
+                metrics.ttfb_s = round(since_start, 3)
+
+            # Separate files (video, then audio) each count from zero
+            if record.filename != metrics._file:
+                metrics._done_bytes += metrics._file_bytes
+                metrics._file = record.filename
+            metrics._file_bytes = record.downloaded_bytes or 0
+            metrics.bytes = metrics._done_bytes + metrics._file_bytes
+
+            if record.speed and (metrics._last_sample is None or now - metrics._last_sample >= SAMPLE_INTERVAL):
+                metrics._last_sample = now
+                metrics.throughput.append([round(since_start, 1), round(record.speed)])
+                if len(metrics.throughput) > MAX_SAMPLES:
+                    # Keep the whole download covered at half the resolution
+                    del metrics.throughput[::2]
+
+    def finished(self, job):
+        """Complete a finished job's metrics, export them and add them to the aggregates"""
+        with self._lock:
+            metrics = self._running.pop(job.job_id, None)
+            if metrics is None:
+                return None
+            metrics.finished_at = time.time()
+            metrics.status = job.status
+            metrics.return_code = job.return_code
+            metrics.download_s = job.timings.get("download")
+            metrics.postprocess_s = job.timings.get("convert")
+            metrics.stop_s = job.timings.get("stop")
+
+            extractor = (("extractor", metrics.extractor or "unknown"),)
+            host = (("host", metrics.host or "unknown"),)
+            self._statuses[(("status", metrics.status),)] += 1
+            self._bytes[host] += metrics.bytes
+            self._summaries["extraction_seconds"].observe(extractor, metrics.extraction_s if not metrics.info_cached
+                                                          else None)
+            self._summaries["spawn_seconds"].observe((("engine", metrics.engine or "unknown"),), metrics.spawn_s)
+            self._summaries["ttfb_seconds"].observe(host, metrics.ttfb_s)
+            self._summaries["download_seconds"].observe(host, metrics.download_s)
+            self._summaries["postprocess_seconds"].observe((), metrics.postprocess_s)
+            self._summaries["stop_seconds"].observe((), metrics.stop_s)
+            if metrics.download_s and metrics.bytes:
+                self._summaries["throughput_bytes_per_second"].observe(host, metrics.bytes / metrics.download_s)
+            running = len(self._running)
+
+        self._append(metrics)
+        self._write_prometheus(running)
+        return metrics
+
+    def prometheus_text(self):
+        """Return the aggregates in Prometheus text exposition format"""
+        with self._lock:
+            return self._render(len(self._running))
+
+    def _render(self, running):
+        lines = [
+            f"# HELP {PREFIX}_jobs_running Jobs queued or in progress",
+            f"# TYPE {PREFIX}_jobs_running gauge",
+            f"{PREFIX}_jobs_running {running}",
+            f"# HELP {PREFIX}_jobs_total Finished jobs by final status",
+            f"# TYPE {PREFIX}_jobs_total counter",
+        ]
+        lines += [f"{PREFIX}_jobs_total{_labels(labels)} {count}" for labels, count in sorted(self._statuses.items())]
+        lines += [
+            f"# HELP {PREFIX}_downloaded_bytes_total Bytes downloaded by host",
+            f"# TYPE {PREFIX}_downloaded_bytes_total counter",
+        ]
+        lines += [f"{PREFIX}_downloaded_bytes_total{_labels(labels)} {count}"
+                  for labels, count in sorted(self._bytes.items())]
+        for name, summary in self._summaries.items():
+            lines.append(f"# HELP {PREFIX}_{name} {SUMMARIES[name]}")
+            lines.append(f"# TYPE {PREFIX}_{name} summary")
+            for labels in sorted(summary.counts):
+                lines.append(f"{PREFIX}_{name}_sum{_labels(labels)} {summary.sums[labels]:.3f}")
+                lines.append(f"{PREFIX}_{name}_count{_labels(labels)} {summary.counts[labels]}")
+        return "\n".join(lines) + "\n"
+
+    def _append(self, metrics):
+        try:
+            if os.path.getsize(self.jobs_path) > MAX_JOBS_FILE_BYTES:
+                os.replace(self.jobs_path, self.jobs_path + ".1")
+        except OSError:
+            pass
+        try:
+            with open(self.jobs_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(metrics.to_dict()) + "\n")
+        except OSError:
+            pass
+
+    def _write_prometheus(self, running):
+        # Written under the lock too, so jobs finishing together neither share
+        # the tmp file nor replace a newer export with an older one
+        with self._lock:
+            text = self._render(running)
+            tmp_path = f"{self.prometheus_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(text)
+                os.replace(tmp_path, self.prometheus_path)
+            except OSError:
+                pass
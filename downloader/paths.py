@@ -0,0 +1,27 @@
+"""Per-user directories for caches and persistent app state"""
+import os
+import sys
+
+APP_NAME = "py-youtube"
+
+
+def _base_dir(env_var, posix_default):
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    else:
+        base = os.environ.get(env_var) or os.path.expanduser(posix_default)
+    return os.path.join(base, APP_NAME)
+
+
+def cache_dir(*parts):
+    """Return (and create) a directory for data that may be thrown away"""
+    path = os.path.join(_base_dir("XDG_CACHE_HOME", "~/.cache"), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def data_dir(*parts):
+    """Return (and create) a directory for state that must survive restarts"""
+    path = os.path.join(_base_dir("XDG_DATA_HOME", "~/.local/share"), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
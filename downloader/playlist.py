@@ -0,0 +1,42 @@
+"""Streaming expansion of playlist and channel URLs into single videos"""
+import re
+
+# URLs that list several videos rather than being one. A watch URL with a
+# list= attached is the one video: a Mix (list=RD...) has no end
+PLAYLIST_URL_RE = re.compile(
+    r'youtube\.com/(?:playlist\b|@|c/|channel/|user/)'
+)
+
+
+def is_playlist_url(url):
+    """Return True if the URL is a playlist or channel that should be expanded"""
+    return PLAYLIST_URL_RE.search(url) is not None
+
+
+def entry_url(entry):
+    """Return the URL to download a flat-playlist entry from"""
+    url = entry.get("url") or entry.get("webpage_url")
+    if url and "://" in url:
+        return url
+    if entry.get("ie_key") == "Youtube" and entry.get("id"):
+        return f"https://www.youtube.com/watch?v={entry['id']}"
+    return url or entry.get("id")
+
+
+class PlaylistExpansion:
+    """A running playlist listing; stoppable the same way as a download job"""
+
+    def __init__(self, url):
+        self.url = url
+        self.process = None
+        self.stop_flag = False
+        self.count = 0
+        self.skipped = 0  # entries already in the download archive
+
+    def stop(self):
+        self.stop_flag = True
+        if self.process:
+            try:
+                self.process.terminate()
+            except OSError:
+                pass
@@ -0,0 +1,202 @@
+"""Post-processing stage: ffmpeg conversions off the download slots
+
+Audio extraction (mp3, wav, m4a, flac) and conversion to avi or flv are
+CPU-bound. Run inline by yt-dlp they keep a download slot busy the whole
+time; instead, jobs that need a conversion download the plain streams and
+are handed to ``PostProcessor``, a pool of ffmpeg processes sized to the
+CPU count. While a file converts, its download slot already fetches the
+next job, so network and CPU work overlap across jobs.
+
+The stage reports its queue depth and the average time jobs spent
+downloading, waiting for a converter and converting as ``("pipeline",
+stats)`` events.
+"""
+import collections
+import os
+import subprocess
+import threading
+import time
+
+from .commands import AUDIO_FORMATS
+from .jobs import COMPLETED, FAILED, STOPPED
+from .processes import spawn
+
+# ffmpeg output options per target format; audio targets drop the video
+CONVERSIONS = {
+    "mp3": ["-vn", "-c:a", "libmp3lame", "-q:a", "5"],
+    "m4a": ["-vn", "-c:a", "aac", "-b:a", "192k"],
+    "wav": ["-vn", "-c:a", "pcm_s16le"],
+    "flac": ["-vn", "-c:a", "flac"],
+    "avi": ["-c:v", "mpeg4", "-q:v", "5", "-vtag", "XVID", "-c:a", "libmp3lame", "-q:a", "5"],
+    "flv": ["-c:v", "flv", "-q:v", "5", "-c:a", "libmp3lame", "-ar", "44100"],
+}
+
+# Sources whose AAC audio goes into the target without re-encoding
+COPY_AUDIO = {"m4a": ("m4a", "mp4", "aac")}
+
+# Lines of ffmpeg's error output kept for the log
+ERROR_LINES = 5
+
+# Stages whose average time is reported
+STAGES = ("download", "wait", "convert")
+
+
+def target_format(job):
+    """Return the format a job's download is converted to afterwards, or None"""
+    if job.quality == "Audio Only":
+        return "mp3"
+    if job.format_ext in AUDIO_FORMATS or job.format_ext in CONVERSIONS:
+        return job.format_ext
+    return None
+
+
+def build_ffmpeg_command(source, target, output):
+    """ffmpeg command converting ``source`` to the ``target`` format at ``output``"""
+    options = CONVERSIONS[target]
+    source_ext = os.path.splitext(source)[1].lstrip(".").lower()
+    if source_ext in COPY_AUDIO.get(target, ()):
+        options = ["-vn", "-c:a", "copy"]
+    return ["ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-i", source] + options + [output]
+
+
+class PostProcessor:
+    """Converts downloaded files on a pool of ffmpeg processes
+
+    ``on_done(job, status)`` is called with the final status of every
+    submitted job, from a converter thread.
+    """
+
+    def __init__(self, events, on_done, workers=None, executable=None):
+        self.events = events
+        self.on_done = on_done
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.executable = executable or os.environ.get("FFMPEG_PATH") or "ffmpeg"
+        self._pending = collections.deque()
+        self._running = 0
+        self._threads = 0
+        self._totals = dict.fromkeys(STAGES, 0.0)
+        self._counts = dict.fromkeys(STAGES, 0)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._closed = False
+
+    def submit(self, job, sources, target):
+        """Queue the conversion of a job's downloaded files, one per section"""
+        with self._lock:
+            self._pending.append((job, list(sources), target, time.monotonic()))
+            if self._threads < self.workers:
+                self._threads += 1
+                threading.Thread(target=self._work, name="postprocess", daemon=True).start()
+            else:
+                self._changed.notify()
+        self.report()
+
+    def record(self, job, stage, seconds):
+        """Add a stage's duration to the job's timings and the averages"""
+        job.timings[stage] = round(seconds, 2)
+        with self._lock:
+            self._totals[stage] += seconds
+            self._counts[stage] += 1
+
+    def stats(self):
+        """Return the queue depth and the average time per stage"""
+        with self._lock:
+            stats = {"queued": len(self._pending), "running": self._running, "workers": self.workers}
+            for stage in STAGES:
+                stats[stage] = round(self._totals[stage] / self._counts[stage], 2) if self._counts[stage] else None
+            return stats
+
+    def report(self):
+        self.events.put(("pipeline", self.stats()))
+
+    @property
+    def busy(self):
+        with self._lock:
+            return bool(self._pending or self._running)
+
+    def wait(self, timeout=None):
+        """Block until nothing is queued or converting"""
+        with self._changed:
+            return self._changed.wait_for(lambda: not self._pending and not self._running, timeout)
+
+    def _work(self):
+        while True:
+            with self._changed:
+                while not self._pending and not self._closed:
+                    self._changed.wait()
+                if not self._pending:
+                    self._threads -= 1
+                    return
+                job, sources, target, queued_at = self._pending.popleft()
+                self._running += 1
+
+            self.record(job, "wait", time.monotonic() - queued_at)
+            self.report()
+            try:
+                status = COMPLETED
+                for source in sources:
+                    status = self._convert(job, source, target)
+                    if status != COMPLETED:
+                        break
+            except Exception as e:
+                self.events.put(("job_log", (job.job_id, f"❌ Conversion error: {e}")))
+                status = FAILED
+            job.process = None
+
+            with self._changed:
+                self._running -= 1
+                self._changed.notify_all()
+            self.report()
+            self.on_done(job, status)
+
+    def _convert(self, job, source, target):
+        def log(message):
+            self.events.put(("job_log", (job.job_id, message)))
+
+        if job.stop_flag:
+            return STOPPED
+
+        output = os.path.splitext(source)[0] + "." + target
+        if output == source:
+            # Already in the target format
+            return COMPLETED
+
+        cmd = build_ffmpeg_command(source, target, output)
+        cmd[0] = self.executable
+        log(f"🎛️ Converting to {target}: {os.path.basename(source)}")
+        started = time.monotonic()
+        process = spawn(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        job.process = process
+        if job.stop_flag:
+            process.terminate()
+        _, errors = process.communicate()
+        process.wait()
+        errors = errors.decode("utf-8", "replace")
+        self.record(job, "convert", time.monotonic() - started)
+
+        if job.stop_flag or process.returncode != 0:
+            try:
+                os.remove(output)
+            except OSError:
+                pass
+            if job.stop_flag:
+                if process.stop_latency is not None:
+                    job.timings["stop"] = round(process.stop_latency, 2)
+                return STOPPED
+            for line in errors.strip().splitlines()[-ERROR_LINES:]:
+                log(line)
+            log(f"❌ Conversion failed with code: {process.returncode}")
+            return FAILED
+
+        # The converted file replaces the download, as with yt-dlp's -x
+        try:
+            os.remove(source)
+        except OSError:
+            pass
+        return COMPLETED
+
+    def close(self):
+        """Let the converter threads exit once the queue is empty"""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
@@ -0,0 +1,221 @@
+"""Child processes that can be stopped promptly, with everything they started
+
+yt-dlp starts ffmpeg for merging, HLS downloads and conversions; stopping
+only the yt-dlp process leaves those running and holding CPU and disk.
+``spawn()`` starts a command in a process group of its own and returns a
+``ProcessGroup``, whose ``terminate()`` signals the whole group and kills
+it if it is still there after ``KILL_GRACE`` seconds. Once the leader has
+been reaped its group ID may be reused by a new group, so the group is not
+signalled after that: descendants left behind by a stopped leader are
+killed right when it is reaped instead.
+
+``read_output()`` reads a child's output from the raw pipe with
+``selectors``, in chunks, splitting lines on ``\\n`` as well as the ``\\r``
+of in-place progress. It wakes up every ``POLL_INTERVAL`` even when the
+child prints nothing, so a stalled connection cannot keep a stop request
+waiting for the next line.
+"""
+import codecs
+import os
+import queue
+import re
+import selectors
+import signal
+import subprocess
+import threading
+import time
+
+# Seconds a stopped process group gets to exit before it is killed
+KILL_GRACE = 3.0
+
+# Longest wait for output before the reader checks whether to stop
+POLL_INTERVAL = 0.1
+
+CHUNK_SIZE = 65536
+
+_LINE_END_RE = re.compile(r"\r\n|\r|\n")
+
+
+class ProcessGroup:
+    """A child process and its descendants, stoppable as one
+
+    Wraps the ``Popen`` object and can stand in for it: ``terminate()``,
+    ``kill()``, ``wait()``, ``poll()`` and the other attributes are
+    forwarded to the whole group where that makes sense.
+    """
+
+    def __init__(self, popen):
+        self.popen = popen
+        self.stop_requested_at = None  # time.monotonic() of the first terminate()
+        self.exited_at = None
+        self._timer = None
+
+    def __getattr__(self, name):
+        return getattr(self.popen, name)
+
+    def _signal(self, sig):
+        if self.popen.poll() is not None and os.name != "posix":
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(self.popen.pid, sig)
+            elif sig == signal.SIGTERM:
+                self.popen.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                # taskkill /T also ends the children
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(self.popen.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except (OSError, ValueError):
+            pass
+
+    def terminate(self, grace=KILL_GRACE):
+        """Ask the group to exit and kill it after ``grace`` seconds"""
+        if self.stop_requested_at is not None:
+            return
+        self.stop_requested_at = time.monotonic()
+        self._signal(signal.SIGTERM)
+        self._timer = threading.Timer(grace, self._escalate)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def kill(self):
+        if self.stop_requested_at is None:
+            self.stop_requested_at = time.monotonic()
+        self._signal(signal.SIGKILL if os.name == "posix" else signal.SIGTERM)
+
+    def _escalate(self):
+        # An exited but unreaped leader keeps the group ID taken, a reaped one does not
+        if self.popen.returncode is None:
+            self.kill()
+
+    def _reaped(self):
+        """Cancel the pending kill and end the stopped group's leftovers while its ID is still theirs"""
+        if self.exited_at is None:
+            self.exited_at = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            if os.name == "posix":
+                try:
+                    os.killpg(self.popen.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+    def poll(self):
+        return_code = self.popen.poll()
+        if return_code is not None:
+            self._reaped()
+        return return_code
+
+    def wait(self, timeout=None):
+        return_code = self.popen.wait(timeout)
+        self._reaped()
+        return return_code
+
+    @property
+    def stop_latency(self):
+        """Seconds from the stop request until the process exited, or None"""
+        if self.stop_requested_at is None or self.exited_at is None:
+            return None
+        return max(0.0, self.exited_at - self.stop_requested_at)
+
+
+def spawn(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs):
+    """Start ``argv`` in a new process group with binary pipes, returns a ProcessGroup"""
+    if os.name == "posix":
+        kwargs["start_new_session"] = True
+    else:
+        kwargs["creationflags"] = kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+    return ProcessGroup(subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=stdout, stderr=stderr,
+                                         **kwargs))
+
+
+def _split(decoder, pending, data, final, on_line):
+    """Feed decoded text to ``on_line`` line by line, returns the unterminated rest"""
+    text = pending + decoder.decode(data, final)
+    # A trailing "\r" may be the first half of a "\r\n" split across chunks
+    held = ""
+    if text.endswith("\r") and not final:
+        text, held = text[:-1], "\r"
+    lines = _LINE_END_RE.split(text)
+    rest = lines.pop()
+    for line in lines:
+        on_line(line + "\n")
+    if final:
+        if rest:
+            on_line(rest + "\n")
+        return ""
+    return rest + held
+
+
+def read_output(process, on_line, should_stop=None):
+    """Feed every output line of ``process`` to ``on_line`` until the pipe closes
+
+    Lines end in ``\\n`` or ``\\r`` and are passed on with a ``\\n``.
+    ``should_stop()`` is checked at least every ``POLL_INTERVAL`` seconds;
+    once it returns True the process group is terminated and the rest of
+    its output is drained without being passed on, until it exits.
+    """
+    pipe = process.stdout
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    pending = ""
+    stopping = False
+
+    def check_stop():
+        nonlocal stopping
+        if not stopping and should_stop is not None and should_stop():
+            stopping = True
+            process.terminate()
+
+    def on_idle():
+        check_stop()
+        # A descendant that left the group may hold the pipe open after the process exited
+        return stopping and process.poll() is not None
+
+    for chunk in _chunks(pipe, on_idle):
+        if stopping:
+            continue
+        pending = _split(decoder, pending, chunk, False, on_line)
+        check_stop()
+    if not stopping:
+        _split(decoder, pending, b"", True, on_line)
+    pipe.close()
+
+
+def _chunks(pipe, on_idle):
+    """Yield chunks read from a binary pipe until it closes or ``on_idle()``, called between polls, returns True"""
+    if os.name == "posix":
+        fd = pipe.fileno()
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            while True:
+                if not selector.select(POLL_INTERVAL):
+                    if on_idle():
+                        return
+                    continue
+                chunk = os.read(fd, CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    else:
+        # Pipes cannot be selected on Windows; a thread does the blocking reads
+        chunks = queue.Queue()
+
+        def reader():
+            while True:
+                chunk = pipe.read1(CHUNK_SIZE)
+                chunks.put(chunk)
+                if not chunk:
+                    return
+
+        threading.Thread(target=reader, name="output-reader", daemon=True).start()
+        while True:
+            try:
+                chunk = chunks.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if on_idle():
+                    return
+                continue
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,96 @@
+"""Machine-readable yt-dlp progress
+
+The download command asks yt-dlp for a JSON progress line with
+``--progress-template``; every such line starts with ``PROGRESS_PREFIX`` and
+decodes straight into a ``ProgressRecord``. Any other output line is a
+free-form log line. The warm backend builds the same records from the
+progress hook dicts.
+"""
+import dataclasses
+import json
+from dataclasses import dataclass
+
+# Fields of the yt-dlp progress dict the app uses
+PROGRESS_FIELDS = (
+    "status", "downloaded_bytes", "total_bytes", "total_bytes_estimate",
+    "speed", "eta", "elapsed", "fragment_index", "fragment_count", "filename",
+)
+
+PROGRESS_PREFIX = "[progress] "
+
+# Passed to yt-dlp as --progress-template
+PROGRESS_TEMPLATE = "download:" + PROGRESS_PREFIX + "%(progress.{" + ",".join(PROGRESS_FIELDS) + "})j"
+
+
+@dataclass(frozen=True)
+class ProgressRecord:
+    """One progress update of a single file being downloaded"""
+    status: str = "downloading"
+    downloaded_bytes: int = 0
+    total_bytes: int = None  # exact size if known, otherwise yt-dlp's estimate
+    speed: float = None  # bytes per second
+    eta: float = None  # seconds
+    elapsed: float = None  # seconds
+    fragment_index: int = None
+    fragment_count: int = None
+    filename: str = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a yt-dlp progress dict"""
+        return cls(
+            status=data.get("status") or "downloading",
+            downloaded_bytes=data.get("downloaded_bytes") or 0,
+            total_bytes=data.get("total_bytes") or data.get("total_bytes_estimate"),
+            speed=data.get("speed"),
+            eta=data.get("eta"),
+            elapsed=data.get("elapsed"),
+            fragment_index=data.get("fragment_index"),
+            fragment_count=data.get("fragment_count"),
+            filename=data.get("filename"),
+        )
+
+    def to_dict(self):
+        """Return the record as a JSON-ready dict, including ``percent``"""
+        data = dataclasses.asdict(self)
+        data["percent"] = round(self.percent, 1)
+        return data
+
+    @property
+    def percent(self):
+        if self.status == "finished":
+            return 100.0
+        if self.total_bytes:
+            return min(100.0, self.downloaded_bytes * 100 / self.total_bytes)
+        if self.fragment_index and self.fragment_count:
+            return self.fragment_index * 100 / self.fragment_count
+        return 0.0
+
+    @property
+    def eta_str(self):
+        return format_eta(self.eta)
+
+
+def parse_progress_line(line):
+    """Return the ProgressRecord encoded in a yt-dlp output line, or None"""
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    try:
+        data = json.loads(line[len(PROGRESS_PREFIX):])
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return ProgressRecord.from_dict(data)
+
+
+def format_eta(seconds):
+    """Format an ETA in seconds like yt-dlp does, or None if unknown"""
+    if seconds is None:
+        return None
+    seconds = int(seconds)
+    mins, secs = divmod(seconds, 60)
+    hrs, mins = divmod(mins, 60)
+    if hrs:
+        return f"{hrs}:{mins:02d}:{secs:02d}"
+    return f"{mins:02d}:{secs:02d}"
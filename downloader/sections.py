@@ -0,0 +1,113 @@
+"""Time ranges of a video to download instead of all of it
+
+A job with ``sections`` hands them to yt-dlp as ``--download-sections``,
+which has ffmpeg fetch only the fragments or byte ranges of those parts of
+the media: a 30 second clip of a three hour stream transfers and writes
+about 30 seconds of media. Each section is saved to a file of its own,
+named after its start and end.
+
+Cuts fall on the keyframes nearest to the requested times unless the job
+has ``force_keyframes``, which re-encodes around the cuts so the clip
+starts and ends exactly there, at the cost of encoding time.
+
+Sections are written as ``start-end`` with times in seconds or
+``[[h:]m:]s``, separated by commas; an empty end means the end of the
+video: ``1:00-1:30, 1:02:00-``. In a job they are ``[start, end]`` pairs of
+seconds, with ``end`` None for the end of the video.
+"""
+
+# Appended to the output file name, so the sections of a video get files of their own:
+# "Title [60-90.5].mp4", "Title [3600-inf].mp4"
+SECTION_SUFFIX = " [%(section_start)s-%(section_end)s]"
+
+
+def parse_timestamp(text):
+    """Return the seconds of ``[[h:]m:]s``, raising ValueError"""
+    parts = text.strip().split(":")
+    if not parts[-1] or len(parts) > 3:
+        raise ValueError(f"Invalid time: {text.strip()!r}")
+    seconds = 0.0
+    for part in parts:
+        try:
+            value = float(part)
+        except ValueError:
+            raise ValueError(f"Invalid time: {text.strip()!r}")
+        if value < 0:
+            raise ValueError(f"Invalid time: {text.strip()!r}")
+        seconds = seconds * 60 + value
+    return seconds
+
+
+def parse_sections(text):
+    """Return the ``[start, end]`` pairs of a sections string, raising ValueError"""
+    sections = []
+    for spec in text.split(","):
+        if not spec.strip():
+            continue
+        start, separator, end = spec.partition("-")
+        if not separator:
+            raise ValueError(f"Invalid section, expected start-end: {spec.strip()!r}")
+        sections.append([parse_timestamp(start) if start.strip() else 0.0,
+                         parse_timestamp(end) if end.strip() else None])
+    return normalize_sections(sections)
+
+
+def normalize_sections(sections):
+    """Validate ``[start, end]`` pairs, from a string or an API request; returns them sorted or None"""
+    if not sections:
+        return None
+    if isinstance(sections, str):
+        return parse_sections(sections)
+    if not isinstance(sections, (list, tuple)):
+        raise ValueError(f"Invalid sections: {sections!r}")
+    normalized = []
+    for section in sections:
+        if not isinstance(section, (list, tuple)) or len(section) != 2:
+            raise ValueError(f"Invalid section: {section!r}")
+        start, end = section
+        if isinstance(start, bool) or not isinstance(start, (int, float)) or start < 0:
+            raise ValueError(f"Invalid section start: {start!r}")
+        if end is not None and (isinstance(end, bool) or not isinstance(end, (int, float)) or end <= start):
+            raise ValueError(f"Invalid section end: {end!r}")
+        normalized.append([float(start), None if end is None else float(end)])
+    return sorted(normalized, key=lambda section: section[0])
+
+
+def format_timestamp(seconds):
+    """Format seconds as ``[h:]mm:ss``, with a fraction only if there is one"""
+    milliseconds = round(seconds * 1000)
+    whole, fraction = divmod(milliseconds, 1000)
+    mins, secs = divmod(whole, 60)
+    hrs, mins = divmod(mins, 60)
+    text = f"{hrs}:{mins:02d}:{secs:02d}" if hrs else f"{mins}:{secs:02d}"
+    return f"{text}.{fraction:03d}".rstrip("0") if fraction else text
+
+
+def format_sections(sections):
+    """Format sections the way ``parse_sections`` reads them"""
+    return ", ".join(f"{format_timestamp(start)}-{format_timestamp(end) if end is not None else ''}"
+                     for start, end in sections or ())
+
+
+def _seconds(value):
+    return f"{value:.3f}".rstrip("0").rstrip(".")
+
+
+def section_args(sections):
+    """yt-dlp ``--download-sections`` arguments for the sections"""
+    args = []
+    for start, end in sections:
+        args.extend(["--download-sections", f"*{_seconds(start)}-{'inf' if end is None else _seconds(end)}"])
+    return args
+
+
+def sections_duration(sections, duration):
+    """Return the seconds of media the sections cover, or None if it depends on an unknown duration"""
+    total = 0.0
+    for start, end in sections:
+        if end is None or (duration and end > duration):
+            if not duration:
+                return None
+            end = duration
+        total += max(0.0, end - start)
+    return total
@@ -0,0 +1,555 @@
+"""Local HTTP/JSON job service
+
+    python -m downloader.service --port 8642 -j 4
+
+Runs one DownloaderCore for any number of local clients (the GUI with
+``--service``, scripts, other tools) so they share a single job pool and
+yt-dlp backend instead of each spawning their own yt-dlp processes:
+
+    GET    /version          {"version": "2024.08.06", "engine": "...", "ffmpeg": "/usr/bin/ffmpeg",
+                              "ffmpeg_version": "6.1.1"}
+    GET    /jobs             {"jobs": [job, ...]}
+    POST   /jobs             {"urls": [...], "quality": ..., "framerate": ...,
+                              "format_ext": ..., "output_path": ..., "weight": 1.0,
+                              "sections": [[60, 90.5], [3600, null]] or "1:00-1:30.5, 1:00:00-",
+                              "force_keyframes": false, "priority": 0}
+    GET    /jobs/<id>        job
+    DELETE /jobs/<id>        cancel one job
+    DELETE /jobs             cancel all jobs and playlist listings
+    GET    /info?url=...     yt-dlp info JSON of a single video
+    POST   /info             {"urls": [...], "options": {"quality": ..., ...}, "slim": true},
+                             results arrive as info events
+    GET    /settings         {"workers": 4, "engine": "...", "bandwidth_limit": null, "fragments": "auto",
+                              "order": "fifo"}
+    POST   /settings         {"workers": 4, "engine": "cli", "bandwidth_limit": 5242880, "fragments": 8,
+                              "order": "shortest"}
+    GET    /archive          {"entries": 12345}
+    POST   /archive          {"text": "<lines of a yt-dlp --download-archive file>"}
+    GET    /metrics          Prometheus text exposition of the per-job timings
+    GET    /events           server-sent events, see below
+
+``/events`` streams the same records the headless CLI prints, one SSE event
+per record named after its ``event`` key (``job``, ``progress``, ``status``,
+``error``, ``pipeline``, ``estimate``, ``info``), starting with a ``job`` event for every known job. Add
+``?logs=1`` to also receive yt-dlp log lines.
+
+Jobs are journaled and the ones left unfinished when the service stopped
+are resumed on its next start, unless ``--no-resume`` is given. Videos in
+the download archive are skipped, unless ``--no-archive`` is given. Per-job
+timings are also appended to ``jobs.jsonl`` in the metrics directory, unless
+``--no-metrics`` is given, in which case ``/metrics`` answers 409.
+
+The service listens on localhost only by default and has no authentication.
+To exercise it without touching the network, point ``YTDLP_PATH`` at a stub
+script and use ``--engine cli``.
+"""
+import argparse
+import itertools
+import json
+import os
+import queue
+import subprocess
+import threading
+import traceback
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .archive import DownloadArchive
+from .backends import ENGINES, BackendError, default_engine
+from .bandwidth import parse_rate
+from .fragments import AUTO, parse_fragments
+from .playlist import is_playlist_url
+from .commands import FORMAT_OPTIONS, FRAMERATE_OPTIONS, QUALITY_OPTIONS
+from .core import DEFAULT_WORKERS, DownloaderCore
+from .estimate import FIFO, ORDERS
+from .events import EventPump
+from .journal import JobJournal
+from .metrics import MetricsCollector
+from .paths import data_dir
+from .sections import normalize_sections
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8642
+
+# The service keeps its own journal, apart from the GUI's
+SERVICE_JOURNAL_FILE = "service-jobs.sqlite3"
+
+# Seconds between event broadcasts, and between keep-alives on idle streams
+BROADCAST_INTERVAL = 0.25
+KEEPALIVE_INTERVAL = 15
+
+# Records buffered for a slow event stream before it is disconnected
+SUBSCRIBER_BACKLOG = 10000
+
+# Job options a client may set, with the values they accept
+JOB_OPTIONS = {
+    "quality": QUALITY_OPTIONS,
+    "framerate": FRAMERATE_OPTIONS,
+    "format_ext": FORMAT_OPTIONS,
+    "output_path": None,
+}
+
+
+class RequestError(Exception):
+    """A client request that cannot be served, with its HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_job_options(request, default_output=None):
+    """Validate the job options of a submit request"""
+    options = {}
+    for name, allowed in JOB_OPTIONS.items():
+        if name not in request:
+            continue
+        value = request[name]
+        if not isinstance(value, str) or (allowed is not None and value not in allowed):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid {name}: {value!r}")
+        options[name] = value
+    if "weight" in request:
+        weight = request["weight"]
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid weight: {weight!r}")
+        options["weight"] = float(weight)
+    if request.get("sections"):
+        try:
+            options["sections"] = normalize_sections(request["sections"])
+        except ValueError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(e))
+    if "force_keyframes" in request:
+        if not isinstance(request["force_keyframes"], bool):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid force_keyframes: {request['force_keyframes']!r}")
+        options["force_keyframes"] = request["force_keyframes"]
+    if "priority" in request:
+        priority = request["priority"]
+        if isinstance(priority, bool) or not isinstance(priority, int):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid priority: {priority!r}")
+        options["priority"] = priority
+    if "output_path" not in options and default_output:
+        options["output_path"] = default_output
+    return options
+
+
+def request_urls(request):
+    """Return the stripped URLs of a submit request, from ``urls`` or a single ``url``"""
+    urls = request.get("urls")
+    if urls is None and "url" in request:
+        urls = [request["url"]]
+    if not urls or not isinstance(urls, list) or not all(isinstance(url, str) and url.strip() for url in urls):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Expected a non-empty list of URLs in \"urls\"")
+    return [url.strip() for url in urls]
+
+
+class JobService:
+    """A DownloaderCore whose events are broadcast to any number of subscribers"""
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, engine=None, default_output=None, journal=None, archive=None,
+                 metrics=None):
+        self.events = EventPump()
+        self.core = DownloaderCore(self.events, max_workers=max_workers, engine=engine, journal=journal,
+                                   archive=archive, metrics=metrics)
+        self.default_output = default_output
+        self._subscribers = {}
+        self._subscriber_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._broadcaster = threading.Thread(target=self._broadcast, name="event-broadcast", daemon=True)
+        self._broadcaster.start()
+
+    def job_options(self, request):
+        """Validate the job options of a submit request"""
+        return parse_job_options(request, self.default_output)
+
+    def submit(self, request):
+        """Queue the URLs of a submit request, returns the created jobs"""
+        urls = request_urls(request)
+        jobs = self.core.submit_urls(urls, self.job_options(request))
+        return {
+            "jobs": [job.to_dict() for job in jobs],
+            # Playlists are listed in the background; their jobs show up as events
+            "expanding": sum(1 for url in urls if is_playlist_url(url)),
+        }
+
+    def bulk_info(self, request):
+        """Start fetching the info of the URLs of a request, returns how many there are"""
+        urls = request.get("urls")
+        if not urls or not isinstance(urls, list) or not all(isinstance(url, str) and url.strip() for url in urls):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Expected a non-empty list of URLs in \"urls\"")
+        options = request.get("options")
+        if options is not None and not isinstance(options, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Expected the download options as an object in \"options\"")
+        slim = request.get("slim", True)
+        if not isinstance(slim, bool):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid slim: {slim!r}")
+        fetch = self.core.start_bulk_info([url.strip() for url in urls],
+                                          self.job_options(options) if options else None, slim)
+        return {"urls": len(fetch.urls)}
+
+    def archive(self, request):
+        """Import download archive entries if the request has any, returns the archive size"""
+        archive = self.core.archive
+        if archive is None:
+            raise RequestError(HTTPStatus.CONFLICT, "The download archive is disabled")
+        result = {}
+        if "text" in request:
+            if not isinstance(request["text"], str):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Expected the archive lines as a string in \"text\"")
+            result["imported"] = archive.add_many(request["text"].splitlines())
+        result["entries"] = len(archive)
+        return result
+
+    def job(self, job_id):
+        job = self.core.manager.jobs.get(job_id)
+        if job is None:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No job {job_id}")
+        return job
+
+    def cancel(self, job_id):
+        job = self.job(job_id)
+        self.core.manager.stop(job_id)
+        return job.to_dict()
+
+    def settings(self, request):
+        """Apply a settings request, returns the current settings"""
+        if "workers" in request:
+            workers = request["workers"]
+            if not isinstance(workers, int) or workers < 1:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid workers: {workers!r}")
+            self.core.set_workers(workers)
+        if "engine" in request:
+            engine = ENGINES.get(request["engine"], request["engine"])
+            if engine not in ENGINES.values():
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid engine: {request['engine']!r}")
+            self.core.set_engine(engine)
+        if "bandwidth_limit" in request:
+            limit = request["bandwidth_limit"]
+            if limit is not None and (isinstance(limit, bool) or not isinstance(limit, (int, float)) or limit < 0):
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid bandwidth_limit: {limit!r}")
+            self.core.set_bandwidth_limit(limit)
+        if "fragments" in request:
+            try:
+                self.core.set_fragments(parse_fragments(request["fragments"]))
+            except (TypeError, ValueError):
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid fragments: {request['fragments']!r}")
+        if "order" in request:
+            try:
+                self.core.set_order(request["order"])
+            except ValueError:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid order: {request['order']!r}")
+        return {
+            "workers": self.core.manager.max_workers,
+            "engine": self.core.backend.name,
+            "bandwidth_limit": self.core.bandwidth.limit,
+            "fragments": self.core.fragments,
+            "order": self.core.order,
+        }
+
+    def subscribe(self, logs=False):
+        """Return ``(subscriber_id, queue)`` receiving every future event record
+
+        The queue starts with a ``job`` record for each known job. ``None``
+        on the queue means the stream has to end.
+        """
+        with self._lock:
+            jobs = self.core.manager.snapshot()
+            records = queue.Queue(SUBSCRIBER_BACKLOG + len(jobs))
+            for job in jobs:
+                record = job.to_dict()
+                records.put(dict({"event": "job", "job": record.pop("job_id")}, **record))
+            subscriber_id = next(self._subscriber_ids)
+            self._subscribers[subscriber_id] = (records, logs)
+        return subscriber_id, records
+
+    def unsubscribe(self, subscriber_id):
+        with self._lock:
+            self._subscribers.pop(subscriber_id, None)
+
+    def _broadcast(self):
+        """Drain the core's events and copy them to every subscriber"""
+        while not self._closed.wait(BROADCAST_INTERVAL):
+            batch = self.events.drain()
+            if not batch:
+                continue
+            jobs = {job.job_id: job for job in self.core.manager.snapshot()}
+            with self._lock:
+                subscribers = list(self._subscribers.items())
+            if not subscribers:
+                continue
+
+            records = list(batch.records(jobs))
+            log_records = list(batch.records(jobs, logs=True)) if any(logs for _, (_, logs) in subscribers) else None
+            for subscriber_id, (subscriber, logs) in subscribers:
+                try:
+                    for record in (log_records if logs else records):
+                        subscriber.put_nowait(record)
+                except queue.Full:
+                    # Too slow to keep up; its client reconnects and resyncs
+                    self.unsubscribe(subscriber_id)
+                    self._end_stream(subscriber)
+
+    @staticmethod
+    def _end_stream(subscriber):
+        try:
+            subscriber.put_nowait(None)
+        except queue.Full:
+            with subscriber.mutex:
+                subscriber.queue.clear()
+            subscriber.put_nowait(None)
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            subscribers = [subscriber for subscriber, _ in self._subscribers.values()]
+            self._subscribers.clear()
+        for subscriber in subscribers:
+            self._end_stream(subscriber)
+        self.core.close()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Routes the HTTP API to the server's JobService"""
+
+    server_version = "py-youtube-service"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, data, status=HTTPStatus.OK):
+        body = json.dumps(data, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON")
+        if not isinstance(data, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+        return data
+
+    def route(self):
+        """Return ``(path segments, query dict)`` of the request"""
+        url = urllib.parse.urlsplit(self.path)
+        segments = [segment for segment in url.path.split("/") if segment]
+        return segments, dict(urllib.parse.parse_qsl(url.query))
+
+    def job_id(self, segment):
+        try:
+            return int(segment)
+        except ValueError:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"No job {segment}")
+
+    def handle_request(self, handler):
+        try:
+            handler(*self.route())
+        except RequestError as e:
+            self.send_json({"error": str(e)}, e.status)
+        except BackendError as e:
+            self.send_json({"error": str(e)}, HTTPStatus.BAD_GATEWAY)
+        except subprocess.TimeoutExpired as e:
+            self.send_json({"error": f"yt-dlp timed out after {e.timeout:g}s"}, HTTPStatus.GATEWAY_TIMEOUT)
+        except subprocess.SubprocessError as e:
+            self.send_json({"error": str(e)}, HTTPStatus.BAD_GATEWAY)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            # A bug in a handler still gets an answer instead of a dropped connection
+            traceback.print_exc()
+            try:
+                self.send_json({"error": f"Internal error: {e}"}, HTTPStatus.INTERNAL_SERVER_ERROR)
+            except OSError:
+                pass
+
+    def do_GET(self):
+        self.handle_request(self.get)
+
+    def do_POST(self):
+        self.handle_request(self.post)
+
+    def do_DELETE(self):
+        self.handle_request(self.delete)
+
+    def get(self, segments, query):
+        core = self.service.core
+        if segments == ["version"]:
+            toolchain = core.probe_toolchain()
+            if not toolchain.ok:
+                raise BackendError(toolchain.error)
+            self.send_json({"version": toolchain.ytdlp_version, "engine": toolchain.engine,
+                            "ffmpeg": toolchain.ffmpeg, "ffmpeg_version": toolchain.ffmpeg_version})
+        elif segments == ["jobs"]:
+            self.send_json({"jobs": [job.to_dict() for job in core.manager.snapshot()]})
+        elif len(segments) == 2 and segments[0] == "jobs":
+            self.send_json(self.service.job(self.job_id(segments[1])).to_dict())
+        elif segments == ["settings"]:
+            self.send_json(self.service.settings({}))
+        elif segments == ["archive"]:
+            self.send_json(self.service.archive({}))
+        elif segments == ["metrics"]:
+            if core.metrics is None:
+                raise RequestError(HTTPStatus.CONFLICT, "Metrics are disabled")
+            body = core.metrics.prometheus_text().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif segments == ["info"]:
+            if not query.get("url"):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Missing url parameter")
+            text, cached = core.fetch_info(query["url"])
+            body = text.encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-Cache", "HIT" if cached else "MISS")
+            self.end_headers()
+            self.wfile.write(body)
+        elif segments == ["events"]:
+            self.stream_events(logs=query.get("logs") not in (None, "", "0"))
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+    def post(self, segments, query):
+        if segments == ["jobs"]:
+            self.send_json(self.service.submit(self.read_json()), HTTPStatus.CREATED)
+        elif segments == ["settings"]:
+            self.send_json(self.service.settings(self.read_json()))
+        elif segments == ["archive"]:
+            self.send_json(self.service.archive(self.read_json()))
+        elif segments == ["info"]:
+            self.send_json(self.service.bulk_info(self.read_json()), HTTPStatus.ACCEPTED)
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+    def delete(self, segments, query):
+        if segments == ["jobs"]:
+            self.service.core.stop_all()
+            self.send_json({"stopped": True})
+        elif len(segments) == 2 and segments[0] == "jobs":
+            self.send_json(self.service.cancel(self.job_id(segments[1])), HTTPStatus.ACCEPTED)
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+    def stream_events(self, logs=False):
+        """Send event records as server-sent events until the client leaves"""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        subscriber_id, records = self.service.subscribe(logs=logs)
+        try:
+            while True:
+                try:
+                    record = records.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                if record is None:
+                    break
+
+                # Send whatever else is waiting in the same write
+                chunks = []
+                while record is not None:
+                    data = json.dumps(record, default=str)
+                    chunks.append(f"event: {record['event']}\ndata: {data}\n\n")
+                    try:
+                        record = records.get_nowait()
+                    except queue.Empty:
+                        record = None
+                self.wfile.write("".join(chunks).encode("utf-8"))
+                self.wfile.flush()
+        finally:
+            self.service.unsubscribe(subscriber_id)
+
+
+class ServiceServer(ThreadingHTTPServer):
+    """HTTP server for a JobService; every request runs on its own thread"""
+
+    daemon_threads = True
+    handler_class = ServiceRequestHandler
+
+    def __init__(self, address, service, verbose=False):
+        super().__init__(address, self.handler_class)
+        self.service = service
+        self.verbose = verbose
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m downloader.service",
+        description="Run the downloader as a local HTTP/JSON job service."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help="number of parallel downloads")
+    parser.add_argument("--engine", choices=sorted(ENGINES),
+                        help="run yt-dlp in warm worker processes or as one process per job")
+    parser.add_argument("-o", "--output", help="directory for jobs that do not name one")
+    parser.add_argument("--limit-rate", type=parse_rate, metavar="RATE",
+                        help="total bandwidth shared by all downloads, e.g. 500K or 4.2M")
+    parser.add_argument("--fragments", type=parse_fragments, default=AUTO, metavar="N",
+                        help="concurrent fragments of DASH/HLS downloads, or auto to tune them per host (default)")
+    parser.add_argument("--order", choices=ORDERS, default=FIFO,
+                        help="start queued jobs in submission order or the shortest predicted first")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="do not journal jobs or resume the ones left unfinished by the last run")
+    parser.add_argument("--no-archive", dest="archive", action="store_false",
+                        help="download videos even if they were downloaded before, and do not record them")
+    parser.add_argument("--no-metrics", dest="metrics", action="store_false",
+                        help="do not record per-job timings or serve /metrics")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    engine = ENGINES[args.engine] if args.engine else default_engine()
+    journal = JobJournal(os.path.join(data_dir(), SERVICE_JOURNAL_FILE)) if args.resume else None
+    archive = DownloadArchive() if args.archive else None
+    metrics = MetricsCollector() if args.metrics else None
+    service = JobService(max_workers=args.workers, engine=engine, default_output=args.output, journal=journal,
+                         archive=archive, metrics=metrics)
+    service.core.set_bandwidth_limit(args.limit_rate)
+    service.core.set_fragments(args.fragments)
+    service.core.set_order(args.order)
+    server = ServiceServer((args.host, args.port), service, verbose=args.verbose)
+    service.core.resume_unfinished()
+
+    host, port = server.server_address[:2]
+    print(f"🌐 Download service listening on http://{host}:{port} ({service.core.backend.name})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    import sys
+
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Per-host download concurrency that backs off when a site throttles
+
+Many parallel downloads from one site earn HTTP 429 responses and streams
+slowed to a crawl. ``HostLimiter`` watches every running job for signs of
+that: yt-dlp output such as ``HTTP Error 429`` (``THROTTLE_RE``), and a
+speed that collapses to a fraction of what the host usually gives for
+``COLLAPSE_SECONDS``. A host is unlimited until it throttles a job; then
+its limit becomes half the downloads it had running, and every job that
+completes cleanly adds ``1 / limit`` back, so the limit grows by about one
+per round of jobs until it is out of the way again (AIMD, as in TCP).
+Decreases are at most one per ``DECREASE_INTERVAL``, since the jobs
+running at the same time usually see the same throttling.
+
+Jobs of a host at its limit wait in the queue while other hosts' jobs
+start. A job that failed because it was throttled, or with a transient
+network error (``RETRY_RE``), is queued again after a jittered exponential
+backoff, up to ``MAX_RETRIES`` times. Limits only hold for the session:
+throttling is about the site's current mood, not a property to remember.
+"""
+import random
+import re
+import threading
+import time
+
+from .fragments import host_key
+
+# Output of yt-dlp that means the site is throttling us
+THROTTLE_RE = re.compile(r"HTTP Error 429|Too Many Requests|rate.?limit|Sign in to confirm",
+                         re.IGNORECASE)
+
+# Output that means a failure might not happen again
+RETRY_RE = re.compile(r"timed out|Connection (?:reset|refused|aborted)|Temporary failure|HTTP Error 5\d\d"
+                      r"|Remote end closed|IncompleteRead", re.IGNORECASE)
+
+# Limit multiplier on throttling, and the shortest time between two decreases of a host
+DECREASE_FACTOR = 0.5
+DECREASE_INTERVAL = 10.0
+
+# A host whose limit grows to this many downloads is unlimited again
+MAX_LIMIT = 16
+
+# A job below this share of its host's usual speed for this long is throttled
+COLLAPSE_RATIO = 0.1
+COLLAPSE_SECONDS = 15.0
+
+# Weight of a finished job in its host's usual speed
+SPEED_SMOOTHING = 0.3
+
+# Retries of a throttled or transiently failed job, and their backoff in seconds
+MAX_RETRIES = 3
+BACKOFF_BASE = 5.0
+BACKOFF_CAP = 300.0
+
+
+class _HostState:
+    """What is known about one host this session"""
+
+    def __init__(self):
+        self.limit = None  # concurrent downloads, None until the host throttles
+        self.running = 0
+        self.speed = None  # usual bytes per second of an unthrottled download
+        self.last_decrease = 0.0
+
+
+class _JobSample:
+    """Signs of throttling seen in one running job"""
+
+    def __init__(self):
+        self.throttled = None  # why the job counts as throttled
+        self.transient = None  # transient error seen in its output
+        self.slow_since = None
+        self.speed_total = 0.0
+        self.speed_count = 0
+
+
+class HostLimiter:
+    """Admits jobs up to their host's limit and adapts the limits to throttling"""
+
+    def __init__(self, events=None, backoff_base=BACKOFF_BASE):
+        self.events = events
+        self.backoff_base = backoff_base
+        self.hosts = {}
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def _host(self, job):
+        key = host_key(job.url)
+        state = self.hosts.get(key)
+        if state is None:
+            state = self.hosts[key] = _HostState()
+        return key, state
+
+    def _sample(self, job):
+        sample = self._samples.get(job.job_id)
+        if sample is None:
+            sample = self._samples[job.job_id] = _JobSample()
+        return sample
+
+    def _log(self, message):
+        if self.events is not None:
+            self.events.put(("log", message))
+
+    def acquire(self, job):
+        """Take a download slot of the job's host, returns False if the host is at its limit"""
+        with self._lock:
+            _, state = self._host(job)
+            if state.limit is not None and state.running >= int(state.limit):
+                return False
+            state.running += 1
+            return True
+
+    def release(self, job):
+        """Give back the slot of a job that left the download pool"""
+        with self._lock:
+            _, state = self._host(job)
+            state.running = max(0, state.running - 1)
+
+    def limit(self, job):
+        """Return the concurrency limit of the job's host, None if it has none"""
+        with self._lock:
+            limit = self._host(job)[1].limit
+            return None if limit is None else int(limit)
+
+    def throttling(self, job):
+        """Return why a running job counts as throttled, or None"""
+        with self._lock:
+            sample = self._samples.get(job.job_id)
+            return sample.throttled if sample is not None else None
+
+    def observe_line(self, job, line):
+        """Notice yt-dlp output that means the site is throttling the job or the network failed"""
+        if THROTTLE_RE.search(line):
+            self.throttled(job, line.strip())
+        elif RETRY_RE.search(line):
+            with self._lock:
+                self._sample(job).transient = line.strip()
+
+    def observe_speed(self, job, speed):
+        """Notice a smoothed speed far below what the host usually gives"""
+        if speed is None or job.rate_limit is not None:
+            return  # A bandwidth share is slow on purpose
+        now = time.monotonic()
+        with self._lock:
+            sample = self._sample(job)
+            sample.speed_total += speed
+            sample.speed_count += 1
+            usual = self._host(job)[1].speed
+            if not usual or speed >= usual * COLLAPSE_RATIO:
+                sample.slow_since = None
+                return
+            if sample.slow_since is None:
+                sample.slow_since = now
+            collapsed = sample.throttled is None and now - sample.slow_since >= COLLAPSE_SECONDS
+        if collapsed:
+            self.throttled(job, f"speed collapsed to {speed / 1024:.0f} KB/s from a usual {usual / 1024:.0f} KB/s")
+
+    def throttled(self, job, reason):
+        """Count the job as throttled and lower its host's limit"""
+        now = time.monotonic()
+        with self._lock:
+            sample = self._sample(job)
+            if sample.throttled is not None:
+                return
+            sample.throttled = reason
+            key, state = self._host(job)
+            if now - state.last_decrease < DECREASE_INTERVAL:
+                return
+            running = state.running if state.limit is None else min(state.running, state.limit)
+            state.limit = max(1.0, running * DECREASE_FACTOR)
+            state.last_decrease = now
+            limit = int(state.limit)
+        self._log(f"🐢 {key} is throttling ({reason}), at most {limit} downloads from it at once")
+
+    def finish(self, job, completed):
+        """Learn from a job that ended, returns why it may be retried or None"""
+        with self._lock:
+            sample = self._samples.pop(job.job_id, None) or _JobSample()
+            key, state = self._host(job)
+            if sample.throttled is not None:
+                return sample.throttled
+            if not completed:
+                return sample.transient
+            if sample.speed_count:
+                speed = sample.speed_total / sample.speed_count
+                state.speed = speed if state.speed is None else state.speed + SPEED_SMOOTHING * (speed - state.speed)
+            if state.limit is None:
+                return None
+            # Additive increase: about one more download per round of clean jobs
+            state.limit += 1 / state.limit
+            if state.limit < MAX_LIMIT:
+                return None
+            state.limit = None
+        self._log(f"🐇 {key} is no longer throttling, its downloads are unlimited again")
+        return None
+
+    def discard(self, job):
+        """Forget a job that was stopped or could not run"""
+        with self._lock:
+            self._samples.pop(job.job_id, None)
+
+    def retry_delay(self, job):
+        """Count a retry of the job, returns the seconds to wait first or None if it is out of retries"""
+        if job.retries >= MAX_RETRIES:
+            return None
+        job.retries += 1
+        # Equal jitter: at least half the exponential delay, so the retries of many jobs spread out
+        delay = min(BACKOFF_CAP, self.backoff_base * 2 ** (job.retries - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
@@ -0,0 +1,117 @@
+"""The yt-dlp and ffmpeg executables, probed once and remembered
+
+Asking ``yt-dlp --version`` costs a process start, which is slow in the
+PyInstaller build where every start unpacks the bundle. ``executable_version()``
+finds an executable on the PATH and keeps its version in ``toolchain.json``
+together with its path, modification time and size, so the version is only
+asked again when a different or updated binary is found. Failures are not
+remembered: a tool installed after a failed probe is found by the next one.
+"""
+import json
+import os
+import shutil
+import subprocess
+import threading
+from dataclasses import asdict, dataclass
+
+from .paths import cache_dir
+
+CACHE_FILE = "toolchain.json"
+
+# Seconds a version command may take
+PROBE_TIMEOUT = 30
+
+_lock = threading.Lock()
+
+
+@dataclass
+class Toolchain:
+    """What the app runs downloads and conversions with"""
+    engine: str = None
+    ytdlp_version: str = None
+    ffmpeg: str = None  # path of the ffmpeg executable
+    ffmpeg_version: str = None
+    error: str = None  # why yt-dlp cannot be used
+
+    @property
+    def ok(self):
+        return self.ytdlp_version is not None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _cache_path():
+    return os.path.join(cache_dir(), CACHE_FILE)
+
+
+def _load():
+    try:
+        with open(_cache_path(), encoding="utf-8") as f:
+            entries = json.load(f)
+        return entries if isinstance(entries, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(entries):
+    path = _cache_path()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _run_version(argv):
+    """First line of a version command's output, or None if it failed"""
+    try:
+        result = subprocess.run(argv, stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                                timeout=PROBE_TIMEOUT)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return None
+    return lines[0].strip()
+
+
+def executable_version(name, args=("--version",)):
+    """Return ``(path, first line of name + args)``; both None if it is not found or fails"""
+    path = shutil.which(name)
+    if path is None:
+        return None, None
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    identity = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "args": list(args)}
+
+    with _lock:
+        entries = _load()
+        entry = entries.get(path)
+        if entry and all(entry.get(key) == value for key, value in identity.items()):
+            return path, entry["version"]
+
+    # Outside the lock, a slow probe should not hold up another executable's
+    version = _run_version([path] + list(args))
+    if version is None:
+        return path, None
+    with _lock:
+        entries = _load()
+        entries[path] = dict(identity, version=version)
+        _save(entries)
+    return path, version
+
+
+def ffmpeg_version(executable):
+    """Return ``(path, version)`` of ffmpeg, both None if it is not found"""
+    path, line = executable_version(executable, ("-version",))
+    if line is None:
+        return path, None
+    # "ffmpeg version 6.1.1-3ubuntu5 Copyright (c) ..."
+    words = line.split()
+    return path, words[2] if len(words) > 2 and words[1] == "version" else line
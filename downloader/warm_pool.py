@@ -0,0 +1,404 @@
+"""Prefork pool of worker processes that run yt-dlp through its Python API
+
+Each worker imports ``yt_dlp`` once at startup and then serves tasks until it
+is shut down, so an action only pays for the work itself instead of Python
+startup and extractor imports. Tasks take the same argument list as the
+``yt-dlp`` command line and are turned into ``YoutubeDL`` options with
+``yt_dlp.parse_options``.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+
+from .backends import BackendError
+from .processes import KILL_GRACE
+from .progress import PROGRESS_FIELDS
+
+# Seconds a cancelled task may keep running before its worker is killed
+CANCEL_GRACE = KILL_GRACE
+
+# How often the parent checks on a worker that has not sent anything
+POLL_INTERVAL = 0.25
+
+
+class _EventLogger:
+    """yt-dlp logger that forwards messages to the parent as log events"""
+
+    def __init__(self, events):
+        self.events = events
+        self.last_error = None
+
+    def debug(self, msg):
+        # yt-dlp routes normal screen output through debug() when a logger is set
+        if not msg.startswith("[debug] "):
+            self.events.put(("log", msg))
+
+    def info(self, msg):
+        self.events.put(("log", msg))
+
+    def warning(self, msg):
+        self.events.put(("log", f"WARNING: {msg}"))
+
+    def error(self, msg):
+        self.last_error = msg
+        self.events.put(("log", msg))
+
+
+def _options(yt_dlp, args, events):
+    parsed = yt_dlp.parse_options(args)
+    opts = dict(parsed.ydl_opts)
+    opts["logger"] = _EventLogger(events)
+    return opts, parsed
+
+
+def _task_version(yt_dlp, args, events, cancel, rate_limit):
+    return yt_dlp.version.__version__
+
+
+def _task_dump_json(yt_dlp, args, events, cancel, rate_limit):
+    """Extract info for every URL and return one JSON document per line"""
+    opts, parsed = _options(yt_dlp, args, events)
+    # The info dicts are returned to the parent instead of printed
+    opts.pop("forcejson", None)
+    opts.pop("dump_single_json", None)
+    opts["quiet"] = True
+
+    lines = []
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        for url in parsed.urls:
+            info = ydl.extract_info(url, download=False)
+            if info is None:
+                # Extraction errors are reported through the logger, not raised
+                raise yt_dlp.utils.DownloadError(opts["logger"].last_error or f"Could not extract {url}")
+            lines.append(json.dumps(ydl.sanitize_info(info)))
+    return "\n".join(lines)
+
+
+def _task_dump_json_many(yt_dlp, args, events, cancel, rate_limit):
+    """Extract the URLs one after the other, sending each info document or error as soon as it is known
+
+    With ``-O`` in the arguments the document is the template evaluated
+    against the info dict, as the yt-dlp command would print it.
+    """
+    opts, parsed = _options(yt_dlp, args, events)
+    opts.pop("forcejson", None)
+    opts.pop("dump_single_json", None)
+    templates = (opts.pop("forceprint", None) or {}).get("video")
+    opts["quiet"] = True
+    logger = opts["logger"]
+
+    done = 0
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        for url in parsed.urls:
+            if cancel.is_set():
+                break
+            logger.last_error = None
+            try:
+                info = ydl.extract_info(url, download=False)
+            except yt_dlp.utils.YoutubeDLError as e:
+                info, logger.last_error = None, str(e)
+            if info is None:
+                error = logger.last_error or f"Could not extract {url}"
+                if error.startswith("ERROR:"):
+                    error = error[len("ERROR:"):].strip()
+                events.put(("info_error", (url, error)))
+            elif templates:
+                events.put(("info", (url, ydl.evaluate_outtmpl(templates[0], info))))
+            else:
+                events.put(("info", (url, json.dumps(ydl.sanitize_info(info)))))
+            done += 1
+    return done
+
+
+def _task_download(yt_dlp, args, events, cancel, rate_limit):
+    """Download the URLs of a command line, reporting progress through hooks"""
+    opts, parsed = _options(yt_dlp, args, events)
+
+    def hook(status):
+        if cancel.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Download stopped by user")
+        # The downloader reads its rate limit from the shared params on every
+        # block, so a new bandwidth share takes effect right away
+        ydl.params["ratelimit"] = rate_limit.value or None
+        events.put(("progress", {key: status.get(key) for key in PROGRESS_FIELDS}))
+
+    opts["progress_hooks"] = list(opts.get("progress_hooks") or []) + [hook]
+    # Progress arrives through the hook, the text progress line is not needed
+    opts["noprogress"] = True
+
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            if parsed.options.load_info_filename is not None:
+                # Reuse an info dict extracted earlier instead of extracting again
+                return ydl.download_with_info_file(
+                    yt_dlp.utils.expand_path(parsed.options.load_info_filename))
+            return ydl.download(parsed.urls)
+    except (yt_dlp.utils.DownloadError, yt_dlp.utils.DownloadCancelled) as e:
+        events.put(("log", str(e)))
+        return 1
+
+
+def _task_flat_playlist(yt_dlp, args, events, cancel, rate_limit):
+    """List playlist entries, sending each one as soon as yt-dlp reaches it"""
+    opts, parsed = _options(yt_dlp, args, events)
+    opts.pop("forcejson", None)
+    opts["quiet"] = True
+
+    listed = set()
+
+    def on_entry(info, *, incomplete=False):
+        # Called with the playlist itself first (playlist_index 0), then once
+        # per entry as it is listed and again if an entry gets processed
+        if cancel.is_set():
+            raise yt_dlp.utils.DownloadCancelled("Playlist listing stopped by user")
+        key = (info.get("playlist_id"), info.get("playlist_index"))
+        if key[1] and key not in listed:
+            listed.add(key)
+            events.put(("entry", yt_dlp.YoutubeDL.sanitize_info(dict(info), remove_private_keys=True)))
+        return None
+
+    opts["match_filter"] = on_entry
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        ydl.extract_info(parsed.urls[0], download=False)
+    return 0
+
+
+_TASKS = {
+    "version": _task_version,
+    "dump_json": _task_dump_json,
+    "dump_json_many": _task_dump_json_many,
+    "download": _task_download,
+    "flat_playlist": _task_flat_playlist,
+}
+
+
+def _worker_main(tasks, events, cancel, rate_limit):
+    """Entry point of a warm worker process"""
+    # A process group of its own, so killing the worker also ends the ffmpeg it started
+    if hasattr(os, "setsid"):
+        try:
+            os.setsid()
+        except OSError:
+            pass
+
+    try:
+        import yt_dlp
+    except ImportError as e:
+        yt_dlp = None
+        import_error = str(e)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        kind, args = task
+
+        if yt_dlp is None:
+            events.put(("error", f"yt_dlp is not available: {import_error}"))
+            continue
+
+        try:
+            events.put(("done", _TASKS[kind](yt_dlp, args, events, cancel, rate_limit)))
+        except (Exception, SystemExit) as e:
+            # parse_options() exits on invalid arguments
+            events.put(("error", str(e) or e.__class__.__name__))
+
+
+class _Worker:
+    """Parent-side handle of one warm worker process"""
+
+    def __init__(self, ctx):
+        self.tasks = ctx.Queue()
+        self.events = ctx.Queue()
+        self.cancel = ctx.Event()
+        self.rate_limit = ctx.Value("d", 0.0)  # bytes per second, 0 for unlimited
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(self.tasks, self.events, self.cancel, self.rate_limit),
+            daemon=True
+        )
+        self.process.start()
+
+    @property
+    def alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self.process.kill()
+        self.process.join(1)
+
+    def close(self):
+        if self.alive:
+            self.tasks.put(None)
+            self.process.join(1)
+        if self.alive:
+            self.kill()
+
+
+class _TaskHandle:
+    """Stands in for a Popen object on a job so it can be stopped"""
+
+    def __init__(self, worker):
+        self.worker = worker
+        self.cancelled_at = None
+        self.finished_at = None
+
+    def terminate(self):
+        if self.cancelled_at is None:
+            self.cancelled_at = time.monotonic()
+        self.worker.cancel.set()
+
+    kill = terminate
+
+    @property
+    def stop_latency(self):
+        """Seconds from the cancel request until the task ended, or None"""
+        if self.cancelled_at is None or self.finished_at is None:
+            return None
+        return max(0.0, self.finished_at - self.cancelled_at)
+
+    def set_rate_limit(self, limit):
+        self.worker.rate_limit.value = limit or 0.0
+
+
+class WarmWorkerPool:
+    """A fixed-size set of warm workers handed out one task at a time"""
+
+    def __init__(self, size=2):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._idle = queue.Queue()
+        self._size = 0
+        self._count = 0
+        self._closed = False
+        self.resize(size)
+
+    def resize(self, size):
+        """Start workers up to ``size``; extra workers retire when they go idle
+
+        Starting a worker process takes a while, so they are started on a
+        background thread and a task waits for the first one ready.
+        """
+        with self._lock:
+            self._size = max(1, int(size))
+            missing = self._size - self._count
+            self._count += max(0, missing)
+        if missing > 0:
+            threading.Thread(target=self._start, args=(missing,), name="warm-start", daemon=True).start()
+
+    def _start(self, count):
+        for _ in range(count):
+            worker = _Worker(self._ctx)
+            with self._lock:
+                closed = self._closed
+                if closed:
+                    self._count -= 1
+            if closed:
+                worker.close()
+            else:
+                self._idle.put(worker)
+
+    def _checkout(self, job=None):
+        """Wait for an idle worker, or return None once ``job`` is stopped"""
+        while True:
+            try:
+                worker = self._idle.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                worker = None
+            if job is not None and job.stop_flag:
+                if worker is not None:
+                    self._checkin(worker)
+                return None
+            if worker is not None:
+                return worker
+
+    def _checkin(self, worker):
+        with self._lock:
+            retire = self._closed or self._count > self._size
+            if retire:
+                self._count -= 1
+        if retire:
+            worker.close()
+        elif worker.alive:
+            self._idle.put(worker)
+        else:
+            self._idle.put(_Worker(self._ctx))
+
+    def call(self, kind, args, on_event=None, timeout=None, job=None):
+        """Run a task on an idle worker and return its result
+
+        Progress and log events are passed to ``on_event(kind, data)`` as
+        they arrive. When ``job`` is given its ``process`` attribute gets a
+        handle whose ``terminate()`` cancels the task; a job stopped before
+        it got a worker does not run and returns None.
+        """
+        worker = self._checkout(job)
+        if worker is None:
+            return None
+        handle = _TaskHandle(worker)
+        worker.cancel.clear()
+        if job is not None:
+            job.process = handle
+            # Stopped while waiting for the worker, when there was no process to terminate
+            if job.stop_flag:
+                handle.terminate()
+        deadline = time.monotonic() + timeout if timeout else None
+        finished = False
+
+        try:
+            handle.set_rate_limit(getattr(job, "rate_limit", None))
+            worker.tasks.put((kind, args))
+            while True:
+                try:
+                    event, data = worker.events.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    now = time.monotonic()
+                    if not worker.alive:
+                        raise BackendError("yt-dlp worker exited unexpectedly")
+                    if deadline and now > deadline:
+                        worker.kill()
+                        raise subprocess.TimeoutExpired(["yt-dlp"] + list(args or []), timeout)
+                    if handle.cancelled_at and now - handle.cancelled_at > CANCEL_GRACE:
+                        # Stuck somewhere the progress hook never runs, e.g. a stalled connection
+                        worker.kill()
+                        return worker.process.exitcode
+                    continue
+
+                if event in ("done", "error"):
+                    finished = True
+                if event == "done":
+                    return data
+                if event == "error":
+                    raise BackendError(data)
+                if on_event:
+                    on_event(event, data)
+        finally:
+            handle.finished_at = time.monotonic()
+            if not finished:
+                # Left mid-task, e.g. on_event raised: the worker may still be
+                # running it, so it is replaced instead of reused
+                worker.kill()
+            self._checkin(worker)
+
+    def close(self):
+        """Shut down idle workers; busy ones exit when their task finishes"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._count -= 1
+            worker.close()
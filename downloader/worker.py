@@ -0,0 +1,252 @@
+"""Download worker leasing jobs from a coordinator
+
+    python -m downloader.worker http://coordinator:8643 -j 4 --engine warm
+
+Runs a DownloaderCore like the headless CLI, but takes its jobs from a
+``downloader.coordinator``: whenever a download slot is free it leases the
+next queued job, downloads it and reports the final status. Every
+``ttl / 3`` seconds it sends a heartbeat per leased job with the job's
+progress. A lease the coordinator no longer knows (it ran out while the
+coordinator could not be reached) has its download stopped, since the job
+may be running on another worker by now; a job cancelled on the
+coordinator is stopped too. When the worker is interrupted or terminated
+it stops its downloads and gives their jobs back to the queue. Only a
+cancelled job has its ``.part`` files removed: the others are left for
+the worker that leases the job next to continue.
+
+Jobs are downloaded to the directory the coordinator gives them unless
+``-o`` names a local one. The worker prints the same JSON lines as the
+headless CLI, plus ``lease`` and ``lost`` records, and keeps running until
+it is interrupted, or with ``--exit-when-idle`` until the coordinator has
+no job queued or leased.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from http import HTTPStatus
+
+from .backends import ENGINES, default_engine
+from .bandwidth import parse_rate
+from .cli import JsonLinesReporter
+from .client import ServiceError, request_json
+from .coordinator import LEASE_SECONDS
+from .core import DEFAULT_WORKERS, DownloaderCore
+from .events import EventPump
+from .fragments import AUTO, parse_fragments
+from .jobs import STOPPED
+
+# Seconds between lease requests while the queue is empty
+POLL_INTERVAL = 1.0
+
+# Job fields a leased job is created with
+LEASED_FIELDS = ("quality", "framerate", "format_ext", "output_path", "weight", "sections", "force_keyframes",
+                 "priority")
+
+
+class RemoteWorker:
+    """Leases jobs from a coordinator and downloads them with a DownloaderCore"""
+
+    def __init__(self, coordinator_url, core, name=None, output_path=None, reporter=None):
+        self.base_url = coordinator_url.rstrip("/")
+        self.core = core
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.output_path = output_path
+        self.reporter = reporter
+        self.leases = {}  # lease token -> local job
+        self.cancelled = set()  # lease tokens of jobs cancelled on the coordinator
+        self.ttl = LEASE_SECONDS
+        self.idle = False
+        self.reported = set()  # IDs of local jobs whose final status the coordinator has
+        self._stopped = threading.Event()
+        self._unreachable = False
+
+    def request(self, method, path, data=None):
+        try:
+            result = request_json(self.base_url, method, path, data)[0]
+        except ServiceError as e:
+            if e.status is None and not self._unreachable:
+                self._unreachable = True
+                self.emit("error", message=str(e))
+            raise
+        self._unreachable = False
+        return result
+
+    def emit(self, event, **fields):
+        if self.reporter is not None:
+            self.reporter.emit(event, **fields)
+
+    def run(self, exit_when_idle=False):
+        """Lease, download and report jobs until ``stop()``, or until the queue is empty"""
+        last_heartbeat = 0.0
+        try:
+            while not self._stopped.is_set():
+                if self.reporter is not None:
+                    self.reporter.report(self.core.events.drain())
+                # Jobs reported in the last round have had their events printed by now
+                self.core.manager.forget_finished(self.reported)
+                self.reported.clear()
+                self.report_finished()
+                if time.monotonic() - last_heartbeat >= self.ttl / 3:
+                    last_heartbeat = time.monotonic()
+                    self.heartbeat()
+                leased = self.lease_jobs()
+                if exit_when_idle and self.idle and not self.leases:
+                    break
+                if not leased:
+                    self._stopped.wait(POLL_INTERVAL)
+        finally:
+            self.release_all()
+
+    def stop(self):
+        self._stopped.set()
+
+    def lease_jobs(self):
+        """Lease jobs while download slots are free, returns True if any was leased"""
+        leased = False
+        while len(self.leases) < self.core.manager.max_workers and not self._stopped.is_set():
+            try:
+                response = self.request("POST", "/leases", {"worker": self.name})
+            except ServiceError:
+                return leased
+            if response.get("lease") is None:
+                # A lease another worker loses puts its job back in the queue
+                self.idle = not response.get("leased")
+                return leased
+            self.idle = False
+            record = response["job"]
+            self.ttl = response.get("ttl") or self.ttl
+            options = {name: record[name] for name in LEASED_FIELDS if record.get(name) is not None}
+            if self.output_path:
+                options["output_path"] = self.output_path
+            job = self.core.add_job(record["url"], options, title=record.get("title"))
+            self.leases[response["lease"]] = job
+            self.emit("lease", job=job.job_id, remote_job=record["job_id"], url=job.url)
+            leased = True
+        return leased
+
+    def heartbeat(self):
+        """Renew the leases of the running jobs and send their progress"""
+        for token, job in list(self.leases.items()):
+            if job.finished:
+                continue
+            progress = {"status": job.status, "percent": job.percent, "speed": job.speed, "eta": job.eta,
+                        "title": job.title, "predicted_size": job.predicted_size}
+            try:
+                response = self.request("POST", f"/leases/{token}", progress)
+            except ServiceError as e:
+                if e.status in (HTTPStatus.GONE, HTTPStatus.NOT_FOUND):
+                    self.lost(token, job)
+                continue
+            if response.get("cancel") and token not in self.cancelled:
+                self.cancelled.add(token)
+                self.core.manager.stop(job.job_id)
+
+    def lost(self, token, job):
+        """Stop a job whose lease is gone; it may be running elsewhere"""
+        self.forget(token)
+        self.emit("lost", job=job.job_id, url=job.url)
+        # The new lease holder may be writing the same .part file
+        job.keep_partial = True
+        self.core.manager.stop(job.job_id)
+
+    def forget(self, token):
+        job = self.leases.pop(token, None)
+        if job is not None:
+            self.reported.add(job.job_id)
+        self.cancelled.discard(token)
+
+    def report_finished(self):
+        """Report the final status of finished jobs to the coordinator"""
+        for token, job in list(self.leases.items()):
+            if not job.finished:
+                continue
+            if job.status == STOPPED and token not in self.cancelled:
+                # Stopped here, not on the coordinator: someone else may finish it
+                self.release(token)
+                continue
+            try:
+                self.request("POST", f"/leases/{token}/done", {"status": job.status, "return_code": job.return_code})
+            except ServiceError as e:
+                if e.status is None:
+                    continue  # Tried again on the next round
+            self.forget(token)
+
+    def release(self, token):
+        try:
+            self.request("DELETE", f"/leases/{token}")
+        except ServiceError:
+            pass
+        self.forget(token)
+
+    def release_all(self):
+        """Stop the running jobs and give them back to the coordinator"""
+        # Whoever leases them next continues their .part files
+        for job in self.leases.values():
+            job.keep_partial = True
+        self.core.stop_all()
+        self.core.wait()
+        # Jobs that finished before they were stopped are reported, the others released
+        self.report_finished()
+        if self.reporter is not None:
+            self.reporter.report(self.core.events.drain())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m downloader.worker",
+        description="Download jobs leased from a download coordinator."
+    )
+    parser.add_argument("coordinator", help="URL of the coordinator, e.g. http://10.0.0.5:8643")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help="number of parallel downloads")
+    parser.add_argument("--engine", choices=sorted(ENGINES),
+                        help="run yt-dlp in warm worker processes or as one process per job")
+    parser.add_argument("-o", "--output", help="directory to save downloads to instead of the jobs' own")
+    parser.add_argument("--name", help="name of this worker on the coordinator (default host-pid)")
+    parser.add_argument("--limit-rate", type=parse_rate, metavar="RATE",
+                        help="total bandwidth shared by this worker's downloads, e.g. 500K or 4.2M")
+    parser.add_argument("--fragments", type=parse_fragments, default=AUTO, metavar="N",
+                        help="concurrent fragments of DASH/HLS downloads, or auto to tune them per host (default)")
+    parser.add_argument("--exit-when-idle", action="store_true",
+                        help="exit once the coordinator has no job queued or leased")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also print yt-dlp log lines")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    events = EventPump()
+    engine = ENGINES[args.engine] if args.engine else default_engine()
+    core = DownloaderCore(events, max_workers=args.workers, engine=engine, bandwidth_limit=args.limit_rate,
+                          fragments=args.fragments)
+    reporter = JsonLinesReporter(core, verbose=args.verbose)
+    worker = RemoteWorker(args.coordinator, core, name=args.name, output_path=args.output, reporter=reporter)
+
+    try:
+        core.version()
+    except Exception as e:
+        reporter.emit("error", message=f"yt-dlp is not available: {e}")
+        core.close()
+        return 1
+
+    reporter.emit("worker", name=worker.name, coordinator=worker.base_url, workers=args.workers)
+    # Stopped by a service manager, the jobs are given back as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    try:
+        worker.run(exit_when_idle=args.exit_when_idle)
+    except KeyboardInterrupt:
+        # run() has given the unfinished jobs back
+        pass
+    core.close()
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,689 +1,1214 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import customtkinter as ctk
-import threading
-import queue
-import os
-import subprocess
-import json
-import re
-import sys
-
-# Set appearance mode and default color theme
-ctk.set_appearance_mode("Dark")  # Modes: "System", "Dark", "Light"
-ctk.set_default_color_theme("blue")  # Themes: "blue", "green", "dark-blue"
-
-
-class YouTubeDownloaderApp(ctk.CTk):
-    def __init__(self):
-        super().__init__()
-
-        # Configure window
-        self.title("YouTube Downloader")
-        self.geometry("1000x800")
-        self.minsize(900, 700)
-
-        # Variables
-        self.url_var = tk.StringVar()
-        self.status_var = tk.StringVar(value="Ready")
-        self.progress_var = tk.DoubleVar(value=0)
-        self.speed_var = tk.StringVar(value="Speed: 0 KB/s")
-        self.eta_var = tk.StringVar(value="ETA: --:--")
-        self.quality_var = tk.StringVar(value="1080p")
-        self.framerate_var = tk.StringVar(value="Auto")
-        self.format_var = tk.StringVar(value="mp4")
-        self.output_path = tk.StringVar(value=os.path.expanduser("~/Downloads"))
-        self.download_thread = None
-        self.stop_flag = False
-        self.process = None
-
-        # Queue for thread-safe communication
-        self.queue = queue.Queue()
-
-        # Create UI
-        self.create_widgets()
-
-        # Start checking the queue
-        self.after(100, self.process_queue)
-
-        # Bind Enter key to download
-        self.bind('<Return>', lambda e: self.start_download())
-
-    def create_widgets(self):
-        """Create all GUI widgets"""
-        # Main container
-        main_frame = ctk.CTkFrame(self)
-        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
-
-        # Title
-        title_label = ctk.CTkLabel(
-            main_frame,
-            text="YouTube Video Downloader",
-            font=ctk.CTkFont(size=28, weight="bold")
-        )
-        title_label.pack(pady=(0, 20))
-
-        # URL input section
-        url_frame = ctk.CTkFrame(main_frame)
-        url_frame.pack(fill="x", pady=(0, 15))
-
-        url_label = ctk.CTkLabel(url_frame, text="Video URL:", font=ctk.CTkFont(size=14))
-        url_label.pack(anchor="w", padx=15, pady=(15, 5))
-
-        url_entry = ctk.CTkEntry(
-            url_frame,
-            textvariable=self.url_var,
-            height=40,
-            font=ctk.CTkFont(size=14),
-            placeholder_text="Paste YouTube URL here (Ctrl+V)..."
-        )
-        url_entry.pack(fill="x", padx=15, pady=(0, 15))
-        url_entry.focus()  # Set focus to URL entry
-
-        # Quality, format and output section
-        options_frame = ctk.CTkFrame(main_frame)
-        options_frame.pack(fill="x", pady=(0, 15))
-
-        # Quality selection
-        quality_label = ctk.CTkLabel(options_frame, text="Quality:", font=ctk.CTkFont(size=14))
-        quality_label.grid(row=0, column=0, padx=15, pady=15, sticky="w")
-
-        quality_options = ["Best Quality (Highest Bitrate)", "1080p", "720p", "480p", "360p", "Audio Only"]
-        quality_menu = ctk.CTkOptionMenu(
-            options_frame,
-            variable=self.quality_var,
-            values=quality_options,
-            width=200,
-            font=ctk.CTkFont(size=14)
-        )
-        quality_menu.grid(row=0, column=1, padx=15, pady=15, sticky="w")
-
-        # Framerate selection
-        framerate_label = ctk.CTkLabel(options_frame, text="Framerate:", font=ctk.CTkFont(size=14))
-        framerate_label.grid(row=0, column=2, padx=15, pady=15, sticky="w")
-
-        framerate_options = ["Auto", "Highest", "60", "30", "24"]
-        framerate_menu = ctk.CTkOptionMenu(
-            options_frame,
-            variable=self.framerate_var,
-            values=framerate_options,
-            width=100,
-            font=ctk.CTkFont(size=14)
-        )
-        framerate_menu.grid(row=0, column=3, padx=15, pady=15, sticky="w")
-
-        # Format selection
-        format_label = ctk.CTkLabel(options_frame, text="Format:", font=ctk.CTkFont(size=14))
-        format_label.grid(row=0, column=4, padx=15, pady=15, sticky="w")
-
-        format_options = ["mp4", "webm", "mkv", "avi", "flv", "wav", "mp3", "m4a", "flac"]
-        format_menu = ctk.CTkOptionMenu(
-            options_frame,
-            variable=self.format_var,
-            values=format_options,
-            width=100,
-            font=ctk.CTkFont(size=14)
-        )
-        format_menu.grid(row=0, column=5, padx=15, pady=15, sticky="w")
-
-        # Output location
-        output_label = ctk.CTkLabel(options_frame, text="Save to:", font=ctk.CTkFont(size=14))
-        output_label.grid(row=1, column=0, padx=15, pady=(0, 15), sticky="w")
-
-        output_path_frame = ctk.CTkFrame(options_frame, fg_color="transparent")
-        output_path_frame.grid(row=1, column=1, padx=15, pady=(0, 15), sticky="ew", columnspan=3)
-
-        output_path_entry = ctk.CTkEntry(
-            output_path_frame,
-            textvariable=self.output_path,
-            font=ctk.CTkFont(size=14)
-        )
-        output_path_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
-
-        browse_button = ctk.CTkButton(
-            output_path_frame,
-            text="Browse",
-            width=80,
-            command=self.browse_output_path
-        )
-        browse_button.pack(side="right")
-
-        # Configure grid columns
-        options_frame.columnconfigure(1, weight=1)
-        options_frame.columnconfigure(3, weight=1)
-        options_frame.columnconfigure(5, weight=1)
-
-        # Progress section
-        progress_frame = ctk.CTkFrame(main_frame)
-        progress_frame.pack(fill="x", pady=(0, 15))
-
-        # Status
-        status_label = ctk.CTkLabel(
-            progress_frame,
-            textvariable=self.status_var,
-            font=ctk.CTkFont(size=14, weight="bold")
-        )
-        status_label.pack(anchor="w", padx=15, pady=(15, 5))
-
-        # Progress bar
-        self.progress_bar = ctk.CTkProgressBar(progress_frame, height=25)
-        self.progress_bar.pack(fill="x", padx=15, pady=5)
-        self.progress_bar.set(0)
-
-        # Speed, ETA and percentage
-        progress_info_frame = ctk.CTkFrame(progress_frame, fg_color="transparent")
-        progress_info_frame.pack(fill="x", padx=15, pady=(5, 15))
-
-        speed_label = ctk.CTkLabel(
-            progress_info_frame,
-            textvariable=self.speed_var,
-            font=ctk.CTkFont(size=12)
-        )
-        speed_label.pack(side="left")
-
-        eta_label = ctk.CTkLabel(
-            progress_info_frame,
-            textvariable=self.eta_var,
-            font=ctk.CTkFont(size=12)
-        )
-        eta_label.pack(side="left", padx=(20, 0))
-
-        self.percentage_label = ctk.CTkLabel(
-            progress_info_frame,
-            text="0%",
-            font=ctk.CTkFont(size=12, weight="bold")
-        )
-        self.percentage_label.pack(side="right")
-
-        # Log output
-        log_label = ctk.CTkLabel(main_frame, text="Download Log:", font=ctk.CTkFont(size=14))
-        log_label.pack(anchor="w", pady=(0, 5))
-
-        self.log_text = ctk.CTkTextbox(main_frame, height=250, font=ctk.CTkFont(size=12))
-        self.log_text.pack(fill="both", expand=True, pady=(0, 15))
-
-        # Button section
-        button_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
-        button_frame.pack(fill="x", pady=(0, 10))
-
-        # Fetch info button
-        fetch_button = ctk.CTkButton(
-            button_frame,
-            text="Get Video Info",
-            command=self.get_video_info,
-            width=140,
-            height=45,
-            font=ctk.CTkFont(size=14)
-        )
-        fetch_button.pack(side="left", padx=(0, 10))
-
-        # Download button - THIS IS THE BUTTON YOU WANTED
-        self.download_button = ctk.CTkButton(
-            button_frame,
-            text="⬇️ Download",
-            command=self.start_download,
-            width=140,
-            height=45,
-            font=ctk.CTkFont(size=14, weight="bold"),
-            fg_color="#2E7D32",  # Green color
-            hover_color="#1B5E20",  # Darker green
-            text_color="white"
-        )
-        self.download_button.pack(side="left", padx=(0, 10))
-
-        # Stop button
-        self.stop_button = ctk.CTkButton(
-            button_frame,
-            text="⏹️ Stop",
-            command=self.stop_download,
-            width=140,
-            height=45,
-            font=ctk.CTkFont(size=14),
-            fg_color="#C62828",  # Red color
-            hover_color="#B71C1C",  # Darker red
-            text_color="white",
-            state="disabled"
-        )
-        self.stop_button.pack(side="left", padx=(0, 10))
-
-        # Clear button
-        clear_button = ctk.CTkButton(
-            button_frame,
-            text="🗑️ Clear",
-            command=self.clear_log,
-            width=100,
-            height=45,
-            font=ctk.CTkFont(size=14)
-        )
-        clear_button.pack(side="right")
-
-        # Add keyboard shortcuts hint
-        hint_label = ctk.CTkLabel(
-            main_frame,
-            text="Shortcuts: Enter = Download | Ctrl+V = Paste URL",
-            font=ctk.CTkFont(size=11),
-            text_color="gray"
-        )
-        hint_label.pack(pady=(10, 0))
-
-    def browse_output_path(self):
-        """Open file dialog to select output directory"""
-        directory = filedialog.askdirectory(initialdir=self.output_path.get())
-        if directory:
-            self.output_path.set(directory)
-            self.log_message(f"Output directory set to: {directory}")
-
-    def log_message(self, message):
-        """Add message to log textbox"""
-        self.log_text.insert("end", message + "\n")
-        self.log_text.see("end")
-        self.update_idletasks()
-
-    def clear_log(self):
-        """Clear the log textbox"""
-        self.log_text.delete("1.0", "end")
-
-    def update_progress(self, percent, speed, eta=None):
-        """Update progress bar and speed display"""
-        self.progress_var.set(percent / 100)
-        self.progress_bar.set(percent / 100)
-        self.percentage_label.configure(text=f"{percent:.1f}%")
-
-        # Format speed display
-        if speed >= 1024 * 1024:
-            speed_str = f"Speed: {speed / (1024 * 1024):.1f} MB/s"
-        elif speed >= 1024:
-            speed_str = f"Speed: {speed / 1024:.1f} KB/s"
-        else:
-            speed_str = f"Speed: {speed:.1f} B/s"
-
-        self.speed_var.set(speed_str)
-
-        # Update ETA if provided
-        if eta:
-            self.eta_var.set(f"ETA: {eta}")
-        else:
-            self.eta_var.set("ETA: --:--")
-
-    def get_video_info(self):
-        """Fetch video information without downloading"""
-        url = self.url_var.get().strip()
-        if not url:
-            messagebox.showerror("Error", "Please enter a YouTube URL")
-            return
-
-        # Check if yt-dlp is available
-        if not self.check_ytdlp():
-            return
-
-        self.log_message(f"🔍 Fetching information for: {url}")
-        self.status_var.set("Fetching video information...")
-
-        # Run in thread to avoid freezing GUI
-        thread = threading.Thread(target=self.fetch_info_thread, args=(url,))
-        thread.daemon = True
-        thread.start()
-
-    def fetch_info_thread(self, url):
-        """Thread for fetching video information"""
-        try:
-            # Run yt-dlp to get video info in JSON format
-            cmd = [
-                "yt-dlp",
-                "--dump-json",
-                "--no-playlist",
-                url
-            ]
-
-            self.queue.put(("log", f"Running command: {' '.join(cmd)}"))
-
-            result = subprocess.run(cmd, capture_output=True, text=True, encoding='utf-8', timeout=30)
-
-            if result.returncode == 0:
-                # Parse JSON output
-                video_info = json.loads(result.stdout)
-                title = video_info.get('title', 'Unknown Title')
-                duration = video_info.get('duration', 0)
-                uploader = video_info.get('uploader', 'Unknown Uploader')
-                views = video_info.get('view_count', 0)
-
-                # Get available formats and framerates
-                formats = video_info.get('formats', [])
-                available_framerates = set()
-                for fmt in formats:
-                    fps = fmt.get('fps')
-                    if fps:
-                        available_framerates.add(int(fps))
-
-                # Sort framerates in descending order
-                sorted_framerates = sorted(list(available_framerates), reverse=True)
-
-                # Format duration
-                if duration:
-                    mins, secs = divmod(duration, 60)
-                    hrs, mins = divmod(mins, 60)
-                    if hrs > 0:
-                        duration_str = f"{hrs}:{mins:02d}:{secs:02d}"
-                    else:
-                        duration_str = f"{mins}:{secs:02d}"
-                else:
-                    duration_str = "Unknown"
-
-                # Format views
-                if views > 1000000:
-                    views_str = f"{views / 1000000:.1f}M"
-                elif views > 1000:
-                    views_str = f"{views / 1000:.1f}K"
-                else:
-                    views_str = str(views)
-
-                # Queue the result for GUI update
-                self.queue.put(("log", "=" * 50))
-                self.queue.put(("log", f"📹 Title: {title}"))
-                self.queue.put(("log", f"👤 Uploader: {uploader}"))
-                self.queue.put(("log", f"⏱️ Duration: {duration_str}"))
-                self.queue.put(("log", f"👁️ Views: {views_str}"))
-
-                # Display available framerates
-                if sorted_framerates:
-                    framerate_str = ", ".join(map(str, sorted_framerates))
-                    self.queue.put(("log", f"🎬 Available Framerates: {framerate_str} fps"))
-                else:
-                    self.queue.put(("log", "🎬 Available Framerates: Not detected"))
-
-                self.queue.put(("log", "✅ Video information fetched successfully!"))
-                self.queue.put(("status", "Ready"))
-
-            else:
-                error_msg = result.stderr if result.stderr else "Unknown error"
-                self.queue.put(("error", f"Failed to fetch video info: {error_msg}"))
-                self.queue.put(("status", "Error"))
-
-        except subprocess.TimeoutExpired:
-            self.queue.put(("error", "Timeout while fetching video info"))
-            self.queue.put(("status", "Error"))
-        except json.JSONDecodeError:
-            self.queue.put(("error", "Invalid response from YouTube"))
-            self.queue.put(("status", "Error"))
-        except Exception as e:
-            self.queue.put(("error", f"Error fetching video info: {str(e)}"))
-            self.queue.put(("status", "Error"))
-
-    def start_download(self):
-        """Start the download process - Called by Download button"""
-        url = self.url_var.get().strip()
-        if not url:
-            messagebox.showerror("Error", "Please enter a YouTube URL")
-            return
-
-        # Check if yt-dlp is available
-        if not self.check_ytdlp():
-            return
-
-        # Reset UI
-        self.stop_flag = False
-        self.progress_bar.set(0)
-        self.progress_var.set(0)
-        self.percentage_label.configure(text="0%")
-        self.speed_var.set("Speed: 0 KB/s")
-        self.eta_var.set("ETA: --:--")
-
-        # Enable/disable buttons
-        self.download_button.configure(state="disabled", fg_color="gray")
-        self.stop_button.configure(state="normal")
-
-        # Start download in thread
-        self.download_thread = threading.Thread(target=self.download_thread_func, args=(url,))
-        self.download_thread.daemon = True
-        self.download_thread.start()
-
-    def download_thread_func(self, url):
-        """Thread for downloading video"""
-        try:
-            # Build command based on quality selection
-            cmd = self.build_download_command(url)
-
-            self.queue.put(("log", "=" * 50))
-            self.queue.put(("log", f"🚀 Starting download: {url}"))
-            self.queue.put(("log", f"⚙️ Quality: {self.quality_var.get()}"))
-            self.queue.put(("log", f"🎬 Framerate: {self.framerate_var.get()}"))
-            self.queue.put(("log", f"📦 Format: {self.format_var.get()}"))
-            self.queue.put(("log", f"📁 Output: {self.output_path.get()}"))
-            self.queue.put(("status", "Downloading..."))
-
-            # Start the process
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                universal_newlines=True,
-                bufsize=1,
-                encoding='utf-8',
-                errors='replace'
-            )
-
-            # Parse output in real-time
-            if self.process.stdout:
-                for line in iter(self.process.stdout.readline, ''):
-                    if self.stop_flag:
-                        self.process.terminate()
-                        break
-
-                    # Parse progress information
-                    self.parse_progress(line)
-
-                    # Send line to queue for GUI update
-                    if line.strip():
-                        self.queue.put(("log", line.strip()))
-
-                # Wait for process to complete
-                self.process.stdout.close()
-            return_code = self.process.wait()
-
-            if self.stop_flag:
-                self.queue.put(("log", "⏹️ Download stopped by user"))
-                self.queue.put(("status", "Stopped"))
-            elif return_code == 0:
-                self.queue.put(("log", "✅ Download completed successfully!"))
-                self.queue.put(("status", "Completed"))
-                self.queue.put(("progress", (100, 0)))  # 100% complete
-            else:
-                self.queue.put(("log", f"❌ Download failed with code: {return_code}"))
-                self.queue.put(("status", "Failed"))
-
-        except Exception as e:
-            self.queue.put(("error", f"Download error: {str(e)}"))
-            self.queue.put(("status", "Error"))
-
-        finally:
-            # Re-enable download button
-            self.queue.put(("reset_buttons", None))
-
-    def build_download_command(self, url):
-        """Build yt-dlp command based on user selection"""
-        output_template = os.path.join(self.output_path.get(), '%(title)s.%(ext)s')
-
-        # Base command
-        cmd = ["yt-dlp", "-o", output_template, "--newline", "--progress"]
-
-        # Add quality options
-        quality = self.quality_var.get()
-        framerate = self.framerate_var.get()
-        format_ext = self.format_var.get()
-
-        # Build format string based on framerate selection
-        if framerate == "Highest":
-            framerate_filter = "[fps>30]"  # Prefer higher than 30fps
-        elif framerate == "60":
-            framerate_filter = "[fps=60]"
-        elif framerate == "30":
-            framerate_filter = "[fps=30]"
-        elif framerate == "24":
-            framerate_filter = "[fps=24]"
-        else:  # Auto
-            framerate_filter = ""
-
-        if quality == "Best Quality (Highest Bitrate)":
-            if format_ext in ["mp3", "wav", "m4a", "flac"]:
-                cmd.extend(["-f", "bestaudio", "-x", "--audio-format", format_ext])
-            else:
-                if framerate_filter:
-                    cmd.extend(["-f", f"bestvideo{framerate_filter}+bestaudio/best{framerate_filter}"])
-                else:
-                    cmd.extend(["-f", "best"])
-        elif quality == "Audio Only":
-            cmd.extend(["-f", "bestaudio", "-x", "--audio-format", "mp3"])
-        else:
-            # For specific resolutions, try to get the best video with that resolution
-            resolution = quality.replace("p", "")
-            if format_ext in ["mp3", "wav", "m4a", "flac"]:
-                cmd.extend(["-f", "bestaudio", "-x", "--audio-format", format_ext])
-            else:
-                if framerate_filter:
-                    cmd.extend(["-f",
-                                f"bestvideo[height<={resolution}]{framerate_filter}+bestaudio/best[height<={resolution}]{framerate_filter}"])
-                else:
-                    cmd.extend(["-f", f"bestvideo[height<={resolution}]+bestaudio/best[height<={resolution}]"])
-
-        # Add URL
-        cmd.append(url)
-
-        return cmd
-
-    def parse_progress(self, line):
-        """Parse yt-dlp output for progress information"""
-        # Try to extract percentage
-        percent_match = re.search(r'(\d+\.?\d*)%', line)
-        if percent_match:
-            percent = float(percent_match.group(1))
-
-            # Try to extract download speed
-            speed = 0
-            speed_match = re.search(r'(\d+\.?\d*)([KM]?)iB/s', line)
-            if speed_match:
-                speed_value = float(speed_match.group(1))
-                unit = speed_match.group(2)
-
-                # Convert to KB/s
-                if unit == 'M':
-                    speed = speed_value * 1024
-                elif unit == 'K':
-                    speed = speed_value
-                else:
-                    speed = speed_value / 1024
-
-            # Try to extract ETA
-            eta = None
-            eta_match = re.search(r'ETA\s+(\d+:\d+)', line)
-            if eta_match:
-                eta = eta_match.group(1)
-
-            # Update progress in GUI via queue
-            self.queue.put(("progress", (percent, speed, eta)))
-
-    def stop_download(self):
-        """Stop the current download"""
-        self.stop_flag = True
-        self.status_var.set("Stopping...")
-        self.log_message("🛑 Stopping download...")
-        if self.process:
-            self.process.terminate()
-
-    def check_ytdlp(self):
-        """Check if yt-dlp is installed and available"""
-        try:
-            result = subprocess.run(["yt-dlp", "--version"], capture_output=True, text=True)
-            if result.returncode == 0:
-                version = result.stdout.strip()
-                self.queue.put(("log", f"✅ yt-dlp version: {version}"))
-                return True
-            else:
-                self.queue.put(("error", "yt-dlp not found or not working properly!"))
-                return False
-        except (subprocess.SubprocessError, FileNotFoundError):
-            self.queue.put(("error", "yt-dlp not found! Please install yt-dlp first."))
-            self.queue.put(("error", "Install with: pip install yt-dlp"))
-            self.queue.put(("error", "Or download from: https://github.com/yt-dlp/yt-dlp"))
-            return False
-
-    def process_queue(self):
-        """Process messages from the queue (thread-safe GUI updates)"""
-        try:
-            while True:
-                msg_type, data = self.queue.get_nowait()
-
-                if msg_type == "log":
-                    self.log_message(data)
-                elif msg_type == "info":
-                    self.log_message(f"ℹ️ {data}")
-                elif msg_type == "error":
-                    self.log_message(f"❌ ERROR: {data}")
-                    messagebox.showerror("Error", data)
-                elif msg_type == "status":
-                    self.status_var.set(data)
-                elif msg_type == "progress":
-                    if len(data) == 2:
-                        percent, speed = data
-                        self.update_progress(percent, speed)
-                    elif len(data) == 3:
-                        percent, speed, eta = data
-                        self.update_progress(percent, speed, eta)
-                elif msg_type == "reset_buttons":
-                    self.download_button.configure(state="normal", fg_color="#2E7D32")
-                    self.stop_button.configure(state="disabled")
-
-        except queue.Empty:
-            pass
-
-        # Schedule next queue check
-        self.after(100, self.process_queue)
-
-
-# Installation instructions
-def show_installation_guide():
-    """Show installation guide if dependencies are missing"""
-    import sys
-    print("=" * 60)
-    print("YouTube Downloader Installation Guide")
-    print("=" * 60)
-    print("\nRequired dependencies:")
-    print("1. yt-dlp - for downloading videos")
-    print("2. customtkinter - for modern GUI")
-    print("\nInstall with:")
-    print("pip install yt-dlp customtkinter")
-    print("\nOr install individually:")
-    print("pip install yt-dlp")
-    print("pip install customtkinter")
-    print("\nOn some systems, you might need:")
-    print("pip install --upgrade yt-dlp")
-    print("=" * 60)
-
-
-if __name__ == "__main__":
-    # Check for required dependencies
-    try:
-        import customtkinter
-    except ImportError:
-        show_installation_guide()
-        print("\nCustomTkinter not installed. Attempting to install...")
-        try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "customtkinter"])
-            import customtkinter
-
-            print("CustomTkinter installed successfully!")
-        except:
-            print("Failed to install CustomTkinter. Please install manually.")
-            sys.exit(1)
-
-    # Check for yt-dlp
-    try:
-        subprocess.run(["yt-dlp", "--version"], capture_output=True)
-    except (subprocess.SubprocessError, FileNotFoundError):
-        show_installation_guide()
-        print("\nyt-dlp not found. Please install it using:")
-        print("pip install yt-dlp")
-        print("\nThe app will still open, but downloads won't work without yt-dlp.")
-
-    # Create and run app
-    app = YouTubeDownloaderApp()
+import argparse
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+import customtkinter as ctk
+import threading
+import time
+import os
+import subprocess
+import json
+import sys
+import multiprocessing
+
+from downloader import COMPLETED, CONVERTING, FINISHED_STATES, SKIPPED, STOPPED
+from downloader.archive import DownloadArchive
+from downloader.backends import BackendError, SUBPROCESS, WARM, default_engine, warm_available
+from downloader.bandwidth import parse_rate
+from downloader.fragments import parse_fragments
+from downloader.commands import QUALITY_OPTIONS, FRAMERATE_OPTIONS, FORMAT_OPTIONS
+from downloader.core import DownloaderCore, DEFAULT_WORKERS
+from downloader.formats import format_size, select_formats
+from downloader.estimate import FIFO, SHORTEST_FIRST
+from downloader.events import EventPump
+from downloader.journal import JobJournal
+from downloader.logbuffer import LogBuffer
+from downloader.metrics import MetricsCollector
+from downloader.progress import format_eta
+from downloader.sections import parse_sections
+
+# Set appearance mode and default color theme
+ctk.set_appearance_mode("Dark")  # Modes: "System", "Dark", "Light"
+ctk.set_default_color_theme("blue")  # Themes: "blue", "green", "dark-blue"
+
+# GUI event pump timing (milliseconds) and batch size
+QUEUE_TICK_MS = 100
+MIN_QUEUE_TICK_MS = 20
+MAX_QUEUE_TICK_MS = 250
+MAX_LOG_LINES_PER_TICK = 500
+
+# Log lines kept in memory, and the tail of those shown in the log view
+LOG_BUFFER_LINES = 10000
+LOG_VIEW_LINES = 1000
+ALL_JOBS = "All jobs"
+LOG_FILTER_JOBS = 100
+
+# Global bandwidth budgets offered, shared by all running downloads
+UNLIMITED = "Unlimited"
+BANDWIDTH_OPTIONS = [UNLIMITED, "1 MB/s", "2 MB/s", "5 MB/s", "10 MB/s", "20 MB/s", "50 MB/s"]
+
+# Concurrent fragments of DASH/HLS downloads; Auto learns them per host
+FRAGMENT_OPTIONS = ["Auto", "1", "2", "4", "8", "16"]
+
+# Order queued jobs start in
+ORDER_OPTIONS = {"First queued": FIFO, "Shortest first": SHORTEST_FIRST}
+
+# Priority of jobs queued with Download Next, ahead of everything queued normally
+URGENT_PRIORITY = 10
+
+
+class YouTubeDownloaderApp(ctk.CTk):
+    def __init__(self, service_url=None):
+        """``service_url`` makes the app a client of a job service, "" for the local one"""
+        super().__init__()
+
+        # Configure window
+        self.title("YouTube Downloader")
+        self.geometry("1000x800")
+        self.minsize(900, 700)
+
+        # Variables
+        self.url_var = tk.StringVar()
+        self.status_var = tk.StringVar(value="Ready")
+        self.progress_var = tk.DoubleVar(value=0)
+        self.speed_var = tk.StringVar(value="Speed: 0 KB/s")
+        self.eta_var = tk.StringVar(value="ETA: --:--")
+        self.pipeline_var = tk.StringVar(value="")
+        self.quality_var = tk.StringVar(value="1080p")
+        self.framerate_var = tk.StringVar(value="Auto")
+        self.format_var = tk.StringVar(value="mp4")
+        self.output_path = tk.StringVar(value=os.path.expanduser("~/Downloads"))
+        self.workers_var = tk.StringVar(value=str(DEFAULT_WORKERS))
+        self.engine_var = tk.StringVar(value=default_engine())
+        self.bandwidth_var = tk.StringVar(value=UNLIMITED)
+        self.fragments_var = tk.StringVar(value=FRAGMENT_OPTIONS[0])
+        self.order_var = tk.StringVar(value=next(iter(ORDER_OPTIONS)))
+        self.sections_var = tk.StringVar(value="")
+        self.force_keyframes_var = tk.BooleanVar(value=False)
+        self.queue_estimate = None
+        self.info_window = None
+        self.toolchain = None
+        self.log_filter_var = tk.StringVar(value=ALL_JOBS)
+
+        # Bounded log, older lines only live in the session log file
+        self.log_buffer = LogBuffer(LOG_BUFFER_LINES)
+
+        # Coalescing event queue for thread-safe communication
+        self.queue = EventPump()
+        self.queue_tick = QUEUE_TICK_MS
+
+        # Job pool, yt-dlp backend and info cache; reports through the queue.
+        # As a client of the job service all of them live in the service.
+        if service_url is not None:
+            # Only a client needs the HTTP modules, so they are not imported otherwise
+            from downloader.client import DEFAULT_SERVICE_URL, ServiceClient
+            self.core = ServiceClient(service_url or DEFAULT_SERVICE_URL, self.queue)
+            self.title(f"YouTube Downloader - {self.core.base_url}")
+            try:
+                settings = self.core.settings()
+                self.workers_var.set(str(settings["workers"]))
+                self.engine_var.set(settings["engine"])
+                self.fragments_var.set(str(settings.get("fragments", "auto")).capitalize())
+                for label, order in ORDER_OPTIONS.items():
+                    if settings.get("order") == order:
+                        self.order_var.set(label)
+                if settings.get("bandwidth_limit"):
+                    self.bandwidth_var.set(f"{settings['bandwidth_limit'] / (1024 * 1024):g} MB/s")
+            except BackendError as e:
+                self.queue.put(("log", f"❌ {e}"))
+        else:
+            self.core = DownloaderCore(
+                self.queue,
+                max_workers=int(self.workers_var.get()),
+                engine=self.engine_var.get(),
+                journal=JobJournal(),
+                archive=DownloadArchive(),
+                metrics=MetricsCollector()
+            )
+        self.manager = self.core.manager
+        self.job_rows = {}
+
+        # Create UI
+        self.create_widgets()
+
+        # Start checking the queue
+        self.after(self.queue_tick, self.process_queue)
+
+        # Bind Enter key to download
+        self.bind('<Return>', lambda e: self.start_download())
+
+        # Interrupted downloads are resumed on the next start
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.core.resume_unfinished()
+
+        # yt-dlp and ffmpeg are looked for while the window comes up
+        self.start_toolchain_probe()
+
+    def create_widgets(self):
+        """Create all GUI widgets"""
+        # Main container
+        main_frame = ctk.CTkFrame(self)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        # Title
+        title_label = ctk.CTkLabel(
+            main_frame,
+            text="YouTube Video Downloader",
+            font=ctk.CTkFont(size=28, weight="bold")
+        )
+        title_label.pack(pady=(0, 20))
+
+        # URL input section
+        url_frame = ctk.CTkFrame(main_frame)
+        url_frame.pack(fill="x", pady=(0, 15))
+
+        url_label = ctk.CTkLabel(url_frame, text="Video URL(s):", font=ctk.CTkFont(size=14))
+        url_label.pack(anchor="w", padx=15, pady=(15, 5))
+
+        url_input_frame = ctk.CTkFrame(url_frame, fg_color="transparent")
+        url_input_frame.pack(fill="x", padx=15, pady=(0, 15))
+
+        url_entry = ctk.CTkEntry(
+            url_input_frame,
+            textvariable=self.url_var,
+            height=40,
+            font=ctk.CTkFont(size=14),
+            placeholder_text="Paste one or more YouTube URLs here, separated by spaces (Ctrl+V)..."
+        )
+        url_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        url_entry.focus()  # Set focus to URL entry
+
+        import_button = ctk.CTkButton(
+            url_input_frame,
+            text="Import URLs",
+            width=110,
+            height=40,
+            command=self.import_urls
+        )
+        import_button.pack(side="right")
+
+        archive_button = ctk.CTkButton(
+            url_input_frame,
+            text="Import Archive",
+            width=120,
+            height=40,
+            command=self.import_archive
+        )
+        archive_button.pack(side="right", padx=(0, 10))
+
+        # Quality, format and output section
+        options_frame = ctk.CTkFrame(main_frame)
+        options_frame.pack(fill="x", pady=(0, 15))
+
+        # Quality selection
+        quality_label = ctk.CTkLabel(options_frame, text="Quality:", font=ctk.CTkFont(size=14))
+        quality_label.grid(row=0, column=0, padx=15, pady=15, sticky="w")
+
+        quality_menu = ctk.CTkOptionMenu(
+            options_frame,
+            variable=self.quality_var,
+            values=QUALITY_OPTIONS,
+            width=200,
+            font=ctk.CTkFont(size=14)
+        )
+        quality_menu.grid(row=0, column=1, padx=15, pady=15, sticky="w")
+
+        # Framerate selection
+        framerate_label = ctk.CTkLabel(options_frame, text="Framerate:", font=ctk.CTkFont(size=14))
+        framerate_label.grid(row=0, column=2, padx=15, pady=15, sticky="w")
+
+        framerate_menu = ctk.CTkOptionMenu(
+            options_frame,
+            variable=self.framerate_var,
+            values=FRAMERATE_OPTIONS,
+            width=100,
+            font=ctk.CTkFont(size=14)
+        )
+        framerate_menu.grid(row=0, column=3, padx=15, pady=15, sticky="w")
+
+        # Format selection
+        format_label = ctk.CTkLabel(options_frame, text="Format:", font=ctk.CTkFont(size=14))
+        format_label.grid(row=0, column=4, padx=15, pady=15, sticky="w")
+
+        format_menu = ctk.CTkOptionMenu(
+            options_frame,
+            variable=self.format_var,
+            values=FORMAT_OPTIONS,
+            width=100,
+            font=ctk.CTkFont(size=14)
+        )
+        format_menu.grid(row=0, column=5, padx=15, pady=15, sticky="w")
+
+        # Output location
+        output_label = ctk.CTkLabel(options_frame, text="Save to:", font=ctk.CTkFont(size=14))
+        output_label.grid(row=1, column=0, padx=15, pady=(0, 15), sticky="w")
+
+        output_path_frame = ctk.CTkFrame(options_frame, fg_color="transparent")
+        output_path_frame.grid(row=1, column=1, padx=15, pady=(0, 15), sticky="ew", columnspan=3)
+
+        output_path_entry = ctk.CTkEntry(
+            output_path_frame,
+            textvariable=self.output_path,
+            font=ctk.CTkFont(size=14)
+        )
+        output_path_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
+
+        browse_button = ctk.CTkButton(
+            output_path_frame,
+            text="Browse",
+            width=80,
+            command=self.browse_output_path
+        )
+        browse_button.pack(side="right")
+
+        # Number of concurrent downloads
+        workers_label = ctk.CTkLabel(options_frame, text="Parallel:", font=ctk.CTkFont(size=14))
+        workers_label.grid(row=1, column=4, padx=15, pady=(0, 15), sticky="w")
+
+        workers_menu = ctk.CTkOptionMenu(
+            options_frame,
+            variable=self.workers_var,
+            values=["1", "2", "3", "4", "6", "8"],
+            width=100,
+            font=ctk.CTkFont(size=14),
+            command=self.set_workers
+        )
+        workers_menu.grid(row=1, column=5, padx=15, pady=(0, 15), sticky="w")
+
+        # yt-dlp engine: warm worker pool or one CLI process per action
+        engine_label = ctk.CTkLabel(options_frame, text="Engine:", font=ctk.CTkFont(size=14))
+        engine_label.grid(row=2, column=0, padx=15, pady=(0, 15), sticky="w")
+
+        engine_menu = ctk.CTkOptionMenu(
+            options_frame,
+            variable=self.engine_var,
+            values=[WARM, SUBPROCESS] if warm_available() else [SUBPROCESS],
+            width=200,
+            font=ctk.CTkFont(size=14),
+            command=self.set_engine
+        )
+        engine_menu.grid(row=2, column=1, padx=15, pady=(0, 15), sticky="w")
+
+        # Bandwidth budget, split fairly across the running downloads
+        bandwidth_label = ctk.CTkLabel(options_frame, text="Bandwidth:", font=ctk.CTkFont(size=14))
+        bandwidth_label.grid(row=2, column=2, padx=15, pady=(0, 15), sticky="w")
+
+        bandwidth_menu = ctk.CTkOptionMenu(
+            options_frame,
+            variable=self.bandwidth_var,
+            values=BANDWIDTH_OPTIONS,
+            width=100,
+            font=ctk.CTkFont(size=14),
+            command=self.set_bandwidth_limit
+        )
+        bandwidth_menu.grid(row=2, column=3, padx=15, pady=(0, 15), sticky="w")
+
+        # Fragments fetched in parallel for DASH/HLS formats
+        fragments_label = ctk.CTkLabel(options_frame, text="Fragments:", font=ctk.CTkFont(size=14))
+        fragments_label.grid(row=2, column=4, padx=15, pady=(0, 15), sticky="w")
+
+        fragments_menu = ctk.CTkOptionMenu(
+            options_frame,
+            variable=self.fragments_var,
+            values=FRAGMENT_OPTIONS,
+            width=100,
+            font=ctk.CTkFont(size=14),
+            command=self.set_fragments
+        )
+        fragments_menu.grid(row=2, column=5, padx=15, pady=(0, 15), sticky="w")
+
+        # Queued jobs in submission order or the shortest predicted first
+        order_label = ctk.CTkLabel(options_frame, text="Order:", font=ctk.CTkFont(size=14))
+        order_label.grid(row=3, column=0, padx=15, pady=(0, 15), sticky="w")
+
+        order_menu = ctk.CTkOptionMenu(
+            options_frame,
+            variable=self.order_var,
+            values=list(ORDER_OPTIONS),
+            width=200,
+            font=ctk.CTkFont(size=14),
+            command=self.set_order
+        )
+        order_menu.grid(row=3, column=1, padx=15, pady=(0, 15), sticky="w")
+
+        # Time ranges to download instead of whole videos
+        sections_label = ctk.CTkLabel(options_frame, text="Sections:", font=ctk.CTkFont(size=14))
+        sections_label.grid(row=3, column=2, padx=15, pady=(0, 15), sticky="w")
+
+        sections_entry = ctk.CTkEntry(
+            options_frame,
+            textvariable=self.sections_var,
+            placeholder_text="1:00-1:30, 1:02:00-",
+            font=ctk.CTkFont(size=14)
+        )
+        sections_entry.grid(row=3, column=3, padx=15, pady=(0, 15), sticky="ew", columnspan=2)
+
+        force_keyframes_check = ctk.CTkCheckBox(
+            options_frame,
+            text="Exact cuts",
+            variable=self.force_keyframes_var,
+            font=ctk.CTkFont(size=14)
+        )
+        force_keyframes_check.grid(row=3, column=5, padx=15, pady=(0, 15), sticky="w")
+
+        # Configure grid columns
+        options_frame.columnconfigure(1, weight=1)
+        options_frame.columnconfigure(3, weight=1)
+        options_frame.columnconfigure(5, weight=1)
+
+        # Progress section
+        progress_frame = ctk.CTkFrame(main_frame)
+        progress_frame.pack(fill="x", pady=(0, 15))
+
+        # Status
+        status_label = ctk.CTkLabel(
+            progress_frame,
+            textvariable=self.status_var,
+            font=ctk.CTkFont(size=14, weight="bold")
+        )
+        status_label.pack(anchor="w", padx=15, pady=(15, 5))
+
+        # Progress bar
+        self.progress_bar = ctk.CTkProgressBar(progress_frame, height=25)
+        self.progress_bar.pack(fill="x", padx=15, pady=5)
+        self.progress_bar.set(0)
+
+        # Speed, ETA and percentage
+        progress_info_frame = ctk.CTkFrame(progress_frame, fg_color="transparent")
+        progress_info_frame.pack(fill="x", padx=15, pady=(5, 15))
+
+        speed_label = ctk.CTkLabel(
+            progress_info_frame,
+            textvariable=self.speed_var,
+            font=ctk.CTkFont(size=12)
+        )
+        speed_label.pack(side="left")
+
+        eta_label = ctk.CTkLabel(
+            progress_info_frame,
+            textvariable=self.eta_var,
+            font=ctk.CTkFont(size=12)
+        )
+        eta_label.pack(side="left", padx=(20, 0))
+
+        # Post-processing queue and stage timings
+        pipeline_label = ctk.CTkLabel(
+            progress_info_frame,
+            textvariable=self.pipeline_var,
+            font=ctk.CTkFont(size=12)
+        )
+        pipeline_label.pack(side="left", padx=(20, 0))
+
+        self.percentage_label = ctk.CTkLabel(
+            progress_info_frame,
+            text="0%",
+            font=ctk.CTkFont(size=12, weight="bold")
+        )
+        self.percentage_label.pack(side="right")
+
+        # Job list
+        jobs_label = ctk.CTkLabel(main_frame, text="Jobs:", font=ctk.CTkFont(size=14))
+        jobs_label.pack(anchor="w", pady=(0, 5))
+
+        self.jobs_frame = ctk.CTkScrollableFrame(main_frame, height=140)
+        self.jobs_frame.pack(fill="x", pady=(0, 15))
+        self.jobs_frame.columnconfigure(0, weight=1)
+
+        # Log output
+        log_header_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        log_header_frame.pack(fill="x", pady=(0, 5))
+
+        log_label = ctk.CTkLabel(log_header_frame, text="Download Log:", font=ctk.CTkFont(size=14))
+        log_label.pack(side="left")
+
+        full_log_button = ctk.CTkButton(
+            log_header_frame,
+            text="📄 Full Log",
+            width=100,
+            command=self.open_full_log
+        )
+        full_log_button.pack(side="right")
+
+        self.log_filter_menu = ctk.CTkOptionMenu(
+            log_header_frame,
+            variable=self.log_filter_var,
+            values=[ALL_JOBS],
+            width=120,
+            command=self.set_log_filter
+        )
+        self.log_filter_menu.pack(side="right", padx=(0, 10))
+
+        self.log_text = ctk.CTkTextbox(main_frame, height=150, font=ctk.CTkFont(size=12))
+        self.log_text.pack(fill="both", expand=True, pady=(0, 15))
+
+        # Button section
+        button_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        button_frame.pack(fill="x", pady=(0, 10))
+
+        # Fetch info button
+        fetch_button = ctk.CTkButton(
+            button_frame,
+            text="Get Video Info",
+            command=self.get_video_info,
+            width=140,
+            height=45,
+            font=ctk.CTkFont(size=14)
+        )
+        fetch_button.pack(side="left", padx=(0, 10))
+
+        # Download button - THIS IS THE BUTTON YOU WANTED
+        self.download_button = ctk.CTkButton(
+            button_frame,
+            text="⬇️ Download",
+            command=self.start_download,
+            width=140,
+            height=45,
+            font=ctk.CTkFont(size=14, weight="bold"),
+            fg_color="#2E7D32",  # Green color
+            hover_color="#1B5E20",  # Darker green
+            text_color="white"
+        )
+        self.download_button.pack(side="left", padx=(0, 10))
+
+        # Download next button, jumps the queue
+        download_next_button = ctk.CTkButton(
+            button_frame,
+            text="⚡ Download Next",
+            command=lambda: self.start_download(priority=URGENT_PRIORITY),
+            width=140,
+            height=45,
+            font=ctk.CTkFont(size=14)
+        )
+        download_next_button.pack(side="left", padx=(0, 10))
+
+        # Stop button
+        self.stop_button = ctk.CTkButton(
+            button_frame,
+            text="⏹️ Stop All",
+            command=self.stop_download,
+            width=140,
+            height=45,
+            font=ctk.CTkFont(size=14),
+            fg_color="#C62828",  # Red color
+            hover_color="#B71C1C",  # Darker red
+            text_color="white",
+            state="disabled"
+        )
+        self.stop_button.pack(side="left", padx=(0, 10))
+
+        # Clear button
+        clear_button = ctk.CTkButton(
+            button_frame,
+            text="🗑️ Clear",
+            command=self.clear_log,
+            width=100,
+            height=45,
+            font=ctk.CTkFont(size=14)
+        )
+        clear_button.pack(side="right")
+
+        # Add keyboard shortcuts hint
+        hint_label = ctk.CTkLabel(
+            main_frame,
+            text="Shortcuts: Enter = Download | Ctrl+V = Paste URL | Several URLs are downloaded in parallel",
+            font=ctk.CTkFont(size=11),
+            text_color="gray"
+        )
+        hint_label.pack(pady=(10, 0))
+
+    def browse_output_path(self):
+        """Open file dialog to select output directory"""
+        directory = filedialog.askdirectory(initialdir=self.output_path.get())
+        if directory:
+            self.output_path.set(directory)
+            self.log_message(f"Output directory set to: {directory}")
+
+    def set_workers(self, value):
+        """Change the number of parallel downloads"""
+        try:
+            self.core.set_workers(int(value))
+        except BackendError as e:
+            self.log_message(f"❌ {e}")
+
+    def set_engine(self, engine):
+        """Switch the yt-dlp backend; running jobs finish on the old one"""
+        try:
+            self.log_message(f"⚙️ yt-dlp engine: {self.core.set_engine(engine)}")
+        except BackendError as e:
+            self.log_message(f"❌ {e}")
+            return
+        # The other engine may find another yt-dlp, or none
+        self.toolchain = None
+        self.start_toolchain_probe()
+
+    def set_bandwidth_limit(self, value):
+        """Change the bandwidth budget shared by all downloads"""
+        try:
+            self.core.set_bandwidth_limit(parse_rate(value))
+            self.log_message(f"🚦 Bandwidth limit: {value}")
+        except BackendError as e:
+            self.log_message(f"❌ {e}")
+
+    def set_fragments(self, value):
+        """Change the concurrent fragments of new downloads"""
+        try:
+            self.core.set_fragments(parse_fragments(value))
+        except BackendError as e:
+            self.log_message(f"❌ {e}")
+
+    def set_order(self, value):
+        """Change the order queued jobs start in"""
+        try:
+            self.core.set_order(ORDER_OPTIONS[value])
+        except BackendError as e:
+            self.log_message(f"❌ {e}")
+
+    def log_message(self, message):
+        """Add message to log textbox"""
+        self.log_messages([(None, message)])
+
+    def log_messages(self, entries):
+        """Add ``(job_id, message)`` entries to the log in a single textbox insert"""
+        self.log_buffer.extend(entries)
+
+        job_filter = self.log_filter_job_id()
+        if job_filter is not None:
+            entries = [entry for entry in entries if entry[0] == job_filter]
+        if entries:
+            self.show_log_entries(entries[-LOG_VIEW_LINES:])
+
+    def show_log_entries(self, entries):
+        """Append entries to the textbox, keeping only the last LOG_VIEW_LINES lines"""
+        self.log_text.insert("end", "\n".join(format_log_entry(entry) for entry in entries) + "\n")
+
+        lines = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        if lines > LOG_VIEW_LINES:
+            self.log_text.delete("1.0", f"{lines - LOG_VIEW_LINES + 1}.0")
+        self.log_text.see("end")
+
+    def log_filter_job_id(self):
+        """Return the job the log view is limited to, or None for all jobs"""
+        value = self.log_filter_var.get()
+        return None if value == ALL_JOBS else int(value.lstrip("#"))
+
+    def set_log_filter(self, value):
+        """Redraw the log view for all jobs or a single one"""
+        self.log_text.delete("1.0", "end")
+        entries = self.log_buffer.lines(self.log_filter_job_id(), last=LOG_VIEW_LINES)
+        if entries:
+            self.show_log_entries(entries)
+
+    def update_log_filter_values(self):
+        """Offer the most recent jobs in the log filter"""
+        job_ids = list(self.job_rows)[-LOG_FILTER_JOBS:]
+        self.log_filter_menu.configure(values=[ALL_JOBS] + [f"#{job_id}" for job_id in job_ids])
+
+    def open_full_log(self):
+        """Open the session log file, which has every line of this session"""
+        path = self.log_buffer.spill_path
+        if not path or not os.path.exists(path):
+            messagebox.showinfo("Full Log", "Nothing has been logged yet")
+            return
+        if sys.platform == "win32":
+            os.startfile(path)
+        else:
+            subprocess.Popen(["open" if sys.platform == "darwin" else "xdg-open", path])
+
+    def clear_log(self):
+        """Clear the log textbox and the rows of finished jobs"""
+        self.log_text.delete("1.0", "end")
+        self.log_buffer.clear()
+        self.manager.forget_finished()
+        known = {job.job_id for job in self.manager.snapshot()}
+        for job_id in [job_id for job_id in self.job_rows if job_id not in known]:
+            self.job_rows.pop(job_id).destroy()
+        if self.log_filter_job_id() not in self.job_rows:
+            self.log_filter_var.set(ALL_JOBS)
+        self.update_log_filter_values()
+
+    def update_progress(self, percent, speed, eta=None):
+        """Update progress bar and speed display"""
+        self.progress_var.set(percent / 100)
+        self.progress_bar.set(percent / 100)
+        self.percentage_label.configure(text=f"{percent:.1f}%")
+
+        limit = self.bandwidth_var.get()
+        if limit == UNLIMITED:
+            self.speed_var.set(f"Speed: {format_speed(speed)}")
+        else:
+            self.speed_var.set(f"Speed: {format_speed(speed)} of {limit}")
+
+        # Update ETA if provided
+        if eta:
+            self.eta_var.set(f"ETA: {eta}")
+        else:
+            self.eta_var.set("ETA: --:--")
+
+    def get_video_info(self):
+        """Fetch video information without downloading"""
+        urls = self.url_var.get().split()
+        if not urls:
+            messagebox.showerror("Error", "Please enter a YouTube URL")
+            return
+
+        # Check if yt-dlp is available
+        if not self.check_ytdlp():
+            return
+
+        if len(urls) > 1:
+            # Many URLs are extracted in bulk into a results table
+            if self.info_window is not None and self.info_window.winfo_exists():
+                self.info_window.destroy()
+            fetch = self.core.start_bulk_info(urls, self.job_options())
+            self.info_window = InfoResultsWindow(self, len(set(urls)), fetch)
+            self.status_var.set("Fetching video information...")
+            return
+
+        url = urls[0]
+
+        self.log_message(f"🔍 Fetching information for: {url}")
+        self.status_var.set("Fetching video information...")
+
+        # Run in thread to avoid freezing GUI
+        thread = threading.Thread(target=self.fetch_info_thread, args=(url, self.job_options()))
+        thread.daemon = True
+        thread.start()
+
+    def fetch_info_thread(self, url, options):
+        """Thread for fetching video information"""
+        try:
+            # Run yt-dlp to get video info in JSON format, unless it is cached
+            try:
+                output, cached = self.core.fetch_info(url, timeout=30)
+                if cached:
+                    self.queue.put(("log", "📦 Using cached video information"))
+            except BackendError as e:
+                output = None
+                error_msg = str(e)
+
+            if output is not None:
+                # Parse JSON output
+                video_info = json.loads(output)
+                title = video_info.get('title', 'Unknown Title')
+                duration = video_info.get('duration', 0)
+                uploader = video_info.get('uploader', 'Unknown Uploader')
+                views = video_info.get('view_count', 0)
+
+                # Get available formats and framerates
+                formats = video_info.get('formats', [])
+                available_framerates = set()
+                for fmt in formats:
+                    fps = fmt.get('fps')
+                    if fps:
+                        available_framerates.add(int(fps))
+
+                # Sort framerates in descending order
+                sorted_framerates = sorted(list(available_framerates), reverse=True)
+
+                # Format duration
+                if duration:
+                    mins, secs = divmod(duration, 60)
+                    hrs, mins = divmod(mins, 60)
+                    if hrs > 0:
+                        duration_str = f"{hrs}:{mins:02d}:{secs:02d}"
+                    else:
+                        duration_str = f"{mins}:{secs:02d}"
+                else:
+                    duration_str = "Unknown"
+
+                # Format views
+                if views > 1000000:
+                    views_str = f"{views / 1000000:.1f}M"
+                elif views > 1000:
+                    views_str = f"{views / 1000:.1f}K"
+                else:
+                    views_str = str(views)
+
+                # Queue the result for GUI update
+                self.queue.put(("log", "=" * 50))
+                self.queue.put(("log", f"📹 Title: {title}"))
+                self.queue.put(("log", f"👤 Uploader: {uploader}"))
+                self.queue.put(("log", f"⏱️ Duration: {duration_str}"))
+                self.queue.put(("log", f"👁️ Views: {views_str}"))
+
+                # Display available framerates
+                if sorted_framerates:
+                    framerate_str = ", ".join(map(str, sorted_framerates))
+                    self.queue.put(("log", f"🎬 Available Framerates: {framerate_str} fps"))
+                else:
+                    self.queue.put(("log", "🎬 Available Framerates: Not detected"))
+
+                # What a download with the current options would fetch
+                selection = select_formats(video_info, options["quality"], options["framerate"], options["format_ext"])
+                if selection:
+                    self.queue.put(("log", f"🎯 Formats: {selection.describe()}"))
+
+                self.queue.put(("log", "✅ Video information fetched successfully!"))
+                self.queue.put(("status", "Ready"))
+
+            else:
+                self.queue.put(("error", f"Failed to fetch video info: {error_msg}"))
+                self.queue.put(("status", "Error"))
+
+        except subprocess.TimeoutExpired:
+            self.queue.put(("error", "Timeout while fetching video info"))
+            self.queue.put(("status", "Error"))
+        except json.JSONDecodeError:
+            self.queue.put(("error", "Invalid response from YouTube"))
+            self.queue.put(("status", "Error"))
+        except Exception as e:
+            self.queue.put(("error", f"Error fetching video info: {str(e)}"))
+            self.queue.put(("status", "Error"))
+
+    def start_download(self, priority=0):
+        """Queue every URL in the entry for download - Called by the Download buttons"""
+        urls = self.url_var.get().split()
+        if not urls:
+            messagebox.showerror("Error", "Please enter a YouTube URL")
+            return
+
+        # Check if yt-dlp is available
+        if not self.check_ytdlp():
+            return
+
+        if self.enqueue_urls(urls, priority=priority):
+            self.url_var.set("")
+
+    def import_urls(self):
+        """Queue URLs from a text file, one per line"""
+        filename = filedialog.askopenfilename(
+            title="Import URLs",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+
+        try:
+            with open(filename, encoding="utf-8") as f:
+                urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not read {filename}: {e}")
+            return
+
+        if not urls:
+            messagebox.showinfo("Import URLs", "No URLs found in file")
+            return
+
+        if not self.check_ytdlp():
+            return
+
+        self.log_message(f"📥 Imported {len(urls)} URLs from {filename}")
+        self.enqueue_urls(urls)
+
+    def import_archive(self):
+        """Add a yt-dlp download archive, so the videos in it are not downloaded again"""
+        filename = filedialog.askopenfilename(
+            title="Import Download Archive",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+
+        try:
+            imported = self.core.import_archive(filename)
+        except (OSError, ValueError, BackendError) as e:
+            messagebox.showerror("Error", f"Could not import {filename}: {e}")
+            return
+        self.log_message(f"🗃️ Imported {imported} new archive entries from {filename}")
+
+    def job_options(self):
+        """Current download options, to be applied to new jobs"""
+        return {
+            "quality": self.quality_var.get(),
+            "framerate": self.framerate_var.get(),
+            "format_ext": self.format_var.get(),
+            "output_path": self.output_path.get(),
+        }
+
+    def enqueue_urls(self, urls, priority=0):
+        """Queue the URLs for download with the current options
+
+        Playlist and channel URLs are expanded in the background, their
+        entries are queued as they are listed. Jobs with a higher
+        ``priority`` start before the ones already queued. Returns False if
+        the sections cannot be read and nothing was queued.
+        """
+        options = self.job_options()
+        if priority:
+            options["priority"] = priority
+        try:
+            sections = parse_sections(self.sections_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return False
+        if sections:
+            options.update(sections=sections, force_keyframes=self.force_keyframes_var.get())
+        try:
+            self.core.submit_urls(urls, options)
+        except BackendError as e:
+            self.queue.put(("error", str(e)))
+            return True
+        self.stop_button.configure(state="normal")
+        return True
+
+    def add_job_row(self, job):
+        """Add a row for the job to the job list"""
+        row = JobRow(self.jobs_frame, job, on_stop=self.stop_job)
+        row.grid(row=len(self.job_rows), column=0, sticky="ew", pady=2)
+        self.job_rows[job.job_id] = row
+
+    def stop_job(self, job_id):
+        """Stop a single queued or running download"""
+        try:
+            self.manager.stop(job_id)
+        except BackendError as e:
+            self.log_message(f"❌ {e}")
+
+    def stop_download(self):
+        """Stop all queued and running downloads"""
+        self.status_var.set("Stopping...")
+        self.log_message("🛑 Stopping all downloads...")
+        try:
+            self.core.stop_all()
+        except BackendError as e:
+            self.log_message(f"❌ {e}")
+
+    def start_toolchain_probe(self):
+        """Look for yt-dlp and ffmpeg on a background thread, reporting a ("toolchain", Toolchain)"""
+        thread = threading.Thread(target=lambda: self.queue.put(("toolchain", self.core.probe_toolchain())))
+        thread.daemon = True
+        thread.start()
+
+    def on_toolchain(self, toolchain):
+        """Log what the toolchain probe found"""
+        self.toolchain = toolchain
+        if toolchain.ok:
+            self.log_message(f"✅ yt-dlp version: {toolchain.ytdlp_version}")
+        else:
+            self.log_message(f"❌ {toolchain.error}")
+            self.log_message("❌ Install with: pip install yt-dlp")
+            self.log_message("❌ Or download from: https://github.com/yt-dlp/yt-dlp")
+        if toolchain.ffmpeg_version:
+            self.log_message(f"✅ ffmpeg version: {toolchain.ffmpeg_version}")
+        else:
+            self.log_message("⚠️ ffmpeg not found: merging formats and converting downloads will fail")
+
+    def check_ytdlp(self):
+        """Check if yt-dlp is installed and available, without waiting for it
+
+        Until the probe has answered every action is let through; a missing
+        yt-dlp then fails the job. After a failed probe the action is refused
+        and yt-dlp is looked for again, in case it was installed since.
+        """
+        if self.toolchain is None or self.toolchain.ok:
+            return True
+        self.queue.put(("error", "yt-dlp not found! Please install yt-dlp first."))
+        self.toolchain = None
+        self.start_toolchain_probe()
+        return False
+
+    def on_close(self):
+        """Interrupt running downloads, leaving them to be resumed next time, and quit"""
+        self.core.close()
+        self.log_buffer.close()
+        self.destroy()
+
+    def on_job_progress(self, job_id, record):
+        """Refresh a job's row after its progress changed"""
+        if job_id in self.job_rows:
+            self.job_rows[job_id].refresh()
+
+    def on_job_status(self, job_id):
+        """Refresh the UI after a job changed state"""
+        if job_id in self.job_rows:
+            self.job_rows[job_id].refresh()
+
+        queued, running, finished = self.manager.counts()
+        converting = sum(1 for job in self.manager.snapshot() if job.status == CONVERTING)
+        if queued or running or converting:
+            self.status_var.set(f"Downloading: {running} running, {queued} queued, {converting} converting,"
+                                f" {finished} finished")
+            self.stop_button.configure(state="normal")
+        else:
+            self.status_var.set(f"Ready - {finished} jobs finished" if finished else "Ready")
+            self.stop_button.configure(state="disabled")
+
+    def update_overall_progress(self):
+        """Show the combined progress of all jobs in the main progress section"""
+        jobs = [job for job in self.manager.snapshot() if job.status != STOPPED]
+        if not jobs:
+            return
+        percent = sum(100 if job.status in (COMPLETED, SKIPPED) else job.percent for job in jobs) / len(jobs)
+        running = [job for job in jobs if not job.finished and job.percent]
+        speed = sum(job.speed for job in running)
+        eta = running[0].eta if len(running) == 1 else None
+
+        # With more than one job left, the whole queue's estimate says more
+        unfinished = sum(1 for job in jobs if not job.finished and job.status != CONVERTING)
+        remaining = self.queue_estimate and self.queue_estimate.get("remaining")
+        if unfinished > 1 and remaining is not None:
+            eta = f"{format_eta(remaining)} for {unfinished} jobs"
+        self.update_progress(percent, speed, eta)
+
+    def show_info_result(self, result):
+        """Add a bulk info result to the results table"""
+        if self.info_window is None or not self.info_window.winfo_exists():
+            return
+        self.info_window.add_result(result)
+        if self.info_window.complete:
+            self.status_var.set("Ready")
+
+    def process_queue(self):
+        """Apply queued worker events to the GUI (thread-safe GUI updates)
+
+        Each tick inserts all waiting log lines at once and redraws every job
+        at most once, with its latest progress. The next tick comes sooner
+        while a backlog remains and later while the queue is idle.
+        """
+        started = time.monotonic()
+        try:
+            batch = self.queue.drain(max_logs=MAX_LOG_LINES_PER_TICK)
+
+            if batch.logs:
+                self.log_messages(batch.logs)
+
+            new_jobs = False
+            for msg_type, data in batch.messages:
+                if msg_type == "info":
+                    self.log_message(f"ℹ️ {data}")
+                elif msg_type == "error":
+                    self.log_message(f"❌ ERROR: {data}")
+                    messagebox.showerror("Error", data)
+                elif msg_type == "status":
+                    self.status_var.set(data)
+                elif msg_type == "pipeline":
+                    self.pipeline_var.set(format_pipeline(data))
+                elif msg_type == "estimate":
+                    self.queue_estimate = data
+                elif msg_type == "info_result":
+                    self.show_info_result(data)
+                elif msg_type == "toolchain":
+                    self.on_toolchain(data)
+                elif msg_type == "new_job":
+                    self.add_job_row(data)
+                    new_jobs = True
+                elif msg_type == "job_status":
+                    job_id, status = data
+                    self.on_job_status(job_id)
+
+            if new_jobs:
+                self.update_log_filter_values()
+
+            for job_id, record in batch.progress.items():
+                self.on_job_progress(job_id, record)
+
+            if batch.progress or batch.messages:
+                self.update_overall_progress()
+
+            # Adaptive tick: hurry through a backlog but leave the main loop at
+            # least twice the time spent here, back off while nothing happens
+            elapsed_ms = (time.monotonic() - started) * 1000
+            if self.queue.pending():
+                self.queue_tick = max(MIN_QUEUE_TICK_MS, int(elapsed_ms * 2))
+            elif batch:
+                self.queue_tick = QUEUE_TICK_MS
+            else:
+                self.queue_tick = min(MAX_QUEUE_TICK_MS, self.queue_tick * 2)
+        finally:
+            # Schedule next queue check, also after a failed tick so the GUI keeps updating
+            self.after(self.queue_tick, self.process_queue)
+
+
+class JobRow(ctk.CTkFrame):
+    """One row of the job list: URL, progress, status and a stop control"""
+
+    def __init__(self, master, job, on_stop):
+        super().__init__(master)
+        self.job = job
+        self.columnconfigure(0, weight=1)
+
+        title_label = ctk.CTkLabel(
+            self,
+            text=f"#{job.job_id}  {job.title or job.url}",
+            anchor="w",
+            font=ctk.CTkFont(size=12)
+        )
+        title_label.grid(row=0, column=0, padx=(10, 5), sticky="ew")
+
+        self.progress_bar = ctk.CTkProgressBar(self, width=160, height=12)
+        self.progress_bar.grid(row=0, column=1, padx=5)
+
+        self.status_label = ctk.CTkLabel(self, width=170, anchor="w", font=ctk.CTkFont(size=12))
+        self.status_label.grid(row=0, column=2, padx=5)
+
+        self.stop_button = ctk.CTkButton(
+            self,
+            text="⏹️",
+            width=36,
+            fg_color="#C62828",
+            hover_color="#B71C1C",
+            command=lambda: on_stop(job.job_id)
+        )
+        self.stop_button.grid(row=0, column=3, padx=(5, 10), pady=4)
+
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the row from the job's current state"""
+        job = self.job
+        if job.status in (COMPLETED, SKIPPED):
+            self.progress_bar.set(1)
+        else:
+            self.progress_bar.set(job.percent / 100)
+
+        if job.finished or job.status == CONVERTING or not job.percent:
+            self.status_label.configure(text=job.status)
+        else:
+            self.status_label.configure(text=f"{job.percent:.1f}%  {format_speed(job.speed)}")
+        if job.predicted_size and job.status not in (CONVERTING, *FINISHED_STATES):
+            self.status_label.configure(text=f"{self.status_label.cget('text')}  ~{format_size(job.predicted_size)}")
+
+        if job.finished:
+            self.stop_button.configure(state="disabled")
+
+
+class InfoResultsWindow(ctk.CTkToplevel):
+    """Table of bulk info results, filled in as they arrive"""
+
+    COLUMNS = (("title", "Title", 280), ("duration", "Duration", 70), ("height", "Best", 60),
+               ("formats", "Will download", 220), ("size", "Size", 80), ("url", "URL", 260))
+
+    def __init__(self, master, total, fetch=None):
+        super().__init__(master)
+        self.total = total
+        self.fetch = fetch
+        self.done = 0
+        self.failed = 0
+        self.geometry("1000x420")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(self, columns=[name for name, _, _ in self.COLUMNS], show="headings")
+        for name, heading, width in self.COLUMNS:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, stretch=name in ("title", "url"))
+        self.tree.tag_configure("error", foreground="#C62828")
+        self.tree.grid(row=0, column=0, sticky="nsew", padx=(10, 0), pady=10)
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        scrollbar.grid(row=0, column=1, sticky="ns", padx=(0, 10), pady=10)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.update_title()
+
+    @property
+    def complete(self):
+        return self.done >= self.total
+
+    def update_title(self):
+        failed = f", {self.failed} failed" if self.failed else ""
+        self.title(f"Video information: {self.done} of {self.total}{failed}")
+
+    def add_result(self, result):
+        """Append one InfoResult as a row"""
+        self.done += 1
+        if result.error:
+            self.failed += 1
+            values = (f"❌ {result.error}", "", "", "", "", result.url)
+        else:
+            values = (
+                result.title or "",
+                format_eta(result.duration) or "",
+                f"{result.height}p" if result.height else "",
+                result.selection or "",
+                format_size(result.predicted_size) if result.predicted_size else "",
+                result.url,
+            )
+        self.tree.insert("", "end", values=values, tags=("error",) if result.error else ())
+        self.update_title()
+
+    def close(self):
+        """Stop the fetch if it is still running and close the window"""
+        if self.fetch is not None and not self.complete:
+            self.fetch.stop()
+        self.destroy()
+
+
+def format_pipeline(stats):
+    """Format post-processing stats: queue depth and average time per stage"""
+    if not (stats["queued"] or stats["running"] or stats["convert"]):
+        return ""
+    text = f"🎛️ Converting {stats['running']}/{stats['workers']}, {stats['queued']} waiting"
+    times = [f"{stage} {stats[stage]:.1f}s" for stage in ("download", "wait", "convert") if stats.get(stage) is not None]
+    if times:
+        text += f" (avg {', '.join(times)})"
+    return text
+
+
+def format_log_entry(entry):
+    """Format a ``(job_id, message)`` log entry for the log view"""
+    job_id, message = entry
+    return message if job_id is None else f"[#{job_id}] {message}"
+
+
+def format_speed(speed):
+    """Format a transfer speed for display"""
+    if speed >= 1024 * 1024 * 1024:
+        return f"{speed / (1024 * 1024 * 1024):.2f} GB/s"
+    elif speed >= 1024 * 1024:
+        return f"{speed / (1024 * 1024):.1f} MB/s"
+    elif speed >= 1024:
+        return f"{speed / 1024:.1f} KB/s"
+    else:
+        return f"{speed:.1f} B/s"
+
+
+# Installation instructions
+def show_installation_guide():
+    """Show installation guide if dependencies are missing"""
+    import sys
+    print("=" * 60)
+    print("YouTube Downloader Installation Guide")
+    print("=" * 60)
+    print("\nRequired dependencies:")
+    print("1. yt-dlp - for downloading videos")
+    print("2. customtkinter - for modern GUI")
+    print("\nInstall with:")
+    print("pip install yt-dlp customtkinter")
+    print("\nOr install individually:")
+    print("pip install yt-dlp")
+    print("pip install customtkinter")
+    print("\nOn some systems, you might need:")
+    print("pip install --upgrade yt-dlp")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    # Needed by the warm worker processes in the PyInstaller build
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="YouTube Downloader")
+    parser.add_argument(
+        "--service", nargs="?", const="", metavar="URL",
+        help="run as a client of a download service (python -m downloader.service), by default the local one"
+    )
+    args = parser.parse_args()
+
+    # Check for required dependencies
+    try:
+        import customtkinter
+    except ImportError:
+        show_installation_guide()
+        print("\nCustomTkinter not installed. Attempting to install...")
+        try:
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "customtkinter"])
+            import customtkinter
+
+            print("CustomTkinter installed successfully!")
+        except:
+            print("Failed to install CustomTkinter. Please install manually.")
+            sys.exit(1)
+
+    # yt-dlp is looked for in the background once the window is up
+    # Create and run app
+    app = YouTubeDownloaderApp(service_url=args.service)
     app.mainloop()
\ No newline at end of file